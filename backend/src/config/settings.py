@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 import json
 import os
+import tempfile
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -51,6 +52,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "survey.middleware.ServerTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -93,9 +95,45 @@ DATABASES = {
         "PORT": os.getenv("DB_PORT"),
         "USER": os.getenv("DB_USER"),
         "PASSWORD": os.getenv("DB_PASSWORD"),
+        # Постоянные соединения включаются явно: соединение потока переиспользуется DB_CONN_MAX_AGE секунд
+        # (пустое значение - без ограничения), перед повторным использованием проверяется, что оно живо.
+        # Под ASGI (async-представления) их нужно оставлять выключенными, см. документацию Django
+        "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", 0)) if os.getenv("DB_CONN_MAX_AGE") != "" else None,
+        "CONN_HEALTH_CHECKS": bool(int(os.getenv("DB_CONN_HEALTH_CHECKS", 1))),
+        "OPTIONS": {},
     }
 }
 
+# Пул соединений psycopg (только PostgreSQL, нужен psycopg[pool] >= 3 вместо psycopg2). С пулом соединения
+# не закрепляются за потоком, поэтому постоянные соединения отключаются
+if bool(int(os.getenv("DB_POOL", 0))) and DATABASES["default"]["ENGINE"] == "django.db.backends.postgresql":
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+    DATABASES["default"]["OPTIONS"]["pool"] = {
+        "min_size": int(os.getenv("DB_POOL_MIN_SIZE", 2)),
+        "max_size": int(os.getenv("DB_POOL_MAX_SIZE", 10)),
+        "timeout": float(os.getenv("DB_POOL_TIMEOUT", 10)),
+    }
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # Сериализованные документы опросов (см. survey.cache). LocMemCache вытесняет давно не читанные записи
+    # при превышении MAX_ENTRIES, бэкенд можно заменить через переменные окружения
+    "surveys": {
+        "BACKEND": os.getenv("SURVEY_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("SURVEY_CACHE_LOCATION", "surveys"),
+        "TIMEOUT": None,
+        "OPTIONS": {
+            "MAX_ENTRIES": int(os.getenv("SURVEY_CACHE_MAX_ENTRIES", 256)),
+        },
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -140,11 +178,45 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_RENDERER_CLASSES": [
+        "survey.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
 }
 
 CORS_ALLOW_ALL_ORIGINS = bool(os.getenv("CORS_ALLOW_ALL_ORIGINS", True))
 CORS_ALLOWED_ORIGINS = json.loads(os.getenv("CORS_ORIGINS", '["http://localhost",]'))
 
+# Размер пачки bulk_create при загрузке ответов респондентов
+SURVEY_RESPONSES_BATCH_SIZE = int(os.getenv("SURVEY_RESPONSES_BATCH_SIZE", 5000))
+# Число строк, которое выгрузка ответов читает из БД и отдает клиенту за один раз
+SURVEY_EXPORT_CHUNK_SIZE = int(os.getenv("SURVEY_EXPORT_CHUNK_SIZE", 2000))
+# Число опросов, которое manage.py import_surveys вставляет за раз
+SURVEY_IMPORT_BATCH_SIZE = int(os.getenv("SURVEY_IMPORT_BATCH_SIZE", 500))
+# Заголовок Server-Timing с числом и временем SQL-запросов и этапами обработки запроса. Раскрывает внутренние
+# тайминги любому клиенту, включая неаутентифицированные эндпоинты, поэтому вне DEBUG по умолчанию выключен
+SURVEY_SERVER_TIMING = bool(int(os.getenv("SURVEY_SERVER_TIMING", int(DEBUG))))
+# Порог в миллисекундах, после которого запрос логируется вместе с SQL; не задан - не логируется
+SURVEY_SLOW_REQUEST_MS = float(os.getenv("SURVEY_SLOW_REQUEST_MS")) if os.getenv("SURVEY_SLOW_REQUEST_MS") else None
+# Профилирование SurveyDetailView: доля запросов, секрет заголовка X-Survey-Profile, каталог и число профилей
+SURVEY_PROFILE_SAMPLE_RATE = float(os.getenv("SURVEY_PROFILE_SAMPLE_RATE", 0))
+SURVEY_PROFILE_SECRET = os.getenv("SURVEY_PROFILE_SECRET", "")
+SURVEY_PROFILE_DIR = os.getenv("SURVEY_PROFILE_DIR", os.path.join(tempfile.gettempdir(), "survey-profiles"))
+SURVEY_PROFILE_MAX_FILES = int(os.getenv("SURVEY_PROFILE_MAX_FILES", 200))
+# Каталог опубликованных снимков опросов (survey.snapshots); должен быть общим для всех воркеров
+SURVEY_SNAPSHOT_DIR = os.getenv("SURVEY_SNAPSHOT_DIR", os.path.join(BASE_DIR, "..", "snapshots"))
+# Токен внутреннего эндпоинта метрик (заголовок X-Survey-Metrics-Token); пустой - эндпоинт отключен
+SURVEY_METRICS_TOKEN = os.getenv("SURVEY_METRICS_TOKEN", "")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "survey": {"handlers": ["console"], "level": os.getenv("SURVEY_LOG_LEVEL", "INFO"), "propagate": False},
+    },
+}
+
 SPECTACULAR_SETTINGS = {
     "TITLE": "LOT14",
     "DESCRIPTION": "LOT14",  # Описание
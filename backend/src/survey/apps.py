@@ -1,6 +1,24 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+from .db_metrics import record_connection
+from .timing import record_query
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """
+    Подключает учет SQL-запросов для ServerTimingMiddleware к каждому новому соединению.
+
+    Обертка ставится первой, чтобы connection.execute_wrapper(), снимающий последнюю обертку, ее не удалил.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
 
 
 class SurveyConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "survey"
+
+    def ready(self):
+        connection_created.connect(install_query_recorder, dispatch_uid="survey.install_query_recorder")
+        connection_created.connect(record_connection, dispatch_uid="survey.record_connection")
@@ -0,0 +1,92 @@
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views import View
+from rest_framework import status
+
+from .cache import survey_payload_cache
+from .compression import compress_payload, encoded_response
+from .etags import make_survey_etag, matching_etag, survey_etags
+from .graph import survey_graph_cache
+from .models import Survey
+from .queries.build_survey_document import BuildSurveyDocumentQuery
+from .queries.get_next_question import GetNextQuestionQuery
+from .queries.get_survey_questions import GetSurveyQuestionsQuery
+from .renderers import ORJSONRenderer
+from .serializers import NextQuestionRequestSerializer, SurveySerializer
+
+
+def json_response(data: dict, status_code: int) -> HttpResponse:
+    """
+    Ответ в том же JSON, что отдают представления DRF.
+    """
+    return HttpResponse(ORJSONRenderer().render(data), status=status_code, content_type="application/json")
+
+
+class AsyncSurveyDetailView(View):
+    """
+    Асинхронное чтение опроса для ASGI: то же содержимое, те же ETag и те же заранее сжатые тела, что у GET
+    SurveyDetailView, но ожидание БД и кэша не занимает поток воркера, поэтому один процесс обслуживает много
+    медленных клиентов.
+    """
+
+    http_method_names = ["get", "head", "options"]
+
+    async def get(self, request, *args, **kwargs):
+        survey_id = kwargs.get("id")
+        revision = await Survey.objects.filter(id=survey_id).values_list("revision", flat=True).afirst()
+        if revision is None:
+            return json_response({"detail": "Опрос не найден."}, status.HTTP_404_NOT_FOUND)
+
+        etag = matching_etag(request.headers.get("If-None-Match"), survey_etags(survey_id, revision), weak=True)
+        if etag:
+            response = HttpResponseNotModified()
+            patch_vary_headers(response, ["Accept-Encoding"])
+            return self._with_etag(response, etag)
+
+        payload = await survey_payload_cache.aget(survey_id, revision)
+        if payload is None:
+            get_survey_questions_query = GetSurveyQuestionsQuery(
+                survey_model=Survey,
+                survey_serializer=SurveySerializer,
+                document_query=BuildSurveyDocumentQuery(survey_model=Survey),
+            )
+            result, status_code = await get_survey_questions_query.acall(survey_id)
+            if status_code != status.HTTP_200_OK:
+                return json_response(result, status_code)
+
+            payload = compress_payload(ORJSONRenderer().render(result))
+            await survey_payload_cache.aset(survey_id, revision, payload)
+
+        response = encoded_response(payload, request)
+        return self._with_etag(
+            response, make_survey_etag(survey_id, revision, response.get("Content-Encoding", "identity"))
+        )
+
+    @staticmethod
+    def _with_etag(response: HttpResponse, etag: str) -> HttpResponse:
+        response["ETag"] = etag
+        patch_cache_control(response, no_cache=True)
+        return response
+
+
+class AsyncSurveyNextQuestionView(View):
+    """
+    Асинхронный вариант SurveyNextQuestionView: при попадании графа в кэш процесса запрос обходится одним
+    асинхронным чтением ревизии.
+    """
+
+    http_method_names = ["get", "head", "options"]
+
+    async def get(self, request, *args, **kwargs):
+        survey_id = kwargs.get("id")
+        params = NextQuestionRequestSerializer(
+            data={"question_id": request.GET.get("question_id"), "answer_id": request.GET.getlist("answer_id")}
+        )
+        if not params.is_valid():
+            return json_response(params.errors, status.HTTP_400_BAD_REQUEST)
+
+        get_next_question_query = GetNextQuestionQuery(survey_model=Survey, graph_cache=survey_graph_cache)
+        result, status_code = await get_next_question_query.acall(
+            survey_id, params.validated_data["question_id"], params.validated_data["answer_id"]
+        )
+        return json_response(result, status_code)
@@ -0,0 +1,80 @@
+import json
+import os
+import platform
+import statistics
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+import django
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# Размеры синтетических опросов (число вопросов) и число замеров на каждый сценарий
+BENCHMARK_SIZES = [int(size) for size in os.getenv("SURVEY_BENCHMARK_SIZES", "10,1000,10000").split(",")]
+BENCHMARK_ROUNDS = int(os.getenv("SURVEY_BENCHMARK_ROUNDS", 10))
+# по умолчанию отчет пишется в backend/ независимо от каталога запуска
+BENCHMARK_OUTPUT = os.getenv(
+    "SURVEY_BENCHMARK_OUTPUT", str(Path(__file__).resolve().parents[3] / "benchmark-results.json")
+)
+
+
+def percentile(values: list[float], share: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(share * (len(ordered) - 1)))]
+
+
+@pytest.fixture(scope="session")
+def benchmark_results():
+    """
+    Результаты всех сценариев сессии, по окончании записываются в SURVEY_BENCHMARK_OUTPUT.
+    """
+    results = []
+    yield results
+    report = {
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "database": connection.vendor,
+        "rounds": BENCHMARK_ROUNDS,
+        "results": results,
+    }
+    with open(BENCHMARK_OUTPUT, "w", encoding="utf-8") as output:
+        json.dump(report, output, ensure_ascii=False, indent=2)
+
+
+@pytest.fixture
+def benchmark(benchmark_results) -> Callable:
+    """
+    Замеряет сценарий BENCHMARK_ROUNDS раз: перцентили времени и число SQL-запросов за один вызов.
+
+    Превышение бюджета запросов роняет тест, результат при этом все равно попадает в отчет.
+    """
+
+    def run(name: str, size: int, func: Callable[[int], object], query_budget: int) -> dict:
+        durations = []
+        queries = 0
+        for round_number in range(BENCHMARK_ROUNDS):
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                func(round_number)
+                durations.append((time.perf_counter() - started) * 1000)
+            queries = max(queries, len(context.captured_queries))
+
+        result = {
+            "name": name,
+            "questions": size,
+            "queries": queries,
+            "query_budget": query_budget,
+            "ms": {
+                "p50": round(statistics.median(durations), 3),
+                "p95": round(percentile(durations, 0.95), 3),
+                "p99": round(percentile(durations, 0.99), 3),
+                "max": round(max(durations), 3),
+            },
+        }
+        benchmark_results.append(result)
+        assert queries <= query_budget, f"{name} на {size} вопросов: {queries} запросов при бюджете {query_budget}"
+        return result
+
+    return run
@@ -0,0 +1,41 @@
+from ..commands.import_surveys import ImportSurveysCommand
+from ..models import Answer, Question, QuestionAnswer, Survey
+
+
+def make_survey_document(questions_count: int, answers_per_question: int = 3) -> dict:
+    """
+    Документ опроса в формате обмена (см. ExportSurveysQuery) с ветвлением без циклов: ответ k вопроса i
+    ведет на вопрос i + 1 + k, ответы последних вопросов, которым некуда вести, завершают опрос.
+    """
+    questions = []
+    for index in range(questions_count):
+        answers = [
+            {
+                "text": f"Ответ {index}.{sort}",
+                "sort": sort,
+                "next_question_id": index + 1 + sort if index + 1 + sort < questions_count else None,
+            }
+            for sort in range(answers_per_question)
+        ]
+        questions.append(
+            {
+                "id": index,
+                "text": f"Синтетический вопрос {index}",
+                "short_text": f"В{index}",
+                "type": "checkbox" if index % 2 else "radio",
+                "meta": {"position": {"x": index * 300, "y": 0}},
+                "answers": answers,
+            }
+        )
+    return {"name": f"Синтетический опрос на {questions_count} вопросов", "sort": 0, "questions": questions}
+
+
+def create_synthetic_survey(questions_count: int, answers_per_question: int = 3) -> Survey:
+    """
+    Создает синтетический опрос через bulk-загрузку, чтобы подготовка больших опросов не занимала минуты.
+    """
+    import_surveys_command = ImportSurveysCommand(
+        survey_model=Survey, question_model=Question, answer_model=Answer, question_answer_model=QuestionAnswer
+    )
+    import_surveys_command([make_survey_document(questions_count, answers_per_question)])
+    return Survey.objects.order_by("-id").first()
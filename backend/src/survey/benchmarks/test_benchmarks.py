@@ -0,0 +1,118 @@
+import pytest
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from survey.benchmarks.conftest import BENCHMARK_SIZES
+from survey.benchmarks.synthetic import create_synthetic_survey
+from survey.cache import survey_document_cache
+from survey.commands.update_survey import UpdateSurveyCommand
+from survey.graph import survey_graph_cache
+from survey.models import Answer, QuestionAnswer, Survey
+from survey.queries.build_survey_document import BuildSurveyDocumentQuery
+from survey.queries.get_survey_questions import GetSurveyQuestionsQuery
+from survey.serializers import SurveySerializer
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db]
+
+# Бюджеты SQL-запросов на один вызов, не зависят от размера опроса
+QUERY_BUDGETS = {
+    "get_survey_questions.serializer": 3,
+    "get_survey_questions.document": 3,
+    # опрос, вопросы, связи; транзакция (2) с условным UPDATE ревизии и UPDATE вопросов; дерево опроса (3);
+    # вопросы и связи для графа переходов записанной ревизии
+    "update_survey_command": 12,
+    # документ отдается из кэша, читается только ревизия
+    "view.get": 1,
+    "view.get.not_modified": 1,
+    # только команда: ETag строится по записанной ревизии
+    "view.put": 12,
+}
+
+
+def edit_one_question(document: dict, round_number: int) -> dict:
+    """
+    Меняет текст одного вопроса, чтобы каждый PUT действительно писал в БД.
+    """
+    document["questions"][0]["text"] = f"Синтетический вопрос 0, правка {round_number}"
+    return document
+
+
+@pytest.fixture(params=BENCHMARK_SIZES, ids=lambda size: f"{size}q")
+def survey(request) -> Survey:
+    survey_graph_cache.clear()
+    survey_document_cache.backend.clear()
+    return create_synthetic_survey(questions_count=request.param)
+
+
+class TestQueryBenchmarks:
+    def test_get_survey_questions(self, survey, benchmark):
+        size = survey.questions.count()
+        serializer_query = GetSurveyQuestionsQuery(survey_model=Survey, survey_serializer=SurveySerializer)
+        document_query = GetSurveyQuestionsQuery(
+            survey_model=Survey,
+            survey_serializer=SurveySerializer,
+            document_query=BuildSurveyDocumentQuery(survey_model=Survey),
+        )
+
+        benchmark(
+            "get_survey_questions.serializer",
+            size,
+            lambda _: serializer_query(survey.id),
+            QUERY_BUDGETS["get_survey_questions.serializer"],
+        )
+        benchmark(
+            "get_survey_questions.document",
+            size,
+            lambda _: document_query(survey.id),
+            QUERY_BUDGETS["get_survey_questions.document"],
+        )
+
+    def test_update_survey_command(self, survey, benchmark):
+        size = survey.questions.count()
+        command = UpdateSurveyCommand(
+            survey_model=Survey,
+            survey_serializer=SurveySerializer,
+            answer_model=Answer,
+            question_answer_model=QuestionAnswer,
+            graph_cache=survey_graph_cache,
+        )
+        document = BuildSurveyDocumentQuery(survey_model=Survey)(survey.id)[0]
+
+        def update(round_number: int):
+            result, status_code = command(survey.id, edit_one_question(document, round_number))
+            assert status_code == status.HTTP_200_OK
+            document["revision"] = result["revision"]
+
+        benchmark("update_survey_command", size, update, QUERY_BUDGETS["update_survey_command"])
+
+
+class TestViewBenchmarks:
+    def test_get(self, survey, benchmark):
+        size = survey.questions.count()
+        client = APIClient()
+        url = reverse("survey-detail", kwargs={"id": survey.id})
+        etag = client.get(url)["ETag"]
+
+        benchmark("view.get", size, lambda _: client.get(url), QUERY_BUDGETS["view.get"])
+        benchmark(
+            "view.get.not_modified",
+            size,
+            lambda _: client.get(url, HTTP_IF_NONE_MATCH=etag),
+            QUERY_BUDGETS["view.get.not_modified"],
+        )
+
+    # документ на 10000 вопросов больше DATA_UPLOAD_MAX_MEMORY_SIZE по умолчанию (2.5 МБ)
+    @override_settings(DATA_UPLOAD_MAX_MEMORY_SIZE=None)
+    def test_put(self, survey, benchmark):
+        size = survey.questions.count()
+        client = APIClient()
+        url = reverse("survey-detail", kwargs={"id": survey.id})
+        document = client.get(url).json()
+
+        def put(round_number: int):
+            response = client.put(url, edit_one_question(document, round_number), format="json")
+            assert response.status_code == status.HTTP_200_OK
+            document["revision"] = response.json()["revision"]
+
+        benchmark("view.put", size, put, QUERY_BUDGETS["view.put"])
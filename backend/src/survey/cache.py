@@ -0,0 +1,82 @@
+import threading
+
+from django.core.cache import caches
+
+
+class SurveyDocumentCache:
+    """
+    Кэш сериализованных документов опросов.
+
+    Ключ документа состоит из id опроса и его ревизии (Survey.revision). UpdateSurveyCommand увеличивает ревизию
+    в своей транзакции, поэтому после изменения опроса старая запись больше не читается и со временем вытесняется
+    самим бэкендом кэша (LRU с ограничением размера, см. CACHES["surveys"] в настройках).
+    """
+
+    def __init__(self, alias: str = "surveys"):
+        self.alias: str = alias
+        self.hits: int = 0
+        self.misses: int = 0
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    @staticmethod
+    def make_key(survey_id: int, revision: int) -> str:
+        return f"survey:{survey_id}:r{revision}"
+
+    def get(self, survey_id: int, revision: int) -> dict | None:
+        """
+        Возвращает документ опроса нужной ревизии или None, если его нет в кэше.
+        """
+        document = self.backend.get(self.make_key(survey_id, revision))
+        self._count(document)
+        return document
+
+    async def aget(self, survey_id: int, revision: int) -> dict | None:
+        """
+        Асинхронный вариант get для async-представлений.
+        """
+        document = await self.backend.aget(self.make_key(survey_id, revision))
+        self._count(document)
+        return document
+
+    def set(self, survey_id: int, revision: int, document: dict) -> None:
+        self.backend.set(self.make_key(survey_id, revision), document)
+
+    async def aset(self, survey_id: int, revision: int, document: dict) -> None:
+        await self.backend.aset(self.make_key(survey_id, revision), document)
+
+    def _count(self, document: dict | None) -> None:
+        with self._lock:
+            if document is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+    def stats(self) -> dict:
+        """
+        Счетчики попаданий и промахов текущего процесса.
+        """
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {"hits": hits, "misses": misses, "hit_ratio": hits / total if total else 0.0}
+
+
+class SurveyPayloadCache(SurveyDocumentCache):
+    """
+    Готовые тела ответа GET опроса в JSON: без сжатия и в gzip и brotli (см. survey.compression).
+
+    Хранятся в том же бэкенде и по той же ревизии, что и документы, поэтому сжатие выполняется один раз на ревизию,
+    а не на каждый запрос, и устаревает вместе с документом.
+    """
+
+    @staticmethod
+    def make_key(survey_id: int, revision: int) -> str:
+        return f"survey:{survey_id}:r{revision}:json"
+
+
+survey_document_cache = SurveyDocumentCache()
+survey_payload_cache = SurveyPayloadCache()
@@ -0,0 +1,160 @@
+from collections.abc import Iterable
+
+from django.db import transaction
+
+from ..models import Answer, Question, QuestionAnswer, Survey
+
+
+class SurveyImportError(ValueError):
+    pass
+
+
+class ImportSurveysCommand:
+
+    def __init__(
+        self,
+        survey_model: type[Survey],
+        question_model: type[Question],
+        answer_model: type[Answer],
+        question_answer_model: type[QuestionAnswer],
+        batch_size: int = 500,
+    ):
+        self.survey_model: type[Survey] = survey_model
+        self.question_model: type[Question] = question_model
+        self.answer_model: type[Answer] = answer_model
+        self.question_answer_model: type[QuestionAnswer] = question_answer_model
+        self.batch_size: int = batch_size
+
+    def __call__(self, documents: Iterable[dict]) -> dict:
+        """
+        Загружает опросы из формата обмена (см. ExportSurveysQuery) в одной транзакции.
+
+        Документы обрабатываются пачками по batch_size опросов: опросы, вопросы, ответы и связи вставляются
+        четырьмя bulk_create на пачку. id из документа не переносятся - база выдает новые, а next_question_id
+        переводятся в новые id вопросов одним проходом после вставки вопросов пачки, поэтому связи создаются
+        сразу готовыми, без последующих UPDATE.
+
+        :param documents: Документы опросов.
+        :return: Число загруженных опросов, вопросов и ответов.
+        :raises SurveyImportError: Документ с номером (с нуля) некорректен, ничего не загружено.
+        """
+
+        totals = {"surveys": 0, "questions": 0, "answers": 0}
+        with transaction.atomic():
+            batch = []
+            for index, document in enumerate(documents):
+                self._validate(index, document)
+                batch.append(document)
+                if len(batch) == self.batch_size:
+                    self._import_batch(batch, totals)
+                    batch = []
+            if batch:
+                self._import_batch(batch, totals)
+        return totals
+
+    def _import_batch(self, documents: list[dict], totals: dict) -> None:
+        surveys = self.survey_model.objects.bulk_create(
+            [self.survey_model(name=document["name"], sort=document.get("sort", 0)) for document in documents]
+        )
+
+        questions = [
+            self.question_model(
+                survey=survey,
+                text=question["text"],
+                short_text=question["short_text"],
+                q_type=question["type"],
+                meta=question.get("meta") or {},
+            )
+            for survey, document in zip(surveys, documents)
+            for question in document["questions"]
+        ]
+        self.question_model.objects.bulk_create(questions)
+
+        # id вопроса в документе -> новый id, отдельно для каждого опроса пачки
+        created = iter(questions)
+        answers = []
+        links = []
+        for survey, document in zip(surveys, documents):
+            question_ids = {question["id"]: next(created).id for question in document["questions"]}
+            for question in document["questions"]:
+                for answer in question["answers"]:
+                    answers.append(self.answer_model(survey=survey, text=answer["text"], sort=answer.get("sort", 0)))
+                    next_question_id = answer.get("next_question_id")
+                    links.append((question_ids[question["id"]], question_ids.get(next_question_id)))
+        self.answer_model.objects.bulk_create(answers)
+
+        # bulk_create не вызывает QuestionAnswer.save(), поэтому опрос связи указывается явно
+        self.question_answer_model.objects.bulk_create(
+            [
+                self.question_answer_model(
+                    survey_id=answer.survey_id,
+                    question_id=question_id,
+                    answer=answer,
+                    next_question_id=next_question_id,
+                )
+                for answer, (question_id, next_question_id) in zip(answers, links)
+            ]
+        )
+
+        totals["surveys"] += len(surveys)
+        totals["questions"] += len(questions)
+        totals["answers"] += len(answers)
+
+    def _validate(self, index: int, document: dict) -> None:
+        """
+        Проверяет структуру документа и ограничения полей моделей до записи, чтобы ошибка указывала на конкретный
+        опрос, а не на пачку, отвергнутую базой.
+        """
+        if not isinstance(document, dict) or not isinstance(document.get("name"), str):
+            raise SurveyImportError(f"Опрос {index}: ожидается объект с полями name и questions.")
+        if not isinstance(document.get("questions"), list):
+            raise SurveyImportError(f"Опрос {index}: questions должен быть списком.")
+        if len(document["name"]) > self._max_length(self.survey_model, "name"):
+            raise SurveyImportError(f"Опрос {index}: слишком длинное название.")
+        if not self._is_sort(document.get("sort", 0)):
+            raise SurveyImportError(f"Опрос {index}: sort должен быть 32-битным целым числом.")
+
+        types = {q_type for q_type, _ in self.question_model.TYPE_CHOICES}
+        short_text_length = self._max_length(self.question_model, "short_text")
+        question_ids = set()
+        for question in document["questions"]:
+            if not isinstance(question, dict) or not isinstance(question.get("id"), int):
+                raise SurveyImportError(f"Опрос {index}: у вопроса должен быть целочисленный id.")
+            if question["id"] in question_ids:
+                raise SurveyImportError(f"Опрос {index}: вопрос id={question['id']} повторяется.")
+            texts = (question.get("text"), question.get("short_text"))
+            valid = all(isinstance(text, str) for text in texts) and isinstance(question.get("answers"), list)
+            if not valid or question.get("type") not in types:
+                raise SurveyImportError(f"Опрос {index}: у вопроса id={question['id']} неверные поля.")
+            if len(question["short_text"]) > short_text_length:
+                raise SurveyImportError(f"Опрос {index}: у вопроса id={question['id']} слишком длинный short_text.")
+            question_ids.add(question["id"])
+
+        text_length = self._max_length(self.answer_model, "text")
+        for question in document["questions"]:
+            for answer in question["answers"]:
+                next_question_id = answer.get("next_question_id") if isinstance(answer, dict) else None
+                if not isinstance(answer, dict) or not isinstance(answer.get("text"), str):
+                    raise SurveyImportError(f"Опрос {index}: у ответа вопроса id={question['id']} нет текста.")
+                if len(answer["text"]) > text_length:
+                    raise SurveyImportError(
+                        f"Опрос {index}: у ответа вопроса id={question['id']} текст длиннее {text_length} символов."
+                    )
+                if not self._is_sort(answer.get("sort", 0)):
+                    raise SurveyImportError(
+                        f"Опрос {index}: у ответа вопроса id={question['id']} sort должен быть 32-битным целым числом."
+                    )
+                known = isinstance(next_question_id, int) and next_question_id in question_ids
+                if next_question_id is not None and not known:
+                    raise SurveyImportError(
+                        f"Опрос {index}: ответ ведет на вопрос id={next_question_id}, которого нет в опросе."
+                    )
+
+    @staticmethod
+    def _max_length(model, field: str) -> int:
+        return model._meta.get_field(field).max_length
+
+    @staticmethod
+    def _is_sort(value) -> bool:
+        # IntegerField модели: 32-битное целое со знаком, отрицательные значения PUT и PATCH тоже принимают
+        return isinstance(value, int) and not isinstance(value, bool) and -(2**31) <= value <= 2**31 - 1
@@ -0,0 +1,115 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+
+from ..counters import ResponseCounters
+from ..graph import SurveyGraph, SurveyGraphCache, SurveyGraphError
+from ..models import RespondentAnswer, Survey
+
+
+class IngestResponsesCommand:
+
+    def __init__(
+        self,
+        survey_model: type[Survey],
+        respondent_answer_model: type[RespondentAnswer],
+        graph_cache: SurveyGraphCache,
+    ):
+        self.survey_model: type[Survey] = survey_model
+        self.respondent_answer_model: type[RespondentAnswer] = respondent_answer_model
+        self.graph_cache: SurveyGraphCache = graph_cache
+
+    def __call__(self, survey_id: int, data: dict | list[dict]) -> tuple[dict, int]:
+        """
+        Метод сохраняет пачку ответов респондентов.
+
+        Каждый элемент пачки - ответы одного респондента:
+            {"respondent_id": "...", "answers": [{"question_id": 1, "answer_ids": [2, 3]}, ...]}
+        Элементы проверяются по скомпилированному графу текущей ревизии опроса без запросов в БД, корректные
+        записываются через bulk_create пачками по SURVEY_RESPONSES_BATCH_SIZE строк, некорректные возвращаются
+        в rejected с номером элемента и причиной.
+        Args:
+            survey_id(int): чаcть URL запроса
+            data(dict | list[dict]): список элементов или {"responses": [...]}
+
+        Returns:
+            tuple[dict, int]: Кортеж из итогов загрузки и статуса ответа
+        """
+        revision: int | None = self.survey_model.objects.filter(id=survey_id).values_list("revision", flat=True).first()
+        if revision is None:
+            return {"detail": "Опрос не найден."}, status.HTTP_404_NOT_FOUND
+
+        items = data.get("responses", []) if isinstance(data, dict) else data
+        if not isinstance(items, list):
+            return {"detail": "Ожидается список ответов респондентов."}, status.HTTP_400_BAD_REQUEST
+
+        graph = self.graph_cache.get(survey_id, revision)
+        submitted_at = timezone.now()
+        counters = ResponseCounters(graph)
+        rows: list[RespondentAnswer] = []
+        accepted = 0
+        rejected = []
+        for index, item in enumerate(items):
+            try:
+                respondent_id, selection = self._select_answers(graph, item)
+            except SurveyGraphError as e:
+                rejected.append({"index": index, "detail": str(e)})
+                continue
+            rows.extend(self._build_rows(graph, respondent_id, selection, submitted_at))
+            counters.add(selection)
+            accepted += 1
+
+        with transaction.atomic():
+            self.respondent_answer_model.objects.bulk_create(rows, batch_size=settings.SURVEY_RESPONSES_BATCH_SIZE)
+            counters.flush()
+
+        status_code = status.HTTP_400_BAD_REQUEST if rejected and not accepted else status.HTTP_201_CREATED
+        return {"accepted": accepted, "rows": len(rows), "rejected": rejected}, status_code
+
+    @staticmethod
+    def _select_answers(graph: SurveyGraph, item: dict) -> tuple[str, dict[int, list[int]]]:
+        """
+        Метод проверяет ответы одного респондента
+        Args:
+            graph(SurveyGraph) - граф текущей ревизии опроса
+            item(dict) - ответы респондента
+        Returns:
+            tuple[str, dict[int, list[int]]]: respondent_id и индексы выбранных связей по id вопроса
+        """
+        if not isinstance(item, dict) or not isinstance(item.get("answers"), list):
+            raise SurveyGraphError("Ожидается объект с полями respondent_id и answers.")
+
+        respondent_id = item.get("respondent_id")
+        if not isinstance(respondent_id, str) or not 0 < len(respondent_id) <= 64:
+            raise SurveyGraphError("respondent_id должен быть непустой строкой не длиннее 64 символов.")
+
+        selection = {}
+        for answer in item["answers"]:
+            answer_ids = answer.get("answer_ids") if isinstance(answer, dict) else None
+            valid_ids = isinstance(answer_ids, list) and all(isinstance(answer_id, int) for answer_id in answer_ids)
+            if not valid_ids or not isinstance(answer.get("question_id"), int):
+                raise SurveyGraphError("Ожидается объект с целочисленными question_id и answer_ids.")
+            question_id = answer["question_id"]
+            if question_id in selection:
+                raise SurveyGraphError(f"Ответы на вопрос id={question_id} переданы несколько раз.")
+            selection[question_id] = graph.selected_answers(question_id, answer["answer_ids"])
+        return respondent_id, selection
+
+    def _build_rows(
+        self, graph: SurveyGraph, respondent_id: str, selection: dict[int, list[int]], submitted_at
+    ) -> list[RespondentAnswer]:
+        """
+        Метод строит несохраненные строки для вставки по проверенным ответам респондента
+        """
+        return [
+            self.respondent_answer_model(
+                survey_id=graph.survey_id,
+                question_id=question_id,
+                answer_id=graph.answer_ids[slot],
+                respondent_id=respondent_id,
+                submitted_at=submitted_at,
+            )
+            for question_id, slots in selection.items()
+            for slot in slots
+        ]
@@ -0,0 +1,181 @@
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+
+from ..models import Answer, Question, QuestionAnswer, Survey
+from ..serializers import (
+    AnswerSerializer,
+    QuestionFieldsSerializer,
+    SurveyPatchOperationSerializer,
+)
+from ..timing import span
+from .update_survey import UpdateSurveyCommand
+
+
+class PatchSurveyCommand(UpdateSurveyCommand):
+    """
+    Частичное обновление опроса списком операций.
+
+    Поддерживаемые операции:
+        {"op": "update_question", "id": 1, "text": "...", "short_text": "...", "type": "radio", "meta": {...}}
+        {"op": "update_answer", "id": 5, "text": "...", "sort": 2}
+        {"op": "set_next_question", "question_id": 1, "answer_id": 5, "next_question_id": 7}
+
+    В операциях update_* передаются только изменившиеся поля.
+    """
+
+    QUESTION_FIELDS = {"text": "text", "short_text": "short_text", "type": "q_type", "meta": "meta"}
+    ANSWER_FIELDS = {"text": "text", "sort": "sort"}
+
+    def __call__(
+        self, survey_id: int, data: dict | list[dict], expected_revision: int | None = None
+    ) -> tuple[dict, int]:
+        """
+        Метод применяет операции в одной короткой транзакции с проверкой ревизии (см. UpdateSurveyCommand._save)
+        и возвращает только затронутые вопросы и ответы
+        Args:
+            survey_id(int): чаcть URL запроса
+            data(dict | list[dict]): {"revision": 3, "operations": [...]} или сам список операций
+            expected_revision(int | None): ревизия, которую видел клиент (If-Match)
+
+        Returns:
+            tuple[dict, int]: Кортеж из ревизии опроса после записи, затронутых вопросов и ответов и статуса ответа
+        """
+        survey: Survey | None = self.survey_model.objects.filter(id=survey_id).first()
+        if not survey:
+            return {"detail": "Опрос не найден."}, status.HTTP_404_NOT_FOUND
+
+        stale = self._check_revision(survey, data, expected_revision)
+        if stale:
+            return stale
+
+        operations = data.get("operations", []) if isinstance(data, dict) else data
+        if not isinstance(operations, list) or not all(isinstance(operation, dict) for operation in operations):
+            return {"detail": "Ожидается список операций."}, status.HTTP_400_BAD_REQUEST
+
+        operations_serializer = SurveyPatchOperationSerializer(data=operations, many=True)
+        if not operations_serializer.is_valid():
+            return {"operations": operations_serializer.errors}, status.HTTP_400_BAD_REQUEST
+        operations = operations_serializer.validated_data
+
+        try:
+            questions, answers = self._apply_operations(survey, operations)
+            writes = self._operation_writes(questions, answers)
+            revision = survey.revision
+            if writes:
+                revision = self._save(survey, {}, writes)
+                if revision is None:
+                    return self._conflict(expected_revision)
+
+        except ValidationError as e:
+            return {"detail": str(e)}, status.HTTP_400_BAD_REQUEST
+
+        except Exception as e:
+            return {"detail": f"Произошла ошибка: {str(e)}"}, status.HTTP_500_INTERNAL_SERVER_ERROR
+
+        with span("survey.serialize"):
+            data = {
+                "revision": revision,
+                "questions": QuestionFieldsSerializer(questions["affected"].values(), many=True).data,
+                "answers": AnswerSerializer(answers["affected"].values(), many=True).data,
+            }
+        return self._with_validation(survey.id, revision, data), status.HTTP_200_OK
+
+    def _apply_operations(self, survey: Survey, operations: list[dict]) -> tuple[dict, dict]:
+        """
+        Метод загружает только строки, упомянутые в операциях, и применяет к ним операции в памяти
+        Args:
+            survey(Survey) - oбъект модели Опрос
+            operations(list[dict]) - список операций
+        Returns:
+            tuple[dict, dict]: затронутые и измененные вопросы, затронутые и измененные ответы и связи
+        """
+        question_ids = set()
+        answer_ids = set()
+        for operation in operations:
+            op = operation.get("op")
+            if op == "update_question":
+                question_ids.add(operation.get("id"))
+            elif op == "update_answer":
+                answer_ids.add(operation.get("id"))
+            elif op == "set_next_question":
+                question_ids.update((operation.get("question_id"), operation.get("next_question_id")))
+                answer_ids.add(operation.get("answer_id"))
+            else:
+                raise ValidationError(f"Неизвестная операция {op}.")
+
+        existing_questions: dict[int, Question] = {q.id: q for q in survey.questions.filter(id__in=question_ids)}
+        existing_qas: dict[tuple[int, int], QuestionAnswer] = {}
+        existing_answers: dict[int, Answer] = {}
+        if answer_ids:
+            question_answers = self.question_answer_model.objects.filter(
+                survey=survey, answer_id__in=answer_ids
+            ).select_related("answer")
+            for qa in question_answers:
+                existing_qas[(qa.question_id, qa.answer_id)] = qa
+                answer = existing_answers.setdefault(qa.answer_id, qa.answer)
+                if getattr(answer, "question_answer", None) is None:
+                    answer.question_answer = qa
+
+        questions = {"affected": {}, "changed": {}, "fields": set()}
+        answers = {"affected": {}, "changed": {}, "fields": set(), "changed_links": {}}
+
+        for operation in operations:
+            op = operation["op"]
+            if op == "update_question":
+                question_id = operation.get("id")
+                if question_id not in existing_questions:
+                    raise ValidationError(f"Вопрос с id={question_id} не найден в текущем опросе.")
+                question = existing_questions[question_id]
+                values = {field: operation[key] for key, field in self.QUESTION_FIELDS.items() if key in operation}
+                if self._assign_changed(question, values, questions["fields"]):
+                    questions["changed"][question_id] = question
+                questions["affected"][question_id] = question
+
+            elif op == "update_answer":
+                answer_id = operation.get("id")
+                if answer_id not in existing_answers:
+                    raise ValidationError(f"Ответ с id={answer_id} не найден.")
+                answer = existing_answers[answer_id]
+                values = {field: operation[key] for key, field in self.ANSWER_FIELDS.items() if key in operation}
+                if self._assign_changed(answer, values, answers["fields"]):
+                    answers["changed"][answer_id] = answer
+                answers["affected"][answer_id] = answer
+
+            else:
+                question_id, answer_id = operation.get("question_id"), operation.get("answer_id")
+                qa_key = (question_id, answer_id)
+                if qa_key not in existing_qas:
+                    raise ValidationError(f"Связь для вопроса id={question_id} и ответа id={answer_id} не найдена.")
+                next_question_id = operation.get("next_question_id")
+                if next_question_id is not None and next_question_id not in existing_questions:
+                    raise ValidationError(f"Следующий вопрос с id={next_question_id} не найден в опросе.")
+
+                qa = existing_qas[qa_key]
+                if qa.next_question_id != (next_question_id or None):
+                    qa.next_question_id = next_question_id or None
+                    answers["changed_links"][qa.id] = qa
+                answer = existing_answers[answer_id]
+                answer.question_answer = qa
+                answers["affected"][answer_id] = answer
+
+        return questions, answers
+
+    def _operation_writes(self, questions: dict, answers: dict) -> list[tuple]:
+        """
+        Метод готовит запись изменений одним bulk_update на модель
+        Args:
+            questions(dict) - затронутые и измененные вопросы (см. _apply_operations)
+            answers(dict) - затронутые и измененные ответы и связи
+        Returns:
+            list[tuple]: записи для _save
+        """
+        writes = []
+        if questions["changed"]:
+            writes.append((Question.objects, list(questions["changed"].values()), sorted(questions["fields"])))
+        if answers["changed"]:
+            writes.append((self.answer_model.objects, list(answers["changed"].values()), sorted(answers["fields"])))
+        if answers["changed_links"]:
+            writes.append(
+                (self.question_answer_model.objects, list(answers["changed_links"].values()), ["next_question"])
+            )
+        return writes
@@ -0,0 +1,58 @@
+from rest_framework import status
+
+from ..compression import compress_payload
+from ..models import Question, QuestionAnswer, Survey
+from ..queries.build_survey_document import BuildSurveyDocumentQuery
+from ..renderers import ORJSONRenderer
+from ..snapshots import SnapshotStore, build_snapshot
+from ..timing import span
+
+
+class PublishSurveyCommand:
+
+    def __init__(self, survey_model: type[Survey], snapshot_store: SnapshotStore):
+        self.survey_model: type[Survey] = survey_model
+        self.snapshot_store: SnapshotStore = snapshot_store
+
+    def __call__(self, survey_id: int) -> tuple[dict, int]:
+        """
+        Публикует текущую ревизию опроса: замораживает вопросы, ответы и связи в файл снимка (survey.snapshots),
+        из которого эндпоинты для респондентов читают без обращения к БД.
+
+        Данные читаются без транзакции, после чтения ревизия опроса запрашивается еще раз: если она изменилась,
+        снимок мог бы смешать две ревизии, поэтому он не записывается и возвращается 409.
+
+        :param survey_id: ID опроса.
+        :return: Кортеж из опубликованной ревизии и размера снимка и HTTP-статуса.
+        """
+
+        with span("survey.load"):
+            survey = self.survey_model.objects.filter(id=survey_id).values_list("id", "name", "revision").first()
+            if survey is None:
+                return {"detail": "Опрос не найден."}, status.HTTP_404_NOT_FOUND
+
+            questions = list(
+                Question.objects.filter(survey_id=survey_id)
+                .order_by("pk")
+                .values_list(*BuildSurveyDocumentQuery.QUESTION_FIELDS)
+            )
+            question_answers = list(
+                QuestionAnswer.objects.filter(survey_id=survey_id)
+                .order_by("pk")
+                .values_list(*BuildSurveyDocumentQuery.ANSWER_FIELDS)
+            )
+            revision = self.survey_model.objects.filter(id=survey_id).values_list("revision", flat=True).first()
+        if revision != survey[2]:
+            return {"detail": "Опрос был изменен во время публикации."}, status.HTTP_409_CONFLICT
+
+        with span("survey.serialize"):
+            document, _ = BuildSurveyDocumentQuery.build(survey, questions, question_answers)
+            payload = compress_payload(ORJSONRenderer().render(document))
+            # связи вопроса в порядке Answer.sort, как в SurveyGraph.compile
+            links = sorted(question_answers, key=lambda link: (link[0], link[3], link[1]))
+            data = build_snapshot(survey, questions, links, payload)
+
+        with span("survey.write"):
+            self.snapshot_store.publish(survey_id, data)
+
+        return {"survey_id": survey_id, "revision": survey[2], "size": len(data)}, status.HTTP_200_OK
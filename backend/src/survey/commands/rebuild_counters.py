@@ -0,0 +1,75 @@
+from collections.abc import Iterator
+from itertools import groupby
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import transaction
+
+from ..counters import ResponseCounters
+from ..graph import SurveyGraph, SurveyGraphCache, SurveyGraphError
+from ..models import AnswerCounter, QuestionCounter, RespondentAnswer, Survey
+
+
+class RebuildCountersCommand:
+
+    def __init__(
+        self,
+        survey_model: type[Survey],
+        respondent_answer_model: type[RespondentAnswer],
+        graph_cache: SurveyGraphCache,
+    ):
+        self.survey_model: type[Survey] = survey_model
+        self.respondent_answer_model: type[RespondentAnswer] = respondent_answer_model
+        self.graph_cache: SurveyGraphCache = graph_cache
+
+    def __call__(self, survey_id: int) -> dict | None:
+        """
+        Пересчитывает счетчики опроса (AnswerCounter, QuestionCounter) по сохраненным ответам респондентов.
+
+        reached_count и drop_off_count зависят от маршрута респондента, поэтому ответы не агрегируются в БД,
+        а читаются серверным курсором, группируются по отправкам (одинаковые respondent_id и submitted_at)
+        и прогоняются через ResponseCounters по графу текущей ревизии, как при загрузке. Ответы, которых больше
+        нет в опросе, пропускаются. Старые счетчики удаляются и записываются заново в одной транзакции.
+
+        :param survey_id: ID опроса.
+        :return: Число учтенных отправок и строк или None, если опрос не найден.
+        """
+
+        revision: int | None = self.survey_model.objects.filter(id=survey_id).values_list("revision", flat=True).first()
+        if revision is None:
+            return None
+
+        graph = self.graph_cache.get(survey_id, revision)
+        counters = ResponseCounters(graph)
+        totals = {"submissions": 0, "rows": 0}
+        with transaction.atomic():
+            AnswerCounter.objects.filter(survey_id=survey_id).delete()
+            QuestionCounter.objects.filter(survey_id=survey_id).delete()
+            for selection, rows in self._submissions(graph):
+                counters.add(selection)
+                totals["submissions"] += 1
+                totals["rows"] += rows
+            counters.flush()
+        return totals
+
+    def _submissions(self, graph: SurveyGraph) -> Iterator[tuple[dict[int, list[int]], int]]:
+        """
+        Выбор каждой отправки в виде ResponseCounters.add и число ее строк.
+        """
+        rows = (
+            self.respondent_answer_model.objects.filter(survey_id=graph.survey_id)
+            .order_by("respondent_id", "submitted_at", "id")
+            .values_list("respondent_id", "submitted_at", "question_id", "answer_id")
+            .iterator(chunk_size=settings.SURVEY_EXPORT_CHUNK_SIZE)
+        )
+        for _, submission in groupby(rows, key=itemgetter(0, 1)):
+            selection: dict[int, list[int]] = {}
+            count = 0
+            for _, _, question_id, answer_id in submission:
+                count += 1
+                try:
+                    slots = graph.selected_answers(question_id, [answer_id])
+                except SurveyGraphError:
+                    continue
+                selection.setdefault(question_id, []).extend(slots)
+            yield {question_id: sorted(slots) for question_id, slots in selection.items()}, count
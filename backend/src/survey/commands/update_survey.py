@@ -1,9 +1,13 @@
 from django.db import transaction
+from django.db.models import F
 from rest_framework import status
 from rest_framework.exceptions import ValidationError
 
-from ..models import Answer, QuestionAnswer, Survey
+from ..graph import SurveyGraphCache
+from ..models import Answer, Question, QuestionAnswer, Survey
+from ..queries.load_survey_tree import LoadSurveyTreeQuery
 from ..serializers import SurveySerializer
+from ..timing import span
 
 
 class UpdateSurveyCommand:
@@ -14,40 +18,54 @@ class UpdateSurveyCommand:
         survey_serializer: type[SurveySerializer],
         answer_model: type[Answer],
         question_answer_model: type[QuestionAnswer],
+        graph_cache: SurveyGraphCache | None = None,
     ):
         self.survey_model: type[Survey] = survey_model
         self.survey_serializer: type[SurveySerializer] = survey_serializer
         self.answer_model: type[Answer] = answer_model
         self.question_answer_model: type[QuestionAnswer] = question_answer_model
+        self.graph_cache: SurveyGraphCache | None = graph_cache
 
-    def __call__(self, survey_id: int, data: dict | list[dict]) -> tuple[dict, int]:
+    def __call__(
+        self, survey_id: int, data: dict | list[dict], expected_revision: int | None = None
+    ) -> tuple[dict, int]:
         """
-        Метод обновляет тексты вопросов и ответов и связи между ними в БД и возвращает обновленные данные
+        Метод обновляет тексты вопросов и ответов и связи между ними в БД и возвращает обновленные данные.
+
+        Изменения вычисляются вне транзакции по прочитанной ревизии опроса и записываются короткой транзакцией
+        (см. _save), строки не блокируются на время сравнения и сериализации
         Args:
             survey_id(int): чаcть URL запроса
-            data(dict | list[dict]): данные запроса
+            data(dict | list[dict]): данные запроса. Поле revision - ревизия, которую видел клиент: если опрос
+                уже изменен, изменения не применяются и возвращается 409
+            expected_revision(int | None): ревизия, которую видел клиент (If-Match). Если опрос уже изменен,
+                изменения не применяются и возвращается 412
 
         Returns:
-            tuple[dict, int]: Кортеж из сериализованных данных и статуса ответа
+            tuple[dict, int]: Кортеж из сериализованных данных и статуса ответа. Если команде передан кэш графов,
+                в данные добавляется отчет о проверке графа переходов (validation) записанной ревизии
         """
         survey: Survey | None = self.survey_model.objects.filter(id=survey_id).first()
         if not survey:
             return {"detail": "Опрос не найден."}, status.HTTP_404_NOT_FOUND
 
-        questions_data: list | dict = data.get("questions", []) if isinstance(data, dict) else data
-        if not questions_data:
-            self._update_survey_name(survey, data)
-            serializer = self.survey_serializer(survey)
-
-            return serializer.data, status.HTTP_200_OK
+        stale = self._check_revision(survey, data, expected_revision)
+        if stale:
+            return stale
 
+        questions_data: list | dict = data.get("questions", []) if isinstance(data, dict) else data
         try:
-            with transaction.atomic():
-                self._update_survey_name(survey, data)
-                self._update_questions(survey, questions_data)
-                self._update_answers_and_links(survey, questions_data)
-                serializer = self.survey_serializer(survey)
-                return serializer.data, status.HTTP_200_OK
+            survey_changes = self._update_survey_name(survey, data)
+            writes = []
+            if questions_data:
+                existing_questions = {q.id: q for q in survey.questions.all()}
+                writes += self._update_questions(existing_questions, questions_data)
+                writes += self._update_answers_and_links(survey, existing_questions, questions_data)
+            revision = survey.revision
+            if survey_changes or writes:
+                revision = self._save(survey, survey_changes, writes)
+                if revision is None:
+                    return self._conflict(expected_revision)
 
         except ValidationError as e:
             return {"detail": str(e)}, status.HTTP_400_BAD_REQUEST
@@ -55,29 +73,132 @@ class UpdateSurveyCommand:
         except Exception as e:
             return {"detail": f"Произошла ошибка: {str(e)}"}, status.HTTP_500_INTERNAL_SERVER_ERROR
 
-    def _update_survey_name(self, survey: Survey, data: dict) -> None:
+        return self._with_validation(survey.id, revision, self._serialize_survey(survey.id)), status.HTTP_200_OK
+
+    def _serialize_survey(self, survey_id: int) -> dict:
+        """
+        Метод загружает и сериализует опрос после изменения
+        Args:
+            survey_id(int) - id опроса
+        Returns:
+            dict: сериализованный опрос
+        """
+        with span("survey.load"):
+            survey = LoadSurveyTreeQuery(survey_model=self.survey_model)(survey_id)
+        with span("survey.serialize"):
+            return self.survey_serializer(survey).data
+
+    def _with_validation(self, survey_id: int, revision: int, data: dict) -> dict:
+        """
+        Метод добавляет к ответу отчет о проверке графа переходов ревизии, записанной командой. Ревизия не
+        перечитывается: иначе отчет мог бы описывать уже следующую, чужую правку
+        Args:
+            survey_id(int) - id опроса
+            revision(int) - ревизия, записанная командой (см. _save)
+            data(dict) - сериализованный опрос (или затронутые сущности)
+        Returns:
+            dict: данные с ключом validation, если команде передан кэш графов
+        """
+        if self.graph_cache is None:
+            return data
+        with span("survey.validate"):
+            return {**data, "validation": self.graph_cache.get(survey_id, revision).validate()}
+
+    def _update_survey_name(self, survey: Survey, data: dict) -> dict:
         """
-        Метод обновляет название опроса
+        Метод сравнивает название опроса с пришедшим
         Args:
             survey(Survey) - oбъект модели Опрос
             data(dict) - данные запроса
         Returns:
-            None
+            dict: изменившиеся поля опроса, записываются вместе с ревизией (см. _bump_revision)
         """
-        if "name" in data:
-            survey.name = data["name"]
-            survey.save()
+        if isinstance(data, dict) and "name" in data and data["name"] != survey.name:
+            return {"name": data["name"]}
+        return {}
 
-    def _update_questions(self, survey: Survey, questions_data: list[dict]) -> None:
+    def _check_revision(self, survey: Survey, data: dict | list, expected_revision: int | None) -> tuple | None:
         """
-        Метод обновляет текст вопросов
+        Метод сверяет прочитанную ревизию опроса с ревизией из If-Match и из поля revision запроса
         Args:
             survey(Survey) - oбъект модели Опрос
+            data(dict | list) - данные запроса
+            expected_revision(int | None) - ревизия из If-Match, None - без проверки
+        Returns:
+            tuple | None: ответ 412 или 409, если клиент видел устаревшую ревизию, иначе None
+        """
+        if expected_revision is not None and survey.revision != expected_revision:
+            return self._precondition_failed()
+
+        revision = data.get("revision") if isinstance(data, dict) else None
+        if revision is None:
+            return None
+        if not isinstance(revision, int) or isinstance(revision, bool):
+            return {"detail": "Поле revision должно быть целым числом."}, status.HTTP_400_BAD_REQUEST
+        if revision != survey.revision:
+            return self._conflict()
+        return None
+
+    @staticmethod
+    def _precondition_failed() -> tuple[dict, int]:
+        return {"detail": "Опрос был изменен другим пользователем."}, status.HTTP_412_PRECONDITION_FAILED
+
+    @classmethod
+    def _conflict(cls, expected_revision: int | None = None) -> tuple[dict, int]:
+        """
+        Ответ на запись поверх чужих изменений: 412, если ревизию передали в If-Match, иначе 409
+        """
+        if expected_revision is not None:
+            return cls._precondition_failed()
+        return {"detail": "Опрос был изменен другим пользователем."}, status.HTTP_409_CONFLICT
+
+    def _save(self, survey: Survey, survey_changes: dict, writes: list[tuple]) -> int | None:
+        """
+        Метод записывает изменения одной короткой транзакцией. Первым выполняется условный UPDATE ревизии
+        (см. _bump_revision): если опрос успели изменить после чтения, транзакция ничего не пишет, а строка
+        опроса, заблокированная этим UPDATE, не дает параллельным записям перемешать свои bulk_update
+        Args:
+            survey(Survey) - oбъект модели Опрос с ревизией, по которой вычислены изменения
+            survey_changes(dict) - изменившиеся поля опроса
+            writes(list[tuple]) - (менеджер модели, объекты, поля) для bulk_update
+        Returns:
+            int | None: записанная ревизия опроса или None, если ревизия уже изменилась и ничего не записано
+        """
+        with span("survey.write"), transaction.atomic():
+            revision = self._bump_revision(survey, survey_changes)
+            if revision is None:
+                return None
+            for manager, objects, fields in writes:
+                manager.bulk_update(objects, fields)
+        return revision
+
+    def _bump_revision(self, survey: Survey, survey_changes: dict | None = None) -> int | None:
+        """
+        Метод одним условным UPDATE проверяет, что ревизия опроса не изменилась с момента чтения, и увеличивает ее,
+        после чего закэшированные документы прежней ревизии больше не читаются
+        Args:
+            survey(Survey) - oбъект модели Опрос с прочитанной ревизией
+            survey_changes(dict | None) - поля опроса, которые записываются тем же UPDATE
+        Returns:
+            int | None: новая ревизия или None, если опрос успели изменить
+        """
+        updated = self.survey_model.objects.filter(id=survey.id, revision=survey.revision).update(
+            revision=F("revision") + 1, **(survey_changes or {})
+        )
+        return survey.revision + 1 if updated else None
+
+    def _update_questions(self, existing_questions: dict[int, Question], questions_data: list[dict]) -> list[tuple]:
+        """
+        Метод сравнивает пришедшие вопросы с сохраненными и готовит один bulk_update только изменившихся
+        вопросов и только изменившихся полей
+        Args:
+            existing_questions(dict[int, Question]) - вопросы опроса по id
             questions_data(list[dict]) - список объектов вопросов
         Returns:
-            None
+            list[tuple]: записи для _save, пустой список, если вопросы не изменились
         """
-        existing_questions = {q.id: q for q in survey.questions.all()}
+        changed_questions: dict[int, Question] = {}
+        changed_fields: set[str] = set()
 
         for question_data in questions_data:
             question_id = question_data.get("id")
@@ -88,27 +209,41 @@ class UpdateSurveyCommand:
                 raise ValidationError(f"Отсутствуют обязательные поля в данных вопроса с id={question_id}")
 
             question = existing_questions[question_id]
-            question.text = question_data["text"]
-            question.short_text = question_data["short_text"]
-            question.q_type = question_data["type"]
-            question.meta = question_data.get("meta", question.meta)
-            question.save()
+            values = {
+                "text": question_data["text"],
+                "short_text": question_data["short_text"],
+                "q_type": question_data["type"],
+                "meta": question_data.get("meta", question.meta),
+            }
+            if self._assign_changed(question, values, changed_fields):
+                changed_questions[question_id] = question
+
+        if changed_questions:
+            return [(Question.objects, list(changed_questions.values()), sorted(changed_fields))]
+        return []
 
-    def _update_answers_and_links(self, survey: Survey, questions_data: list[dict]) -> None:
+    def _update_answers_and_links(
+        self, survey: Survey, existing_questions: dict[int, Question], questions_data: list[dict]
+    ) -> list[tuple]:
         """
-        Метод обновляет текст ответов
+        Метод сравнивает пришедшие ответы и связи со следующими вопросами с сохраненными и готовит запись только
+        изменившихся строк: по одному bulk_update на ответы и на связи
         Args:
             survey(Survey) - oбъект модели Опрос
+            existing_questions(dict[int, Question]) - вопросы опроса по id
             questions_data(list[dict]) - список объектов вопросов
         Returns:
-            None
+            list[tuple]: записи для _save
         """
-        existing_questions = {q.id: q for q in survey.questions.all()}
-        existing_answers = {a.id: a for a in Answer.objects.filter(question_answers__question__survey=survey)}
-        existing_qas = {
-            (qa.question.id, qa.answer.id): qa
-            for qa in self.question_answer_model.objects.filter(question__survey=survey)
-        }
+        existing_qas: dict[tuple[int, int], QuestionAnswer] = {}
+        existing_answers: dict[int, Answer] = {}
+        for qa in self.question_answer_model.objects.filter(survey=survey).select_related("answer"):
+            existing_qas[(qa.question_id, qa.answer_id)] = qa
+            existing_answers.setdefault(qa.answer_id, qa.answer)
+
+        changed_answers: dict[int, Answer] = {}
+        changed_answer_fields: set[str] = set()
+        changed_qas: dict[int, QuestionAnswer] = {}
 
         for question_data in questions_data:
             question_id = question_data["id"]
@@ -129,9 +264,9 @@ class UpdateSurveyCommand:
 
                 # Обновляем Answer
                 answer = existing_answers[answer_id]
-                answer.text = answer_data["text"]
-                answer.sort = answer_data.get("sort", answer.sort)
-                answer.save()
+                values = {"text": answer_data["text"], "sort": answer_data.get("sort", answer.sort)}
+                if self._assign_changed(answer, values, changed_answer_fields):
+                    changed_answers[answer_id] = answer
 
                 # Обновляем связь QuestionAnswer
                 qa_key = (question_id, answer_id)
@@ -143,5 +278,32 @@ class UpdateSurveyCommand:
                 if next_question_id is not None and next_question_id not in existing_questions:
                     raise ValidationError(f"Следующий вопрос с id={next_question_id} не найден в опросе.")
 
-                qa.next_question = existing_questions.get(next_question_id) if next_question_id else None
-                qa.save()
+                if qa.next_question_id != (next_question_id or None):
+                    qa.next_question_id = next_question_id or None
+                    changed_qas[qa.id] = qa
+
+        writes = []
+        if changed_answers:
+            writes.append((self.answer_model.objects, list(changed_answers.values()), sorted(changed_answer_fields)))
+        if changed_qas:
+            writes.append((self.question_answer_model.objects, list(changed_qas.values()), ["next_question"]))
+        return writes
+
+    @staticmethod
+    def _assign_changed(instance, values: dict, changed_fields: set[str]) -> bool:
+        """
+        Метод присваивает объекту только отличающиеся значения и запоминает имена измененных полей
+        Args:
+            instance(Model) - объект модели
+            values(dict) - новые значения полей
+            changed_fields(set[str]) - накопитель имен измененных полей
+        Returns:
+            bool: True, если объект изменен
+        """
+        changed = False
+        for field, value in values.items():
+            if getattr(instance, field) != value:
+                setattr(instance, field, value)
+                changed_fields.add(field)
+                changed = True
+        return changed
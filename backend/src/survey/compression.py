@@ -0,0 +1,68 @@
+import gzip
+
+import brotli
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+# Сжатые варианты в порядке предпочтения при одинаковом q в Accept-Encoding
+ENCODINGS = ("br", "gzip")
+# Тела меньше порога не сжимаются: выигрыш меньше заголовков сжатого формата (как в GZipMiddleware)
+MIN_COMPRESS_SIZE = 200
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 9
+
+
+def compress_payload(body: bytes) -> dict[str, bytes]:
+    """
+    Тело ответа без сжатия (identity) и его gzip и brotli-варианты.
+
+    Сжатие выполняется один раз на ревизию опроса, поэтому уровни выбраны ближе к максимальным. mtime=0 делает
+    gzip-вариант одинаковым в каждом процессе.
+    """
+    if len(body) < MIN_COMPRESS_SIZE:
+        return {"identity": body}
+    return {
+        "identity": body,
+        "gzip": gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0),
+        "br": brotli.compress(body, mode=brotli.MODE_TEXT, quality=BROTLI_QUALITY),
+    }
+
+
+def negotiate_encoding(accept_encoding: str | None, available) -> str:
+    """
+    Выбирает кодирование тела по заголовку Accept-Encoding (RFC 9110, 12.5.3) среди доступных.
+
+    Побеждает наибольший q, при равенстве - порядок ENCODINGS. Кодирования с q=0 и не перечисленные
+    (если нет *) не выбираются, без подходящего сжатого варианта тело отдается как есть.
+    """
+    if not accept_encoding:
+        return "identity"
+
+    weights: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        try:
+            weight = float(params.strip().removeprefix("q=")) if params.strip() else 1.0
+        except ValueError:
+            continue
+        weights[coding.strip().lower()] = weight
+
+    default = weights.get("*", 0.0)
+    best, best_weight = "identity", 0.0
+    for coding in ENCODINGS:
+        weight = weights.get(coding, default)
+        if coding in available and weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+def encoded_response(payload: dict[str, bytes], request, content_type: str = "application/json") -> HttpResponse:
+    """
+    Ответ с вариантом тела из compress_payload, подходящим под Accept-Encoding запроса.
+    """
+    encoding = negotiate_encoding(request.headers.get("Accept-Encoding"), payload)
+    response = HttpResponse(payload[encoding], content_type=content_type)
+    if encoding != "identity":
+        response["Content-Encoding"] = encoding
+    patch_vary_headers(response, ["Accept-Encoding"])
+    return response
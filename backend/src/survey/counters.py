@@ -0,0 +1,66 @@
+from collections import Counter, defaultdict
+
+from django.db.models import F
+
+from .graph import SurveyGraph
+from .models import AnswerCounter, QuestionCounter
+
+
+class ResponseCounters:
+    """
+    Накопитель приращений счетчиков по пачке ответов респондентов.
+
+    Для каждого респондента:
+        selected_count ответа увеличивается, если ответ выбран;
+        reached_count вопроса увеличивается, если на вопрос ответили или маршрут по данным ответам привел к нему;
+        drop_off_count вопроса увеличивается, если маршрут привел к вопросу, но ответа на него нет.
+    """
+
+    def __init__(self, graph: SurveyGraph):
+        self.graph: SurveyGraph = graph
+        self.selected: Counter[int] = Counter()
+        self.reached: Counter[int] = Counter()
+        self.drop_off: Counter[int] = Counter()
+
+    def add(self, selection: dict[int, list[int]]) -> None:
+        """
+        :param selection: Индексы выбранных связей (см. SurveyGraph.selected_answers) по id вопроса.
+        """
+        for question_id, slots in selection.items():
+            self.reached[question_id] += 1
+            for slot in slots:
+                self.selected[self.graph.answer_ids[slot]] += 1
+
+            next_question_id = self.graph.route(slots)
+            if next_question_id is not None and next_question_id not in selection:
+                self.reached[next_question_id] += 1
+                self.drop_off[next_question_id] += 1
+
+    def flush(self) -> None:
+        """
+        Записывает накопленные приращения: недостающие строки счетчиков создаются одним bulk_create, приращения
+        применяются UPDATE ... SET x = x + n, по одному запросу на каждое различное значение приращения.
+        """
+        answer_deltas = {answer_id: (count,) for answer_id, count in self.selected.items()}
+        question_deltas = {
+            question_id: (self.reached[question_id], self.drop_off[question_id]) for question_id in self.reached
+        }
+        self._increment(AnswerCounter, answer_deltas, ("selected_count",))
+        self._increment(QuestionCounter, question_deltas, ("reached_count", "drop_off_count"))
+        self.selected.clear()
+        self.reached.clear()
+        self.drop_off.clear()
+
+    def _increment(self, model, deltas: dict[int, tuple[int, ...]], fields: tuple[str, ...]) -> None:
+        if not deltas:
+            return
+        model.objects.bulk_create(
+            [model(pk=pk, survey_id=self.graph.survey_id) for pk in deltas], ignore_conflicts=True
+        )
+
+        keys_by_delta: dict[tuple[int, ...], list[int]] = defaultdict(list)
+        for pk, delta in deltas.items():
+            keys_by_delta[delta].append(pk)
+        for delta, keys in keys_by_delta.items():
+            changes = {field: F(field) + value for field, value in zip(fields, delta) if value}
+            model.objects.filter(pk__in=keys).update(**changes)
@@ -0,0 +1,65 @@
+import threading
+
+from django.db import connections
+
+
+class ConnectionStats:
+    """
+    Число соединений с БД, открытых процессом, по алиасам. Считается по сигналу connection_created
+    (подключается в SurveyConfig.ready): при CONN_MAX_AGE > 0 оно растет медленнее числа запросов.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._opened: dict[str, int] = {}
+
+    def record(self, alias: str) -> None:
+        with self._lock:
+            self._opened[alias] = self._opened.get(alias, 0) + 1
+
+    def opened(self, alias: str) -> int:
+        return self._opened.get(alias, 0)
+
+
+connection_stats = ConnectionStats()
+
+
+def record_connection(sender, connection, **kwargs):
+    connection_stats.record(connection.alias)
+
+
+def database_pool_stats() -> dict[str, dict]:
+    """
+    Состояние соединений по каждому алиасу БД.
+
+    С пулом psycopg (OPTIONS["pool"], только PostgreSQL и psycopg 3) возвращаются его счетчики: занятые
+    и свободные соединения, ожидающие запросы и суммарное время ожидания. Без пула таких счетчиков нет
+    (соединения Django привязаны к потоку), поэтому возвращаются только режим постоянных (CONN_MAX_AGE > 0)
+    или одноразовых соединений и число открытых процессом соединений.
+    """
+    result = {}
+    for wrapper in connections.all():
+        pool = getattr(wrapper, "pool", None)
+        if pool is not None:
+            stats = pool.get_stats()
+            result[wrapper.alias] = {
+                "mode": "pool",
+                "size": stats.get("pool_size", 0),
+                "in_use": stats.get("pool_size", 0) - stats.get("pool_available", 0),
+                "idle": stats.get("pool_available", 0),
+                "waiting": stats.get("requests_waiting", 0),
+                "requests": stats.get("requests_num", 0),
+                "wait_ms": stats.get("requests_wait_ms", 0),
+                "connections_opened": stats.get("connections_num", 0),
+                "connect_ms": stats.get("connections_ms", 0),
+            }
+            continue
+
+        max_age = wrapper.settings_dict["CONN_MAX_AGE"]
+        result[wrapper.alias] = {
+            "mode": "persistent" if max_age is None or max_age > 0 else "per_request",
+            "max_age": max_age,
+            "health_checks": wrapper.settings_dict["CONN_HEALTH_CHECKS"],
+            "connections_opened": connection_stats.opened(wrapper.alias),
+        }
+    return result
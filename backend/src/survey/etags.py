@@ -0,0 +1,60 @@
+from collections.abc import Iterable
+
+from django.utils.http import parse_etags, quote_etag
+
+from .compression import ENCODINGS
+
+
+def make_survey_etag(survey_id: int, revision: int, coding: str = "identity", representation: str = "json") -> str:
+    """
+    Строгий ETag документа опроса. Меняется вместе с ревизией опроса.
+
+    Тело в другом формате или сжатое тело - отдельное представление (RFC 9110, 8.8.3), поэтому к ETag добавляются
+    формат рендерера, кроме JSON ("-msgpack"), и кодирование ("-gzip", "-br").
+    """
+    etag = f"survey-{survey_id}-r{revision}"
+    if representation != "json":
+        etag += f"-{representation}"
+    if coding != "identity":
+        etag += f"-{coding}"
+    return quote_etag(etag)
+
+
+def survey_etags(survey_id: int, revision: int, representation: str = "json") -> list[str]:
+    """
+    ETag всех представлений ревизии опроса в формате representation: без сжатия и в каждом из ENCODINGS.
+    """
+    return [make_survey_etag(survey_id, revision, coding, representation) for coding in ("identity", *ENCODINGS)]
+
+
+def matching_etag(header: str | None, etags: str | Iterable[str], weak: bool = False) -> str | None:
+    """
+    Ищет в заголовке If-Match/If-None-Match одно из текущих значений ETag.
+
+    :param header: Значение заголовка.
+    :param etags: Текущий ETag или ETag всех представлений ресурса.
+    :param weak: Слабое сравнение (для If-None-Match): префикс W/ игнорируется.
+        При строгом сравнении (If-Match) слабые ETag никогда не совпадают.
+    :return: Совпавший ETag (для * - первый из etags) или None.
+    """
+    if not header:
+        return None
+
+    etags = [etags] if isinstance(etags, str) else list(etags)
+    for candidate in parse_etags(header):
+        if candidate == "*":
+            return etags[0]
+        if candidate.startswith("W/"):
+            if not weak:
+                continue
+            candidate = candidate[2:]
+        if candidate in etags:
+            return candidate
+    return None
+
+
+def etag_matches(header: str | None, etags: str | Iterable[str], weak: bool = False) -> bool:
+    """
+    Проверяет, совпадает ли один из текущих ETag с одним из значений заголовка If-Match/If-None-Match.
+    """
+    return matching_etag(header, etags, weak=weak) is not None
@@ -0,0 +1,434 @@
+import threading
+from array import array
+from collections import OrderedDict, deque
+from collections.abc import Iterable
+
+from asgiref.sync import sync_to_async
+
+from .models import Question, QuestionAnswer
+
+# Значение в answer_next для ответа без следующего вопроса
+END = -1
+# Предел числа путей в analyze: число путей растет экспоненциально, а JSON и MessagePack кодируют целые до 64 бит
+MAX_PATH_COUNT = 2**63 - 1
+
+
+class SurveyGraphError(ValueError):
+    pass
+
+
+class QuestionNode:
+    """
+    Вопрос в скомпилированном графе. Ответы вопроса лежат в массивах SurveyGraph подряд, в срезе
+    [first_answer, last_answer), упорядоченные по Answer.sort.
+    """
+
+    __slots__ = ("id", "index", "q_type", "first_answer", "last_answer")
+
+    def __init__(self, question_id: int, index: int, q_type: str, first_answer: int, last_answer: int):
+        self.id = question_id
+        self.index = index
+        self.q_type = q_type
+        self.first_answer = first_answer
+        self.last_answer = last_answer
+
+
+class SurveyGraph:
+    """
+    Неизменяемый граф переходов опроса одной ревизии.
+
+    Вопросы пронумерованы индексами 0..V-1, связи вопрос-ответ хранятся в плоских массивах: answer_ids[i] -
+    id ответа, answer_next[i] - индекс следующего вопроса (END, если опрос на этом ответе заканчивается).
+    Поиск следующего вопроса по паре (вопрос, ответ) - одно обращение к словарю и к массиву.
+    """
+
+    __slots__ = (
+        "survey_id",
+        "revision",
+        "nodes",
+        "question_index",
+        "answer_ids",
+        "answer_next",
+        "link_index",
+        "_validation_report",
+        "_analytics",
+    )
+
+    def __init__(self, survey_id: int, revision: int, questions: list[tuple], links: list[tuple]):
+        """
+        :param questions: Пары (id, q_type) вопросов опроса.
+        :param links: Тройки (question_id, answer_id, next_question_id), упорядоченные по вопросу и Answer.sort.
+        """
+        self.survey_id: int = survey_id
+        self.revision: int = revision
+        self.question_index: dict[int, int] = {question_id: index for index, (question_id, _) in enumerate(questions)}
+
+        links_by_question: dict[int, list[tuple]] = {}
+        for link in links:
+            links_by_question.setdefault(link[0], []).append(link)
+
+        self.answer_ids = array("q")
+        self.answer_next = array("i")
+        self.link_index: dict[tuple[int, int], int] = {}
+
+        nodes = []
+        for index, (question_id, q_type) in enumerate(questions):
+            first_answer = len(self.answer_ids)
+            for _, answer_id, next_question_id in links_by_question.get(question_id, ()):
+                self.link_index[(index, answer_id)] = len(self.answer_ids)
+                self.answer_ids.append(answer_id)
+                self.answer_next.append(self.question_index.get(next_question_id, END))
+            nodes.append(QuestionNode(question_id, index, q_type, first_answer, len(self.answer_ids)))
+        self.nodes: tuple[QuestionNode, ...] = tuple(nodes)
+        self._validation_report: dict | None = None
+        self._analytics: dict | None = None
+
+    @classmethod
+    def compile(cls, survey_id: int, revision: int) -> "SurveyGraph":
+        """
+        Собирает граф опроса двумя запросами: вопросы и связи вопрос-ответ.
+        """
+        questions = list(Question.objects.filter(survey_id=survey_id).order_by("id").values_list("id", "q_type"))
+        links = list(
+            QuestionAnswer.objects.filter(survey_id=survey_id)
+            .order_by("question_id", "answer__sort", "answer_id")
+            .values_list("question_id", "answer_id", "next_question_id")
+        )
+        return cls(survey_id, revision, questions, links)
+
+    def node(self, question_id: int) -> QuestionNode:
+        try:
+            return self.nodes[self.question_index[question_id]]
+        except KeyError:
+            raise SurveyGraphError(f"Вопрос с id={question_id} не найден в опросе.") from None
+
+    def answers(self, node: QuestionNode) -> range:
+        """
+        Индексы связей вопроса в массивах answer_ids/answer_next.
+        """
+        return range(node.first_answer, node.last_answer)
+
+    def selected_answers(self, question_id: int, answer_ids: Iterable[int]) -> list[int]:
+        """
+        Проверяет выбор респондента и возвращает индексы выбранных связей в порядке сортировки ответов.
+
+        :raises SurveyGraphError: Вопрос или ответ не принадлежат опросу, либо набор ответов не подходит к типу вопроса.
+        """
+        node = self.node(question_id)
+        slots = []
+        for answer_id in set(answer_ids):
+            slot = self.link_index.get((node.index, answer_id))
+            if slot is None:
+                raise SurveyGraphError(f"Ответ с id={answer_id} не относится к вопросу id={question_id}.")
+            slots.append(slot)
+
+        if not slots:
+            raise SurveyGraphError("Не выбран ни один ответ.")
+        if node.q_type == "radio" and len(slots) > 1:
+            raise SurveyGraphError(f"На вопрос id={question_id} можно выбрать только один ответ.")
+        return sorted(slots)
+
+    def next_question(self, question_id: int, answer_ids: Iterable[int]) -> int | None:
+        """
+        Возвращает id вопроса, который следует за выбранными ответами, или None, если опрос закончен.
+
+        Для вопроса с несколькими выбранными ответами (checkbox) переход определяет первый по порядку сортировки
+        ответ, у которого есть следующий вопрос.
+
+        :raises SurveyGraphError: Вопрос или ответ не принадлежат опросу, либо набор ответов не подходит к типу вопроса.
+        """
+        return self.route(self.selected_answers(question_id, answer_ids))
+
+    def route(self, slots: list[int]) -> int | None:
+        """
+        id следующего вопроса по уже проверенным индексам выбранных связей, упорядоченным по сортировке ответов.
+        """
+        for slot in slots:
+            next_index = self.answer_next[slot]
+            if next_index != END:
+                return self.nodes[next_index].id
+        return None
+
+    def successors(self, index: int) -> list[int]:
+        """
+        Индексы вопросов, в которые ведут ответы вопроса с индексом index.
+        """
+        node = self.nodes[index]
+        return [self.answer_next[slot] for slot in self.answers(node) if self.answer_next[slot] != END]
+
+    def reachable(self, question_id: int, depth: int | None = None) -> list[int]:
+        """
+        id вопросов, до которых можно дойти от вопроса question_id не больше чем за depth переходов (None - без
+        ограничения), в порядке обхода в ширину начиная с него самого.
+
+        :raises SurveyGraphError: Вопрос не найден в опросе.
+        """
+        root = self.node(question_id).index
+        distance = {root: 0}
+        queue = deque([root])
+        while queue:
+            index = queue.popleft()
+            if depth is not None and distance[index] >= depth:
+                continue
+            for next_index in self.successors(index):
+                if next_index not in distance:
+                    distance[next_index] = distance[index] + 1
+                    queue.append(next_index)
+        return [self.nodes[index].id for index in distance]
+
+    def entry_index(self) -> int | None:
+        """
+        Индекс первого вопроса опроса: вопрос с наименьшим id, на который не ведет ни один ответ. Если таких нет
+        (все вопросы лежат на циклах), первым считается вопрос с наименьшим id.
+        """
+        if not self.nodes:
+            return None
+        has_incoming = [False] * len(self.nodes)
+        for next_index in self.answer_next:
+            if next_index != END:
+                has_incoming[next_index] = True
+        return next((index for index, incoming in enumerate(has_incoming) if not incoming), 0)
+
+    def validate(self) -> dict:
+        """
+        Проверяет граф переходов за O(V+E) и возвращает отчет:
+            cycles - группы вопросов, по которым можно ходить по кругу (компоненты сильной связности);
+            unreachable_question_ids - вопросы, до которых нельзя дойти от первого вопроса;
+            dead_end_answers - ответы без продолжения у вопросов, где другие ответы продолжают опрос. Это может быть
+                и намеренный досрочный выход, поэтому на is_valid они не влияют. Вопрос, на котором все ответы
+                завершают опрос, считается финальным и в отчет не попадает.
+
+        Граф неизменяемый, поэтому отчет считается один раз на ревизию.
+        """
+        if self._validation_report is None:
+            entry = self.entry_index()
+            cycles = self._find_cycles()
+            unreachable = self._find_unreachable(entry)
+            dead_ends = self._find_dead_ends()
+            self._validation_report = {
+                "is_valid": not (cycles or unreachable),
+                "revision": self.revision,
+                "entry_question_id": self.nodes[entry].id if entry is not None else None,
+                "cycles": cycles,
+                "unreachable_question_ids": unreachable,
+                "dead_end_answers": dead_ends,
+            }
+        return self._validation_report
+
+    def topological_order(self) -> list[int] | None:
+        """
+        Индексы вопросов в топологическом порядке (алгоритм Кана) или None, если в графе есть цикл.
+        """
+        in_degree = [0] * len(self.nodes)
+        for next_index in self.answer_next:
+            if next_index != END:
+                in_degree[next_index] += 1
+
+        order = [index for index, degree in enumerate(in_degree) if degree == 0]
+        for index in order:
+            for next_index in self.successors(index):
+                in_degree[next_index] -= 1
+                if in_degree[next_index] == 0:
+                    order.append(next_index)
+        return order if len(order) == len(self.nodes) else None
+
+    def analyze(self) -> dict | None:
+        """
+        Считает динамическим программированием по топологическому порядку за O(V+E):
+            path_count - число различных путей респондента от первого вопроса до завершения опроса
+                (каждый ответ - отдельный переход, выбор нескольких ответов checkbox отдельно не учитывается),
+                не больше MAX_PATH_COUNT; path_count_overflow - число путей достигло этого предела;
+            min_questions/max_questions - наименьшее и наибольшее число вопросов до завершения;
+            для каждого вопроса min_depth/max_depth - сколько вопросов может быть задано до него
+                (None - вопрос недостижим) и min_remaining/max_remaining - сколько вопросов осталось, включая его.
+
+        Граф неизменяемый, поэтому результат считается один раз на ревизию.
+
+        :return: Результат анализа или None, если в графе есть циклы.
+        """
+        if self._analytics is not None:
+            return self._analytics
+
+        order = self.topological_order()
+        if order is None:
+            return None
+
+        count = len(self.nodes)
+        paths = [0] * count
+        min_remaining = [0] * count
+        max_remaining = [0] * count
+        for index in reversed(order):
+            node = self.nodes[index]
+            if node.first_answer == node.last_answer:
+                paths[index], min_remaining[index], max_remaining[index] = 1, 1, 1
+                continue
+            path_count, shortest, longest = 0, None, 0
+            for slot in self.answers(node):
+                next_index = self.answer_next[slot]
+                if next_index == END:
+                    path_count, remaining_min, remaining_max = path_count + 1, 0, 0
+                else:
+                    path_count += paths[next_index]
+                    remaining_min, remaining_max = min_remaining[next_index], max_remaining[next_index]
+                shortest = remaining_min if shortest is None else min(shortest, remaining_min)
+                longest = max(longest, remaining_max)
+            paths[index] = min(path_count, MAX_PATH_COUNT)
+            min_remaining[index], max_remaining[index] = shortest + 1, longest + 1
+
+        entry = self.entry_index()
+        min_depth: list[int | None] = [None] * count
+        max_depth: list[int | None] = [None] * count
+        if entry is not None:
+            min_depth[entry] = max_depth[entry] = 0
+        for index in order:
+            if min_depth[index] is None:
+                continue
+            for next_index in self.successors(index):
+                depth_min, depth_max = min_depth[index] + 1, max_depth[index] + 1
+                if min_depth[next_index] is None:
+                    min_depth[next_index], max_depth[next_index] = depth_min, depth_max
+                else:
+                    min_depth[next_index] = min(min_depth[next_index], depth_min)
+                    max_depth[next_index] = max(max_depth[next_index], depth_max)
+
+        self._analytics = {
+            "revision": self.revision,
+            "entry_question_id": self.nodes[entry].id if entry is not None else None,
+            "path_count": paths[entry] if entry is not None else 0,
+            "path_count_overflow": entry is not None and paths[entry] == MAX_PATH_COUNT,
+            "min_questions": min_remaining[entry] if entry is not None else 0,
+            "max_questions": max_remaining[entry] if entry is not None else 0,
+            "questions": [
+                {
+                    "question_id": node.id,
+                    "min_depth": min_depth[node.index],
+                    "max_depth": max_depth[node.index],
+                    "min_remaining": min_remaining[node.index],
+                    "max_remaining": max_remaining[node.index],
+                }
+                for node in self.nodes
+            ],
+        }
+        return self._analytics
+
+    def _find_cycles(self) -> list[list[int]]:
+        """
+        Итеративный алгоритм Тарьяна: компоненты сильной связности из нескольких вопросов и петли.
+        """
+        count = len(self.nodes)
+        order = [-1] * count
+        low = [0] * count
+        on_stack = [False] * count
+        stack: list[int] = []
+        counter = 0
+        cycles = []
+
+        for root in range(count):
+            if order[root] != -1:
+                continue
+            order[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = True
+            work = [(root, iter(self.successors(root)))]
+
+            while work:
+                index, successors = work[-1]
+                for next_index in successors:
+                    if order[next_index] == -1:
+                        order[next_index] = low[next_index] = counter
+                        counter += 1
+                        stack.append(next_index)
+                        on_stack[next_index] = True
+                        work.append((next_index, iter(self.successors(next_index))))
+                        break
+                    if on_stack[next_index]:
+                        low[index] = min(low[index], order[next_index])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        low[parent] = min(low[parent], low[index])
+                    if low[index] == order[index]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack[member] = False
+                            component.append(member)
+                            if member == index:
+                                break
+                        if len(component) > 1 or index in self.successors(index):
+                            cycles.append(sorted(self.nodes[member].id for member in component))
+
+        return sorted(cycles)
+
+    def _find_unreachable(self, entry: int | None) -> list[int]:
+        if entry is None:
+            return []
+        reached = [False] * len(self.nodes)
+        reached[entry] = True
+        queue = deque([entry])
+        while queue:
+            for next_index in self.successors(queue.popleft()):
+                if not reached[next_index]:
+                    reached[next_index] = True
+                    queue.append(next_index)
+        return [node.id for node in self.nodes if not reached[node.index]]
+
+    def _find_dead_ends(self) -> list[dict]:
+        dead_ends = []
+        for node in self.nodes:
+            slots = self.answers(node)
+            ends = [slot for slot in slots if self.answer_next[slot] == END]
+            if ends and len(ends) < len(slots):
+                dead_ends.extend({"question_id": node.id, "answer_id": self.answer_ids[slot]} for slot in ends)
+        return dead_ends
+
+
+class SurveyGraphCache:
+    """
+    Скомпилированные графы опросов в памяти процесса: по одному графу (последней прочитанной ревизии) на опрос,
+    не более max_entries опросов, давно не читанные вытесняются первыми.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries: int = max_entries
+        self._graphs: OrderedDict[int, SurveyGraph] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, survey_id: int, revision: int) -> SurveyGraph:
+        with self._lock:
+            graph = self._graphs.get(survey_id)
+            if graph is not None and graph.revision == revision:
+                self._graphs.move_to_end(survey_id)
+                return graph
+
+        return self._store(SurveyGraph.compile(survey_id, revision))
+
+    async def aget(self, survey_id: int, revision: int) -> SurveyGraph:
+        """
+        Асинхронный вариант get: граф из памяти отдается без переключения потока, компиляция при промахе
+        выполняется в потоке ORM.
+        """
+        with self._lock:
+            graph = self._graphs.get(survey_id)
+            if graph is not None and graph.revision == revision:
+                self._graphs.move_to_end(survey_id)
+                return graph
+
+        return self._store(await sync_to_async(SurveyGraph.compile)(survey_id, revision))
+
+    def _store(self, graph: SurveyGraph) -> SurveyGraph:
+        with self._lock:
+            self._graphs[graph.survey_id] = graph
+            self._graphs.move_to_end(graph.survey_id)
+            while len(self._graphs) > self.max_entries:
+                self._graphs.popitem(last=False)
+        return graph
+
+    def clear(self) -> None:
+        with self._lock:
+            self._graphs.clear()
+
+
+survey_graph_cache = SurveyGraphCache()
@@ -0,0 +1,30 @@
+import json
+
+from django.core.management.base import BaseCommand
+from survey.models import Survey
+from survey.queries.export_surveys import ExportSurveysQuery
+
+
+class Command(BaseCommand):
+    help = "Выгружает опросы с вопросами, ответами и связями в NDJSON (один опрос на строку) или JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ids", nargs="+", type=int, help="ID опросов, по умолчанию - все опросы")
+        parser.add_argument("--output", "-o", help="Файл для выгрузки, по умолчанию - stdout")
+        parser.add_argument("--format", choices=["ndjson", "json"], default="ndjson")
+        parser.add_argument("--chunk-size", type=int, default=500, help="Число опросов, читаемых за раз")
+
+    def handle(self, *args, **options):
+        export_surveys_query = ExportSurveysQuery(survey_model=Survey, chunk_size=options["chunk_size"])
+        documents = export_surveys_query(options["ids"])
+
+        output = open(options["output"], "w", encoding="utf-8") if options["output"] else self.stdout
+        try:
+            if options["format"] == "json":
+                output.write(json.dumps(list(documents), ensure_ascii=False) + "\n")
+            else:
+                for document in documents:
+                    output.write(json.dumps(document, ensure_ascii=False) + "\n")
+        finally:
+            if options["output"]:
+                output.close()
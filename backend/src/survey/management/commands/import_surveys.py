@@ -0,0 +1,65 @@
+import json
+import sys
+from itertools import chain
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from survey.commands.import_surveys import ImportSurveysCommand, SurveyImportError
+from survey.models import Answer, Question, QuestionAnswer, Survey
+
+
+class Command(BaseCommand):
+    help = "Загружает опросы из файла export_surveys (NDJSON или JSON-список) с новыми id"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Файл выгрузки, - для stdin")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.SURVEY_IMPORT_BATCH_SIZE,
+            help="Число опросов, вставляемых за раз",
+        )
+
+    def handle(self, *args, **options):
+        stream = sys.stdin if options["path"] == "-" else open(options["path"], encoding="utf-8")
+        try:
+            import_surveys_command = ImportSurveysCommand(
+                survey_model=Survey,
+                question_model=Question,
+                answer_model=Answer,
+                question_answer_model=QuestionAnswer,
+                batch_size=options["batch_size"],
+            )
+            totals = import_surveys_command(self._read_documents(stream))
+        except SurveyImportError as e:
+            raise CommandError(str(e))
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Загружено опросов: {totals['surveys']}, вопросов: {totals['questions']}, "
+                f"ответов: {totals['answers']}"
+            )
+        )
+
+    @staticmethod
+    def _read_documents(stream):
+        """
+        Читает NDJSON построчно; файл, начинающийся с [, читается как JSON-список целиком.
+        """
+        first_line = stream.readline()
+        if first_line.lstrip().startswith("["):
+            try:
+                yield from json.loads(first_line + stream.read())
+            except ValueError as e:
+                raise SurveyImportError(f"Некорректный JSON: {e}")
+            return
+
+        for number, line in enumerate(chain([first_line], stream), start=1):
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError as e:
+                    raise SurveyImportError(f"Строка {number}: {e}")
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from survey.commands.rebuild_counters import RebuildCountersCommand
+from survey.graph import survey_graph_cache
+from survey.models import RespondentAnswer, Survey
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает счетчики статистики опросов по сохраненным ответам респондентов. Нужен после миграции "
+        "базы с уже загруженными ответами; загрузку ответов на время пересчета стоит остановить"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ids", nargs="+", type=int, help="ID опросов, по умолчанию - все опросы")
+
+    def handle(self, *args, **options):
+        survey_ids = options["ids"] or list(Survey.objects.order_by("id").values_list("id", flat=True))
+        rebuild_counters_command = RebuildCountersCommand(
+            survey_model=Survey, respondent_answer_model=RespondentAnswer, graph_cache=survey_graph_cache
+        )
+        for survey_id in survey_ids:
+            totals = rebuild_counters_command(survey_id)
+            if totals is None:
+                raise CommandError(f"Опрос с id={survey_id} не найден.")
+            self.stdout.write(f"Опрос {survey_id}: отправок {totals['submissions']}, ответов {totals['rows']}")
+        self.stdout.write(self.style.SUCCESS(f"Пересчитано опросов: {len(survey_ids)}"))
@@ -0,0 +1,34 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from survey.profiling import ProfileStore
+
+
+class Command(BaseCommand):
+    help = "Список сохраненных профилей запросов (SURVEY_PROFILE_DIR) и сводка по ним"
+
+    def add_arguments(self, parser):
+        parser.add_argument("action", choices=["list", "aggregate"])
+        parser.add_argument("--last", type=int, help="Только последние N профилей")
+        parser.add_argument("--match", default="", help="Только профили, в имени которых есть подстрока")
+        parser.add_argument("--sort", default="cumulative", help="Ключ сортировки pstats (cumulative, tottime, ...)")
+        parser.add_argument("--limit", type=int, default=30, help="Число функций в сводке")
+
+    def handle(self, *args, **options):
+        store = ProfileStore.from_settings()
+        paths = [path for path in store.paths() if options["match"] in path.name]
+        last = options["last"]
+        if last:
+            paths = paths[-last:]
+
+        if options["action"] == "list":
+            for path in paths:
+                stat = path.stat()
+                modified = datetime.fromtimestamp(stat.st_mtime).isoformat(timespec="seconds")
+                self.stdout.write(f"{modified}  {stat.st_size:>9}  {path.name}")
+            return
+
+        if not paths:
+            raise CommandError(f"В {store.directory} нет подходящих профилей.")
+        self.stdout.write(f"Профилей: {len(paths)}")
+        self.stdout.write(store.aggregate(paths, sort=options["sort"], limit=options["limit"]))
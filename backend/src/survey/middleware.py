@@ -0,0 +1,83 @@
+import json
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .timing import RequestTimings, current_timings
+
+logger = logging.getLogger("survey.timing")
+
+
+class ServerTimingMiddleware:
+    """
+    Замеряет каждый запрос: число и время SQL-запросов, время отрисовки ответа и интервалы, отмеченные в коде
+    через survey.timing.span (например, survey.load, survey.serialize, survey.write).
+
+    Результат отдается в заголовке Server-Timing (SURVEY_SERVER_TIMING, по умолчанию только при DEBUG) и пишется
+    в лог survey.timing одной JSON-строкой. Если задан SURVEY_SLOW_REQUEST_MS, запросы дольше порога логируются
+    с текстом всех SQL.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        token = current_timings.set(RequestTimings(collect_sql=settings.SURVEY_SLOW_REQUEST_MS is not None))
+        try:
+            response = self.get_response(request)
+            return self._finish(request, response)
+        finally:
+            current_timings.reset(token)
+
+    async def __acall__(self, request):
+        token = current_timings.set(RequestTimings(collect_sql=settings.SURVEY_SLOW_REQUEST_MS is not None))
+        try:
+            response = await self.get_response(request)
+            return self._finish(request, response)
+        finally:
+            current_timings.reset(token)
+
+    def process_template_response(self, request, response):
+        """
+        Ответы DRF отрисовываются после представления: засекаем время от начала до конца render().
+        """
+        timings = current_timings.get()
+        if timings is not None:
+            started = timings.total_ms
+            response.add_post_render_callback(lambda rendered: timings.add_span("render", timings.total_ms - started))
+        return response
+
+    def _finish(self, request, response):
+        timings = current_timings.get()
+        total_ms = timings.total_ms
+
+        if settings.SURVEY_SERVER_TIMING:
+            metrics = [f'db;dur={timings.db_ms:.1f};desc="{timings.db_count} queries"']
+            metrics.extend(f"{name};dur={duration:.1f}" for name, duration in timings.spans.items())
+            metrics.append(f"total;dur={total_ms:.1f}")
+            response["Server-Timing"] = ", ".join(metrics)
+
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "total_ms": round(total_ms, 1),
+            "db_queries": timings.db_count,
+            "db_ms": round(timings.db_ms, 1),
+            "spans": {name: round(duration, 1) for name, duration in timings.spans.items()},
+        }
+        logger.info(json.dumps(record, ensure_ascii=False))
+
+        if settings.SURVEY_SLOW_REQUEST_MS is not None and total_ms >= settings.SURVEY_SLOW_REQUEST_MS:
+            record["queries"] = [{"sql": sql, "ms": round(duration, 1)} for sql, duration in timings.queries]
+            logger.warning(json.dumps(record, ensure_ascii=False))
+        return response
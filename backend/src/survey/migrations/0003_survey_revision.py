@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 17:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("survey", "0002_populate_survey_data"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="survey",
+            name="revision",
+            field=models.PositiveIntegerField(default=0, verbose_name="Ревизия"),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.1.7 on 2026-10-18 17:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("survey", "0003_survey_revision"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RespondentAnswer",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("respondent_id", models.CharField(max_length=64, verbose_name="Идентификатор респондента")),
+                ("submitted_at", models.DateTimeField(verbose_name="Время отправки")),
+                (
+                    "answer",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="respondent_answers",
+                        to="survey.answer",
+                        verbose_name="Ответ",
+                    ),
+                ),
+                (
+                    "question",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="respondent_answers",
+                        to="survey.question",
+                        verbose_name="Вопрос",
+                    ),
+                ),
+                (
+                    "survey",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="respondent_answers",
+                        to="survey.survey",
+                        verbose_name="Опрос",
+                    ),
+                ),
+            ],
+            options={"verbose_name": "Ответ респондента", "verbose_name_plural": "Ответы респондентов"},
+        )
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.7 on 2026-10-18 17:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("survey", "0004_respondentanswer"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="respondentanswer",
+            index=models.Index(fields=["survey", "id"], name="respondent_answer_survey_id"),
+        ),
+        migrations.AlterField(
+            model_name="respondentanswer",
+            name="survey",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="respondent_answers",
+                to="survey.survey",
+                verbose_name="Опрос",
+            ),
+        ),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 5.1.7 on 2026-10-18 17:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("survey", "0005_respondentanswer_survey_id_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AnswerCounter",
+            fields=[
+                (
+                    "answer",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="counter",
+                        serialize=False,
+                        to="survey.answer",
+                        verbose_name="Ответ",
+                    ),
+                ),
+                (
+                    "selected_count",
+                    models.PositiveBigIntegerField(default=0, verbose_name="Сколько раз выбран"),
+                ),
+                (
+                    "survey",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="answer_counters",
+                        to="survey.survey",
+                        verbose_name="Опрос",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Счетчик ответа",
+                "verbose_name_plural": "Счетчики ответов",
+            },
+        ),
+        migrations.CreateModel(
+            name="QuestionCounter",
+            fields=[
+                (
+                    "question",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="counter",
+                        serialize=False,
+                        to="survey.question",
+                        verbose_name="Вопрос",
+                    ),
+                ),
+                (
+                    "reached_count",
+                    models.PositiveBigIntegerField(default=0, verbose_name="Сколько раз показан"),
+                ),
+                (
+                    "drop_off_count",
+                    models.PositiveBigIntegerField(default=0, verbose_name="Сколько раз брошен"),
+                ),
+                (
+                    "survey",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="question_counters",
+                        to="survey.survey",
+                        verbose_name="Опрос",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Счетчик вопроса",
+                "verbose_name_plural": "Счетчики вопросов",
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.7 on 2026-10-18 18:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("survey", "0006_answercounter_questioncounter"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="survey",
+            index=models.Index(fields=["sort", "id"], name="survey_sort_id"),
+        ),
+    ]
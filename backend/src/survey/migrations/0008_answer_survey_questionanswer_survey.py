@@ -0,0 +1,47 @@
+# Generated by Django 5.1.7 on 2026-10-18 18:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("survey", "0007_survey_sort_id_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="answer",
+            name="survey",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="answers",
+                to="survey.survey",
+                verbose_name="Опрос",
+            ),
+        ),
+        migrations.AddField(
+            model_name="questionanswer",
+            name="survey",
+            field=models.ForeignKey(
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="question_answers",
+                to="survey.survey",
+                verbose_name="Опрос",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="answer",
+            index=models.Index(fields=["survey", "id"], name="answer_survey_id"),
+        ),
+        migrations.AddIndex(
+            model_name="questionanswer",
+            index=models.Index(fields=["survey", "id"], name="question_answer_survey_id"),
+        ),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_survey_id(apps, schema_editor):
+    Question = apps.get_model("survey", "Question")
+    Answer = apps.get_model("survey", "Answer")
+    QuestionAnswer = apps.get_model("survey", "QuestionAnswer")
+
+    QuestionAnswer.objects.filter(survey__isnull=True).update(
+        survey_id=Subquery(Question.objects.filter(id=OuterRef("question_id")).values("survey_id")[:1])
+    )
+    Answer.objects.filter(survey__isnull=True).update(
+        survey_id=Subquery(
+            QuestionAnswer.objects.filter(answer_id=OuterRef("pk")).order_by("pk").values("survey_id")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("survey", "0008_answer_survey_questionanswer_survey"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_survey_id, migrations.RunPython.noop),
+    ]
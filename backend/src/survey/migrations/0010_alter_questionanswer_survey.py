@@ -0,0 +1,25 @@
+# Generated by Django 5.1.7 on 2026-10-18 18:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("survey", "0009_backfill_survey_id"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="questionanswer",
+            name="survey",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="question_answers",
+                to="survey.survey",
+                verbose_name="Опрос",
+            ),
+        ),
+    ]
@@ -4,10 +4,13 @@ from django.db import models
 class Survey(models.Model):
     name = models.CharField(max_length=255, verbose_name="Название опроса")
     sort = models.IntegerField(default=0, verbose_name="Порядок сортировки")
+    revision = models.PositiveIntegerField(default=0, verbose_name="Ревизия")
 
     class Meta:
         verbose_name = "Опрос"
         verbose_name_plural = "Опросы"
+        # постраничный список опросов идет по (sort, id), см. ListSurveysQuery
+        indexes = [models.Index(fields=["sort", "id"], name="survey_sort_id")]
 
     def __str__(self):
         return self.name
@@ -36,17 +39,32 @@ class Question(models.Model):
 class Answer(models.Model):
     text = models.CharField(max_length=255, verbose_name="Текст ответа")
     sort = models.IntegerField(default=0, verbose_name="Порядок сортировки")
+    # Денормализованная ссылка на опрос, проставляется при привязке ответа к вопросу (QuestionAnswer.save)
+    survey = models.ForeignKey(
+        Survey,
+        on_delete=models.CASCADE,
+        related_name="answers",
+        null=True,
+        blank=True,
+        db_index=False,
+        verbose_name="Опрос",
+    )
 
     class Meta:
         ordering = ["sort"]
         verbose_name = "Ответ"
         verbose_name_plural = "Ответы"
+        indexes = [models.Index(fields=["survey", "id"], name="answer_survey_id")]
 
     def __str__(self):
         return self.text
 
 
 class QuestionAnswer(models.Model):
+    # Денормализованная ссылка на опрос вопроса: связи опроса читаются одним диапазоном индекса без JOIN
+    survey = models.ForeignKey(
+        Survey, on_delete=models.CASCADE, related_name="question_answers", db_index=False, verbose_name="Опрос"
+    )
     question = models.ForeignKey(
         Question, on_delete=models.CASCADE, related_name="question_answers", verbose_name="Вопрос", unique=False
     )
@@ -65,8 +83,80 @@ class QuestionAnswer(models.Model):
         verbose_name = "Связь вопроса и следующего вопроса"
         verbose_name_plural = "Связи вопросов и следующих вопросов"
         unique_together = ("question", "answer")
+        indexes = [models.Index(fields=["survey", "id"], name="question_answer_survey_id")]
 
     def __str__(self):
         return (
             f"{self.question.text} -> {self.answer.text} -> {self.next_question.text if self.next_question else 'None'}"
         )
+
+    def save(self, *args, **kwargs):
+        """
+        Заполняет survey по вопросу и привязывает к опросу ответ, у которого опрос еще не указан.
+        bulk_create save() не вызывает, там survey_id нужно передавать явно (см. ImportSurveysCommand).
+        """
+        # вопрос могли переназначить, поэтому опрос берется из него при каждом сохранении
+        self.survey_id = self.question.survey_id
+        super().save(*args, **kwargs)
+
+        # у загруженного ответа опрос виден без запроса, UPDATE нужен, только если он не указан
+        answer = self.answer if QuestionAnswer.answer.is_cached(self) else None
+        if answer is None or answer.survey_id is None:
+            Answer.objects.filter(id=self.answer_id, survey__isnull=True).update(survey_id=self.survey_id)
+            if answer is not None:
+                answer.survey_id = self.survey_id
+
+
+class RespondentAnswer(models.Model):
+    # Таблица пополняется пачками по несколько тысяч строк, поэтому индексы на question и answer не создаются:
+    # ответы читаются только в разрезе опроса по порядку id (индекс survey, id)
+    survey = models.ForeignKey(
+        Survey, on_delete=models.CASCADE, related_name="respondent_answers", verbose_name="Опрос", db_index=False
+    )
+    question = models.ForeignKey(
+        Question, on_delete=models.CASCADE, related_name="respondent_answers", verbose_name="Вопрос", db_index=False
+    )
+    answer = models.ForeignKey(
+        Answer, on_delete=models.CASCADE, related_name="respondent_answers", verbose_name="Ответ", db_index=False
+    )
+    respondent_id = models.CharField(max_length=64, verbose_name="Идентификатор респондента")
+    submitted_at = models.DateTimeField(verbose_name="Время отправки")
+
+    class Meta:
+        verbose_name = "Ответ респондента"
+        verbose_name_plural = "Ответы респондентов"
+        indexes = [models.Index(fields=["survey", "id"], name="respondent_answer_survey_id")]
+
+    def __str__(self):
+        return f"{self.respondent_id}: {self.question_id} -> {self.answer_id}"
+
+
+class AnswerCounter(models.Model):
+    answer = models.OneToOneField(
+        Answer, on_delete=models.CASCADE, primary_key=True, related_name="counter", verbose_name="Ответ"
+    )
+    survey = models.ForeignKey(Survey, on_delete=models.CASCADE, related_name="answer_counters", verbose_name="Опрос")
+    selected_count = models.PositiveBigIntegerField(default=0, verbose_name="Сколько раз выбран")
+
+    class Meta:
+        verbose_name = "Счетчик ответа"
+        verbose_name_plural = "Счетчики ответов"
+
+    def __str__(self):
+        return f"{self.answer_id}: {self.selected_count}"
+
+
+class QuestionCounter(models.Model):
+    question = models.OneToOneField(
+        Question, on_delete=models.CASCADE, primary_key=True, related_name="counter", verbose_name="Вопрос"
+    )
+    survey = models.ForeignKey(Survey, on_delete=models.CASCADE, related_name="question_counters", verbose_name="Опрос")
+    reached_count = models.PositiveBigIntegerField(default=0, verbose_name="Сколько раз показан")
+    drop_off_count = models.PositiveBigIntegerField(default=0, verbose_name="Сколько раз брошен")
+
+    class Meta:
+        verbose_name = "Счетчик вопроса"
+        verbose_name_plural = "Счетчики вопросов"
+
+    def __str__(self):
+        return f"{self.question_id}: {self.reached_count}/{self.drop_off_count}"
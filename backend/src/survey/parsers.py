@@ -0,0 +1,43 @@
+import codecs
+import json
+
+import msgpack
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class NDJSONParser(BaseParser):
+    """
+    Разбирает тело в формате NDJSON (один JSON-объект на строку) в список объектов.
+    """
+
+    media_type = "application/x-ndjson"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+
+        items = []
+        number = 0
+        try:
+            for number, line in enumerate(codecs.getreader(encoding)(stream), start=1):
+                if line.strip():
+                    items.append(json.loads(line))
+        except ValueError as exc:
+            raise ParseError(f"NDJSON parse error - строка {number}: {exc}")
+        return items
+
+
+class MessagePackParser(BaseParser):
+    """
+    Разбирает тело в формате MessagePack. Документ той же формы, что и в JSON (см. MessagePackRenderer).
+    """
+
+    media_type = "application/msgpack"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, TypeError) as exc:
+            raise ParseError(f"MessagePack parse error - {exc}")
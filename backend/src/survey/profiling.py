@@ -0,0 +1,106 @@
+import cProfile
+import hmac
+import io
+import logging
+import pstats
+import random
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+PROFILE_HEADER = "X-Survey-Profile"
+
+logger = logging.getLogger("survey.profiling")
+
+
+class ProfileStore:
+    """
+    Каталог профилей cProfile (.prof, формат pstats - открывается snakeviz, gprof2dot, python -m pstats).
+
+    Хранится не больше max_files последних профилей, более старые удаляются при каждой записи.
+    """
+
+    def __init__(self, directory: str | Path, max_files: int):
+        self.directory: Path = Path(directory)
+        self.max_files: int = max_files
+
+    @classmethod
+    def from_settings(cls) -> "ProfileStore":
+        return cls(settings.SURVEY_PROFILE_DIR, settings.SURVEY_PROFILE_MAX_FILES)
+
+    def save(self, profiler: cProfile.Profile, name: str) -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"{name}.prof"
+        profiler.dump_stats(path)
+        for stale in self.paths()[: -self.max_files]:
+            stale.unlink(missing_ok=True)
+        return path
+
+    def paths(self) -> list[Path]:
+        """
+        Профили от старых к новым (имя начинается с времени записи).
+        """
+        if not self.directory.is_dir():
+            return []
+        return sorted(self.directory.glob("*.prof"))
+
+    def aggregate(self, paths: list[Path], sort: str = "cumulative", limit: int = 30) -> str:
+        """
+        Сводка по нескольким профилям: функции с наибольшим суммарным временем.
+        """
+        output = io.StringIO()
+        stats = pstats.Stats(*map(str, paths), stream=output)
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        return output.getvalue()
+
+
+def should_profile(request) -> bool:
+    """
+    Профилируется доля запросов SURVEY_PROFILE_SAMPLE_RATE и запросы с заголовком X-Survey-Profile,
+    совпадающим с SURVEY_PROFILE_SECRET (пустой секрет отключает профилирование по заголовку).
+    """
+    secret = settings.SURVEY_PROFILE_SECRET
+    token = request.headers.get(PROFILE_HEADER)
+    if secret and token and hmac.compare_digest(token.encode(), secret.encode()):
+        return True
+    return random.random() < settings.SURVEY_PROFILE_SAMPLE_RATE
+
+
+class ProfiledViewMixin:
+    """
+    Примесь к APIView: выбранные should_profile запросы выполняются под cProfile, профиль сохраняется
+    в ProfileStore, а путь к нему пишется в лог survey.profiling. Клиенту имя профиля возвращается в заголовке
+    X-Survey-Profile только при DEBUG, чтобы не раскрывать файлы сервера.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if not should_profile(request):
+            return super().dispatch(request, *args, **kwargs)
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # в потоке уже работает другой профилировщик
+            return super().dispatch(request, *args, **kwargs)
+
+        started = time.time()
+        try:
+            response = super().dispatch(request, *args, **kwargs)
+            # DRF отрисовывает ответ после dispatch, отрисовка тоже попадает в профиль
+            if hasattr(response, "render") and not response.is_rendered:
+                response.render()
+        finally:
+            profiler.disable()
+
+        duration_ms = round((time.time() - started) * 1000)
+        name = (
+            f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime(started))}-{int(started * 1e6) % 1_000_000:06d}"
+            f"-{type(self).__name__}-{request.method}-{response.status_code}-{duration_ms}ms"
+        )
+        path = ProfileStore.from_settings().save(profiler, name)
+        logger.info("Профиль запроса сохранен: %s", path)
+        if settings.DEBUG:
+            response[PROFILE_HEADER] = path.name
+        return response
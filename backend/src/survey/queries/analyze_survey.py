@@ -0,0 +1,35 @@
+from rest_framework import status
+
+from ..graph import SurveyGraphCache
+from ..models import Survey
+
+
+class AnalyzeSurveyQuery:
+
+    def __init__(self, survey_model: type[Survey], graph_cache: SurveyGraphCache):
+        self.survey_model: type[Survey] = survey_model
+        self.graph_cache: SurveyGraphCache = graph_cache
+
+    def __call__(self, survey_id: int) -> tuple[dict, int]:
+        """
+        Считает число путей респондента, наименьшую и наибольшую длину прохождения и глубину каждого вопроса
+        для текущей ревизии опроса.
+
+        :param survey_id: ID опроса.
+        :return: Кортеж из результатов анализа и HTTP-статуса. Если в графе есть циклы, возвращается 409
+            со списком циклов.
+        """
+
+        revision: int | None = self.survey_model.objects.filter(id=survey_id).values_list("revision", flat=True).first()
+        if revision is None:
+            return {"detail": "Опрос не найден."}, status.HTTP_404_NOT_FOUND
+
+        graph = self.graph_cache.get(survey_id, revision)
+        analytics = graph.analyze()
+        if analytics is None:
+            return {
+                "detail": "Граф переходов опроса содержит циклы.",
+                "cycles": graph.validate()["cycles"],
+            }, status.HTTP_409_CONFLICT
+
+        return analytics, status.HTTP_200_OK
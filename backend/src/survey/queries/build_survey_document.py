@@ -0,0 +1,90 @@
+from ..models import Question, QuestionAnswer, Survey
+from ..timing import span
+
+
+class BuildSurveyDocumentQuery:
+    """
+    Быстрая сборка документа опроса только для чтения.
+
+    Документ совпадает с SurveySerializer(LoadSurveyTreeQuery()(survey_id)).data, но собирается из кортежей
+    values_list в обычные dict без моделей, полей DRF и ReturnDict.
+    """
+
+    QUESTION_FIELDS = ("id", "text", "short_text", "q_type", "meta")
+    ANSWER_FIELDS = ("question_id", "answer_id", "answer__text", "answer__sort", "next_question_id")
+
+    def __init__(self, survey_model: type[Survey]):
+        self.survey_model: type[Survey] = survey_model
+
+    def __call__(self, survey_id: int) -> tuple[dict, int] | None:
+        """
+        Собирает документ опроса за три запроса: опрос, вопросы, связи вместе с ответами.
+
+        :param survey_id: ID опроса.
+        :return: Документ опроса и ревизия, из которой он собран, или None, если опрос не найден.
+        """
+
+        with span("survey.load"):
+            survey = self.survey_model.objects.filter(id=survey_id).values_list("id", "name", "revision").first()
+            if survey is None:
+                return None
+
+            questions = list(self._questions(survey_id))
+            question_answers = list(self._question_answers(survey_id))
+        with span("survey.serialize"):
+            return self.build(survey, questions, question_answers)
+
+    async def acall(self, survey_id: int) -> tuple[dict, int] | None:
+        """
+        Асинхронный вариант __call__, те же запросы выполняются через async ORM.
+        """
+
+        with span("survey.load"):
+            survey = await self.survey_model.objects.filter(id=survey_id).values_list("id", "name", "revision").afirst()
+            if survey is None:
+                return None
+
+            questions = [question async for question in self._questions(survey_id)]
+            question_answers = [question_answer async for question_answer in self._question_answers(survey_id)]
+        with span("survey.serialize"):
+            return self.build(survey, questions, question_answers)
+
+    def _questions(self, survey_id: int):
+        return Question.objects.filter(survey_id=survey_id).order_by("pk").values_list(*self.QUESTION_FIELDS)
+
+    def _question_answers(self, survey_id: int):
+        return QuestionAnswer.objects.filter(survey_id=survey_id).order_by("pk").values_list(*self.ANSWER_FIELDS)
+
+    @staticmethod
+    def build(survey: tuple, questions: list[tuple], question_answers: list[tuple]) -> tuple[dict, int]:
+        # порядок ключей повторяет порядок полей в Meta.fields сериализаторов
+        answers_by_question: dict[int, list[dict]] = {question[0]: [] for question in questions}
+        for question_id, answer_id, text, sort, next_question_id in question_answers:
+            answers_by_question[question_id].append(
+                {
+                    "id": answer_id,
+                    "text": text,
+                    "sort": sort,
+                    "question_id": question_id,
+                    "next_question_id": next_question_id,
+                }
+            )
+
+        survey_id, name, revision = survey
+        document = {
+            "id": survey_id,
+            "name": name,
+            "revision": revision,
+            "questions": [
+                {
+                    "id": question_id,
+                    "text": text,
+                    "short_text": short_text,
+                    "type": q_type,
+                    "meta": meta,
+                    "answers": answers_by_question[question_id],
+                }
+                for question_id, text, short_text, q_type, meta in questions
+            ],
+        }
+        return document, revision
@@ -0,0 +1,89 @@
+import csv
+import json
+from collections.abc import Iterator
+
+from django.conf import settings
+from rest_framework import status
+
+from ..models import Answer, Question, RespondentAnswer, Survey
+
+
+class _LineBuffer:
+    """
+    Буфер для csv.writer: writerow возвращает готовую строку вместо записи в файл.
+    """
+
+    def write(self, value: str) -> str:
+        return value
+
+
+class ExportResponsesQuery:
+    CONTENT_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+    COLUMNS = ["respondent_id", "submitted_at", "question_id", "question_text", "answer_id", "answer_text"]
+
+    def __init__(self, survey_model: type[Survey], respondent_answer_model: type[RespondentAnswer]):
+        self.survey_model: type[Survey] = survey_model
+        self.respondent_answer_model: type[RespondentAnswer] = respondent_answer_model
+
+    def __call__(self, survey_id: int, export_format: str) -> tuple[Iterator[bytes] | dict, int]:
+        """
+        Готовит потоковую выгрузку ответов респондентов опроса.
+
+        Тексты вопросов и ответов загружаются заранее одним запросом на модель, сами ответы респондентов читаются
+        серверным курсором (iterator) пачками по SURVEY_EXPORT_CHUNK_SIZE строк и сразу кодируются, поэтому
+        расход памяти не зависит от объема выгрузки.
+
+        :param survey_id: ID опроса.
+        :param export_format: ndjson или csv.
+        :return: Кортеж из генератора частей файла (или описания ошибки) и HTTP-статуса.
+        """
+
+        if export_format not in self.CONTENT_TYPES:
+            return {"detail": f"Неизвестный формат выгрузки {export_format}."}, status.HTTP_400_BAD_REQUEST
+
+        if not self.survey_model.objects.filter(id=survey_id).exists():
+            return {"detail": "Опрос не найден."}, status.HTTP_404_NOT_FOUND
+
+        question_texts = dict(Question.objects.filter(survey_id=survey_id).values_list("id", "text"))
+        answer_texts = dict(Answer.objects.filter(survey_id=survey_id).values_list("id", "text"))
+        rows = (
+            self.respondent_answer_model.objects.filter(survey_id=survey_id)
+            .order_by("id")
+            .values_list("respondent_id", "submitted_at", "question_id", "answer_id")
+            .iterator(chunk_size=settings.SURVEY_EXPORT_CHUNK_SIZE)
+        )
+        records = (
+            (
+                respondent_id,
+                submitted_at.isoformat(),
+                question_id,
+                question_texts.get(question_id, ""),
+                answer_id,
+                answer_texts.get(answer_id, ""),
+            )
+            for respondent_id, submitted_at, question_id, answer_id in rows
+        )
+
+        encode = self._encode_csv if export_format == "csv" else self._encode_ndjson
+        return encode(records), status.HTTP_200_OK
+
+    def _encode_ndjson(self, records: Iterator[tuple]) -> Iterator[bytes]:
+        lines = []
+        for record in records:
+            lines.append(json.dumps(dict(zip(self.COLUMNS, record)), ensure_ascii=False))
+            if len(lines) == settings.SURVEY_EXPORT_CHUNK_SIZE:
+                yield ("\n".join(lines) + "\n").encode()
+                lines = []
+        if lines:
+            yield ("\n".join(lines) + "\n").encode()
+
+    def _encode_csv(self, records: Iterator[tuple]) -> Iterator[bytes]:
+        writer = csv.writer(_LineBuffer())
+        lines = [writer.writerow(self.COLUMNS)]
+        for record in records:
+            lines.append(writer.writerow(record))
+            if len(lines) == settings.SURVEY_EXPORT_CHUNK_SIZE:
+                yield "".join(lines).encode()
+                lines = []
+        if lines:
+            yield "".join(lines).encode()
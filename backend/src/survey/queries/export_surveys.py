@@ -0,0 +1,65 @@
+from collections import defaultdict
+from collections.abc import Iterator
+
+from ..models import Question, QuestionAnswer, Survey
+from .build_survey_document import BuildSurveyDocumentQuery
+
+
+class ExportSurveysQuery:
+
+    def __init__(self, survey_model: type[Survey], chunk_size: int = 500):
+        self.survey_model: type[Survey] = survey_model
+        self.chunk_size: int = chunk_size
+
+    def __call__(self, survey_ids: list[int] | None = None) -> Iterator[dict]:
+        """
+        Выгружает опросы в формате обмена: документ опроса (как в GET /api/survey/<id>/) с полем sort.
+
+        Опросы читаются пачками по chunk_size, на пачку приходится три запроса (опросы, вопросы, связи
+        с ответами), поэтому выгрузка каталога не делает запросов на каждый опрос.
+
+        :param survey_ids: ID выгружаемых опросов, None - все опросы.
+        :return: Генератор документов опросов в порядке id.
+        """
+
+        surveys = self.survey_model.objects.order_by("id")
+        if survey_ids is not None:
+            surveys = surveys.filter(id__in=survey_ids)
+
+        chunk = []
+        for survey in surveys.values_list("id", "name", "revision", "sort").iterator(chunk_size=self.chunk_size):
+            chunk.append(survey)
+            if len(chunk) == self.chunk_size:
+                yield from self._export_chunk(chunk)
+                chunk = []
+        if chunk:
+            yield from self._export_chunk(chunk)
+
+    def _export_chunk(self, surveys: list[tuple]) -> Iterator[dict]:
+        survey_ids = [survey[0] for survey in surveys]
+        questions_by_survey: dict[int, list[tuple]] = defaultdict(list)
+        survey_by_question: dict[int, int] = {}
+        for survey_id, *question in (
+            Question.objects.filter(survey_id__in=survey_ids)
+            .order_by("pk")
+            .values_list("survey_id", *BuildSurveyDocumentQuery.QUESTION_FIELDS)
+        ):
+            questions_by_survey[survey_id].append(tuple(question))
+            survey_by_question[question[0]] = survey_id
+
+        question_answers_by_survey: dict[int, list[tuple]] = defaultdict(list)
+        for question_answer in (
+            QuestionAnswer.objects.filter(survey_id__in=survey_ids)
+            .order_by("pk")
+            .values_list(*BuildSurveyDocumentQuery.ANSWER_FIELDS)
+        ):
+            question_answers_by_survey[survey_by_question[question_answer[0]]].append(question_answer)
+
+        for survey_id, name, revision, sort in surveys:
+            document, _ = BuildSurveyDocumentQuery.build(
+                (survey_id, name, revision),
+                questions_by_survey[survey_id],
+                question_answers_by_survey[survey_id],
+            )
+            document["sort"] = sort
+            yield document
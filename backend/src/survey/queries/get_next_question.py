@@ -0,0 +1,55 @@
+from rest_framework import status
+
+from ..graph import SurveyGraphCache, SurveyGraphError
+from ..models import Survey
+
+
+class GetNextQuestionQuery:
+
+    def __init__(self, survey_model: type[Survey], graph_cache: SurveyGraphCache):
+        self.survey_model: type[Survey] = survey_model
+        self.graph_cache: SurveyGraphCache = graph_cache
+
+    def __call__(self, survey_id: int, question_id: int, answer_ids: list[int]) -> tuple[dict, int]:
+        """
+        Определяет, какой вопрос показать респонденту после ответа на текущий.
+
+        Переход ищется в скомпилированном графе текущей ревизии опроса, поэтому на каждый шаг приходится
+        один запрос ревизии, а граф собирается только после изменения опроса.
+
+        :param survey_id: ID опроса.
+        :param question_id: ID текущего вопроса.
+        :param answer_ids: ID выбранных ответов.
+        :return: Кортеж из id следующего вопроса (None - опрос закончен) и HTTP-статуса.
+        """
+
+        revision: int | None = self.survey_model.objects.filter(id=survey_id).values_list("revision", flat=True).first()
+        if revision is None:
+            return {"detail": "Опрос не найден."}, status.HTTP_404_NOT_FOUND
+
+        graph = self.graph_cache.get(survey_id, revision)
+        try:
+            next_question_id = graph.next_question(question_id, answer_ids)
+        except SurveyGraphError as e:
+            return {"detail": str(e)}, status.HTTP_400_BAD_REQUEST
+
+        return {"question_id": question_id, "next_question_id": next_question_id}, status.HTTP_200_OK
+
+    async def acall(self, survey_id: int, question_id: int, answer_ids: list[int]) -> tuple[dict, int]:
+        """
+        Асинхронный вариант __call__: ревизия читается через async ORM, граф берется из памяти процесса.
+        """
+
+        revision: int | None = (
+            await self.survey_model.objects.filter(id=survey_id).values_list("revision", flat=True).afirst()
+        )
+        if revision is None:
+            return {"detail": "Опрос не найден."}, status.HTTP_404_NOT_FOUND
+
+        graph = await self.graph_cache.aget(survey_id, revision)
+        try:
+            next_question_id = graph.next_question(question_id, answer_ids)
+        except SurveyGraphError as e:
+            return {"detail": str(e)}, status.HTTP_400_BAD_REQUEST
+
+        return {"question_id": question_id, "next_question_id": next_question_id}, status.HTTP_200_OK
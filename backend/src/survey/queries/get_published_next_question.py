@@ -0,0 +1,31 @@
+from rest_framework import status
+
+from ..graph import SurveyGraphError
+from ..snapshots import SnapshotStore
+
+
+class GetPublishedNextQuestionQuery:
+
+    def __init__(self, snapshot_store: SnapshotStore):
+        self.snapshot_store: SnapshotStore = snapshot_store
+
+    def __call__(self, survey_id: int, question_id: int, answer_ids: list[int]) -> tuple[dict, int]:
+        """
+        Определяет следующий вопрос по опубликованному снимку опроса (см. GetNextQuestionQuery), без обращения к БД.
+
+        :param survey_id: ID опроса.
+        :param question_id: ID текущего вопроса.
+        :param answer_ids: ID выбранных ответов.
+        :return: Кортеж из id следующего вопроса (None - опрос закончен) и HTTP-статуса.
+        """
+
+        snapshot = self.snapshot_store.get(survey_id)
+        if snapshot is None:
+            return {"detail": "Опрос не опубликован."}, status.HTTP_404_NOT_FOUND
+
+        try:
+            next_question_id = snapshot.next_question(question_id, answer_ids)
+        except SurveyGraphError as e:
+            return {"detail": str(e)}, status.HTTP_400_BAD_REQUEST
+
+        return {"question_id": question_id, "next_question_id": next_question_id}, status.HTTP_200_OK
@@ -0,0 +1,28 @@
+from rest_framework import status
+
+from ..graph import SurveyGraphError
+from ..snapshots import SnapshotStore
+
+
+class GetPublishedQuestionQuery:
+
+    def __init__(self, snapshot_store: SnapshotStore):
+        self.snapshot_store: SnapshotStore = snapshot_store
+
+    def __call__(self, survey_id: int, question_id: int) -> tuple[dict, int]:
+        """
+        Вопрос опубликованного опроса с ответами, прочитанный из снимка без обращения к БД.
+
+        :param survey_id: ID опроса.
+        :param question_id: ID вопроса.
+        :return: Кортеж из вопроса (в форме документа опроса) и HTTP-статуса.
+        """
+
+        snapshot = self.snapshot_store.get(survey_id)
+        if snapshot is None:
+            return {"detail": "Опрос не опубликован."}, status.HTTP_404_NOT_FOUND
+
+        try:
+            return snapshot.question(question_id), status.HTTP_200_OK
+        except SurveyGraphError as e:
+            return {"detail": str(e)}, status.HTTP_404_NOT_FOUND
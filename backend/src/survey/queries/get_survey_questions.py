@@ -1,28 +1,103 @@
 from rest_framework import status
 
+from ..cache import SurveyDocumentCache
 from ..models import Survey
 from ..serializers import SurveySerializer
+from ..timing import span
+from .build_survey_document import BuildSurveyDocumentQuery
+from .load_survey_tree import LoadSurveyTreeQuery
 
 
 class GetSurveyQuestionsQuery:
 
-    def __init__(self, survey_model: type[Survey], survey_serializer: type[SurveySerializer]):
+    def __init__(
+        self,
+        survey_model: type[Survey],
+        survey_serializer: type[SurveySerializer],
+        survey_cache: SurveyDocumentCache | None = None,
+        document_query: BuildSurveyDocumentQuery | None = None,
+    ):
         self.survey_model: type[Survey] = survey_model
         self.survey_serializer: type[SurveySerializer] = survey_serializer
+        self.survey_cache: SurveyDocumentCache | None = survey_cache
+        self.document_query: BuildSurveyDocumentQuery | None = document_query
 
-    def __call__(self, survey_id: int) -> tuple[dict, int]:
+    def __call__(self, survey_id: int, revision: int | None = None) -> tuple[dict, int]:
         """
         Получает список вопросов для указанного опроса.
 
+        Если передан кэш, документ ищется в нем по id и текущей ревизии опроса, и дерево опроса загружается
+        и сериализуется только при промахе. Если передан document_query, документ собирается им из values_list
+        в обход сериализаторов.
+
         :param survey_id: ID опроса.
+        :param revision: Уже известная текущая ревизия опроса, чтобы не запрашивать ее повторно.
         :return: Кортеж из данных опроса (с вопросами, ответами и связями) и HTTP-статуса.
         """
 
-        survey: Survey | None = self.survey_model.objects.filter(id=survey_id).first()
+        if self.survey_cache is not None:
+            if revision is None:
+                revision = self.survey_model.objects.filter(id=survey_id).values_list("revision", flat=True).first()
+            if revision is None:
+                return {"detail": "Опрос не найден."}, status.HTTP_404_NOT_FOUND
 
-        if survey is None:
+            document: dict | None = self.survey_cache.get(survey_id, revision)
+            if document is not None:
+                return document, status.HTTP_200_OK
+
+        if self.document_query is not None:
+            loaded = self.document_query(survey_id)
+        else:
+            with span("survey.load"):
+                survey = LoadSurveyTreeQuery(survey_model=self.survey_model)(survey_id)
+            loaded = self._serialize(survey)
+
+        if loaded is None:
+            return {"detail": "Опрос не найден."}, status.HTTP_404_NOT_FOUND
+
+        document, revision = loaded
+        if self.survey_cache is not None:
+            self.survey_cache.set(survey_id, revision, document)
+
+        return document, status.HTTP_200_OK
+
+    async def acall(self, survey_id: int, revision: int | None = None) -> tuple[dict, int]:
+        """
+        Асинхронный вариант __call__ для ASGI: ревизия и дерево опроса читаются через async ORM, документ
+        ищется в кэше через aget, поэтому при попадании в кэш поток не занимается вовсе.
+        """
+
+        if self.survey_cache is not None:
+            if revision is None:
+                revision = (
+                    await self.survey_model.objects.filter(id=survey_id).values_list("revision", flat=True).afirst()
+                )
+            if revision is None:
+                return {"detail": "Опрос не найден."}, status.HTTP_404_NOT_FOUND
+
+            document: dict | None = await self.survey_cache.aget(survey_id, revision)
+            if document is not None:
+                return document, status.HTTP_200_OK
+
+        if self.document_query is not None:
+            loaded = await self.document_query.acall(survey_id)
+        else:
+            with span("survey.load"):
+                survey = await LoadSurveyTreeQuery(survey_model=self.survey_model).acall(survey_id)
+            loaded = self._serialize(survey)
+
+        if loaded is None:
             return {"detail": "Опрос не найден."}, status.HTTP_404_NOT_FOUND
 
-        serializer: SurveySerializer = self.survey_serializer(survey)
+        document, revision = loaded
+        if self.survey_cache is not None:
+            await self.survey_cache.aset(survey_id, revision, document)
 
-        return serializer.data, status.HTTP_200_OK
+        return document, status.HTTP_200_OK
+
+    def _serialize(self, survey: Survey | None) -> tuple[dict, int] | None:
+        # все связи уже предзагружены, сериализация не обращается к БД
+        if survey is None:
+            return None
+        with span("survey.serialize"):
+            return self.survey_serializer(survey).data, survey.revision
@@ -0,0 +1,51 @@
+from rest_framework import status
+
+from ..graph import SurveyGraphCache
+from ..models import AnswerCounter, QuestionCounter, Survey
+
+
+class GetSurveyStatsQuery:
+
+    def __init__(self, survey_model: type[Survey], graph_cache: SurveyGraphCache):
+        self.survey_model: type[Survey] = survey_model
+        self.graph_cache: SurveyGraphCache = graph_cache
+
+    def __call__(self, survey_id: int) -> tuple[dict, int]:
+        """
+        Возвращает текущие значения счетчиков ответов респондентов по вопросам и ответам опроса.
+
+        Счетчики поддерживаются при загрузке ответов, поэтому чтение не зависит от числа ответов респондентов:
+        по одному запросу на таблицу счетчиков, порядок вопросов и ответов берется из графа текущей ревизии.
+
+        :param survey_id: ID опроса.
+        :return: Кортеж из статистики и HTTP-статуса.
+        """
+
+        revision: int | None = self.survey_model.objects.filter(id=survey_id).values_list("revision", flat=True).first()
+        if revision is None:
+            return {"detail": "Опрос не найден."}, status.HTTP_404_NOT_FOUND
+
+        graph = self.graph_cache.get(survey_id, revision)
+        selected = dict(AnswerCounter.objects.filter(survey_id=survey_id).values_list("answer_id", "selected_count"))
+        reached = {
+            question_id: (reached_count, drop_off_count)
+            for question_id, reached_count, drop_off_count in QuestionCounter.objects.filter(
+                survey_id=survey_id
+            ).values_list("question_id", "reached_count", "drop_off_count")
+        }
+
+        questions = []
+        for node in graph.nodes:
+            reached_count, drop_off_count = reached.get(node.id, (0, 0))
+            questions.append(
+                {
+                    "question_id": node.id,
+                    "reached_count": reached_count,
+                    "drop_off_count": drop_off_count,
+                    "answers": [
+                        {"answer_id": graph.answer_ids[slot], "selected_count": selected.get(graph.answer_ids[slot], 0)}
+                        for slot in range(node.first_answer, node.last_answer)
+                    ],
+                }
+            )
+        return {"revision": revision, "questions": questions}, status.HTTP_200_OK
@@ -0,0 +1,110 @@
+from rest_framework import status
+
+from ..graph import SurveyGraphCache, SurveyGraphError
+from ..models import Question, QuestionAnswer, Survey
+from ..timing import span
+
+
+class GetSurveySubsetQuery:
+    """
+    Часть документа опроса: выбранные поля вопросов и ответов и/или только вопросы, достижимые от заданного
+    вопроса не больше чем за depth переходов.
+
+    Достижимые вопросы ищутся обходом в ширину по скомпилированному графу из памяти процесса, из БД читаются только
+    эти вопросы и только нужные столбцы; таблица ответов не соединяется, если не запрошены их text или sort.
+    Ключи в документе идут в том же порядке, что и в полном документе (см. BuildSurveyDocumentQuery).
+    """
+
+    # поле документа -> столбец values_list
+    QUESTION_COLUMNS = {"text": "text", "short_text": "short_text", "type": "q_type", "meta": "meta"}
+    ANSWER_COLUMNS = {
+        "text": "answer__text",
+        "sort": "answer__sort",
+        "question_id": "question_id",
+        "next_question_id": "next_question_id",
+    }
+
+    def __init__(self, survey_model: type[Survey], graph_cache: SurveyGraphCache):
+        self.survey_model: type[Survey] = survey_model
+        self.graph_cache: SurveyGraphCache = graph_cache
+
+    @classmethod
+    def parse_fields(cls, value: str) -> tuple[list[str], list[str] | None]:
+        """
+        Разбирает параметр fields: имена полей вопроса и полей ответа с префиксом answers. через запятую,
+        например short_text,answers.next_question_id. answers без поля означает все поля ответа. id вопросов
+        и ответов возвращаются всегда.
+
+        :return: Поля вопроса и поля ответа (None - ответы не нужны) в порядке полного документа.
+        :raises ValueError: Неизвестное поле.
+        """
+        names = {name.strip() for name in value.split(",") if name.strip()}
+        unknown = names - {"id", "answers", *cls.QUESTION_COLUMNS, *(f"answers.{name}" for name in cls.ANSWER_COLUMNS)}
+        unknown.discard("answers.id")
+        if unknown:
+            raise ValueError(f"Неизвестные поля: {', '.join(sorted(unknown))}.")
+
+        question_fields = [name for name in cls.QUESTION_COLUMNS if name in names]
+        answer_fields = None
+        if "answers" in names:
+            answer_fields = list(cls.ANSWER_COLUMNS)
+        elif any(name.startswith("answers.") for name in names):
+            answer_fields = [name for name in cls.ANSWER_COLUMNS if f"answers.{name}" in names]
+        return question_fields, answer_fields
+
+    def __call__(
+        self,
+        survey_id: int,
+        fields: tuple[list[str], list[str] | None] | None = None,
+        root: int | None = None,
+        depth: int | None = None,
+    ) -> tuple[dict, int]:
+        """
+        :param survey_id: ID опроса.
+        :param fields: Результат parse_fields, None - все поля.
+        :param root: ID вопроса, от которого строится подграф, None - все вопросы опроса.
+        :param depth: Наибольшее число переходов от root, None - без ограничения.
+        :return: Кортеж из документа опроса и HTTP-статуса.
+        """
+        question_fields, answer_fields = fields or (list(self.QUESTION_COLUMNS), list(self.ANSWER_COLUMNS))
+
+        with span("survey.load"):
+            survey = self.survey_model.objects.filter(id=survey_id).values_list("id", "name", "revision").first()
+            if survey is None:
+                return {"detail": "Опрос не найден."}, status.HTTP_404_NOT_FOUND
+
+            questions = Question.objects.filter(survey_id=survey_id)
+            question_answers = QuestionAnswer.objects.filter(survey_id=survey_id)
+            if root is not None:
+                graph = self.graph_cache.get(survey_id, survey[2])
+                try:
+                    question_ids = graph.reachable(root, depth)
+                except SurveyGraphError as e:
+                    return {"detail": str(e)}, status.HTTP_400_BAD_REQUEST
+                if len(question_ids) < len(graph.nodes):
+                    questions = questions.filter(id__in=question_ids)
+                    question_answers = question_answers.filter(question_id__in=question_ids)
+
+            question_columns = [self.QUESTION_COLUMNS[name] for name in question_fields]
+            question_rows = list(questions.order_by("pk").values_list("id", *question_columns))
+            answer_rows = []
+            if answer_fields is not None:
+                answer_columns = [self.ANSWER_COLUMNS[name] for name in answer_fields]
+                answer_rows = list(
+                    question_answers.order_by("pk").values_list("question_id", "answer_id", *answer_columns)
+                )
+
+        with span("survey.serialize"):
+            answers_by_question: dict[int, list[dict]] = {row[0]: [] for row in question_rows}
+            for question_id, answer_id, *values in answer_rows:
+                answers_by_question[question_id].append({"id": answer_id, **dict(zip(answer_fields, values))})
+
+            documents = []
+            for question_id, *values in question_rows:
+                question = {"id": question_id, **dict(zip(question_fields, values))}
+                if answer_fields is not None:
+                    question["answers"] = answers_by_question[question_id]
+                documents.append(question)
+
+        survey_id, name, revision = survey
+        return {"id": survey_id, "name": name, "revision": revision, "questions": documents}, status.HTTP_200_OK
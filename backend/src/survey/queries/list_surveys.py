@@ -0,0 +1,76 @@
+import base64
+import binascii
+import json
+
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from rest_framework import status
+
+from ..models import Question, Survey
+
+
+class ListSurveysQuery:
+    DEFAULT_PAGE_SIZE = 50
+    MAX_PAGE_SIZE = 200
+
+    def __init__(self, survey_model: type[Survey]):
+        self.survey_model: type[Survey] = survey_model
+
+    def __call__(self, cursor: str | None = None, page_size: int | None = None) -> tuple[dict, int]:
+        """
+        Возвращает страницу кратких описаний опросов, упорядоченных по (sort, id).
+
+        Используется keyset-пагинация: курсор хранит (sort, id) последнего опроса страницы, и следующая страница
+        читается по индексу survey_sort_id с этой позиции без OFFSET. Число вопросов считается коррелированным
+        подзапросом только для опросов страницы, поэтому страница - это один запрос при любом размере каталога.
+
+        :param cursor: Курсор из поля next предыдущей страницы, None - первая страница.
+        :param page_size: Размер страницы, не больше MAX_PAGE_SIZE.
+        :return: Кортеж из {"results": [...], "next_cursor": str | None} и HTTP-статуса.
+        """
+
+        page_size = min(page_size or self.DEFAULT_PAGE_SIZE, self.MAX_PAGE_SIZE)
+        question_count = (
+            Question.objects.filter(survey_id=OuterRef("pk"))
+            .order_by()
+            .values("survey_id")
+            .annotate(count=Count("pk"))
+            .values("count")
+        )
+        surveys = self.survey_model.objects.annotate(
+            question_count=Coalesce(Subquery(question_count, output_field=IntegerField()), 0)
+        ).order_by("sort", "id")
+
+        if cursor is not None:
+            try:
+                sort, survey_id = self.decode_cursor(cursor)
+            except ValueError:
+                return {"detail": "Некорректный курсор."}, status.HTTP_400_BAD_REQUEST
+            # (sort, id) > (курсор): диапазон по индексу от sort, совпадающие sort отсекаются по id
+            surveys = surveys.filter(sort__gte=sort).exclude(sort=sort, id__lte=survey_id)
+
+        # лишняя строка показывает, есть ли следующая страница
+        rows = list(surveys.values_list("id", "name", "sort", "question_count")[: page_size + 1])
+        has_next = len(rows) > page_size
+        rows = rows[:page_size]
+
+        results = [
+            {"id": survey_id, "name": name, "sort": sort, "question_count": count}
+            for survey_id, name, sort, count in rows
+        ]
+        next_cursor = self.encode_cursor(rows[-1][2], rows[-1][0]) if has_next else None
+        return {"results": results, "next_cursor": next_cursor}, status.HTTP_200_OK
+
+    @staticmethod
+    def encode_cursor(sort: int, survey_id: int) -> str:
+        return base64.urlsafe_b64encode(json.dumps([sort, survey_id]).encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> tuple[int, int]:
+        try:
+            sort, survey_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (binascii.Error, UnicodeError, TypeError, ValueError) as e:
+            raise ValueError(cursor) from e
+        if not isinstance(sort, int) or not isinstance(survey_id, int):
+            raise ValueError(cursor)
+        return sort, survey_id
@@ -0,0 +1,40 @@
+from django.db.models import Prefetch
+
+from ..models import Question, QuestionAnswer, Survey
+
+
+class LoadSurveyTreeQuery:
+
+    def __init__(self, survey_model: type[Survey]):
+        self.survey_model: type[Survey] = survey_model
+
+    def __call__(self, survey_id: int) -> Survey | None:
+        """
+        Загружает опрос целиком: вопросы, связи вопрос-ответ и ответы.
+
+        Дерево Survey -> Question -> QuestionAnswer -> Answer поднимается за фиксированное число запросов
+        (опрос, вопросы, связи вместе с ответами) независимо от размера опроса, поэтому сериализаторы
+        работают только с уже загруженными объектами.
+
+        :param survey_id: ID опроса.
+        :return: Объект опроса с предзагруженными вопросами и ответами или None, если опрос не найден.
+        """
+
+        return self._queryset(survey_id).first()
+
+    async def acall(self, survey_id: int) -> Survey | None:
+        """
+        Асинхронный вариант загрузки дерева опроса, те же запросы выполняются через async ORM.
+        """
+        return await self._queryset(survey_id).afirst()
+
+    def _queryset(self, survey_id: int):
+        # связи всего опроса читаются по индексу (survey, id)
+        question_answers = QuestionAnswer.objects.filter(survey_id=survey_id).select_related("answer").order_by("pk")
+        questions = Question.objects.order_by("pk").prefetch_related(
+            Prefetch("question_answers", queryset=question_answers)
+        )
+
+        return self.survey_model.objects.filter(id=survey_id).prefetch_related(
+            Prefetch("questions", queryset=questions)
+        )
@@ -0,0 +1,25 @@
+from rest_framework import status
+
+from ..graph import SurveyGraphCache
+from ..models import Survey
+
+
+class ValidateSurveyQuery:
+
+    def __init__(self, survey_model: type[Survey], graph_cache: SurveyGraphCache):
+        self.survey_model: type[Survey] = survey_model
+        self.graph_cache: SurveyGraphCache = graph_cache
+
+    def __call__(self, survey_id: int) -> tuple[dict, int]:
+        """
+        Проверяет граф переходов текущей ревизии опроса: циклы, недостижимые вопросы и ответы без продолжения.
+
+        :param survey_id: ID опроса.
+        :return: Кортеж из отчета о проверке и HTTP-статуса.
+        """
+
+        revision: int | None = self.survey_model.objects.filter(id=survey_id).values_list("revision", flat=True).first()
+        if revision is None:
+            return {"detail": "Опрос не найден."}, status.HTTP_404_NOT_FOUND
+
+        return self.graph_cache.get(survey_id, revision).validate(), status.HTTP_200_OK
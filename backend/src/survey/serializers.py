@@ -1,6 +1,8 @@
 from rest_framework import serializers
 
 from .models import Answer, Question, QuestionAnswer, Survey
+from .queries.get_survey_subset import GetSurveySubsetQuery
+from .queries.list_surveys import ListSurveysQuery
 
 
 class QuestionAnswerSerializer(serializers.ModelSerializer):
@@ -25,13 +27,24 @@ class AnswerSerializer(serializers.ModelSerializer):
         model = Answer
         fields = ["id", "text", "sort", "question_id", "next_question_id"]
 
-    def get_question_id(self, obj):
-        question_answer = obj.question_answers.first()
-        return question_answer.question.id if question_answer and question_answer.question else None
+    def get_question_id(self, obj) -> int | None:
+        question_answer = self._get_question_answer(obj)
+        return question_answer.question_id if question_answer else None
 
-    def get_next_question_id(self, obj):
-        question_answer = obj.question_answers.first()
-        return question_answer.next_question.id if question_answer and question_answer.next_question else None
+    def get_next_question_id(self, obj) -> int | None:
+        question_answer = self._get_question_answer(obj)
+        return question_answer.next_question_id if question_answer else None
+
+    def _get_question_answer(self, obj: Answer) -> QuestionAnswer | None:
+        """
+        Возвращает связь ответа с вопросом.
+
+        Если связь уже подставлена при обходе вопроса (см. QuestionSerializer.get_answers), запрос в БД не делается.
+        """
+        question_answer = getattr(obj, "question_answer", None)
+        if question_answer is None:
+            question_answer = obj.question_answers.first()
+        return question_answer
 
 
 class QuestionSerializer(serializers.ModelSerializer):
@@ -46,15 +59,205 @@ class QuestionSerializer(serializers.ModelSerializer):
         """
         Получает все ответы, связанные с вопросом через QuestionAnswer.
         """
-        answers = [qa.answer for qa in obj.question_answers.all()]
+        answers = []
+        for question_answer in obj.question_answers.all():
+            answer = question_answer.answer
+            answer.question_answer = question_answer
+            answers.append(answer)
         return AnswerSerializer(answers, many=True).data
 
 
 class SurveySerializer(serializers.ModelSerializer):
     questions = QuestionSerializer(many=True)
     id = serializers.IntegerField(read_only=True, required=False)
+    revision = serializers.IntegerField(
+        required=False, help_text="Ревизия опроса; при изменении опроса другим пользователем PUT вернет 409"
+    )
 
     class Meta:
         model = Survey
-        fields = ["id", "name", "questions"]
+        fields = ["id", "name", "revision", "questions"]
         read_only_fields = ["id"]
+
+
+class QuestionFieldsSerializer(serializers.ModelSerializer):
+    type = serializers.CharField(source="q_type")
+
+    class Meta:
+        model = Question
+        fields = ["id", "text", "short_text", "type", "meta"]
+
+
+class SurveyPatchOperationSerializer(serializers.Serializer):
+    """
+    Операция частичного обновления опроса: формат запроса PATCH для схемы API, им же PatchSurveyCommand
+    проверяет операции до обращения к БД.
+    """
+
+    OP_CHOICES = ("update_question", "update_answer", "set_next_question")
+    # поля, без которых операция не применима
+    REQUIRED_FIELDS = {
+        "update_question": ("id",),
+        "update_answer": ("id",),
+        "set_next_question": ("question_id", "answer_id"),
+    }
+
+    op = serializers.ChoiceField(choices=OP_CHOICES)
+    id = serializers.IntegerField(required=False, help_text="ID вопроса (update_question) или ответа (update_answer)")
+    text = serializers.CharField(required=False, trim_whitespace=False)
+    short_text = serializers.CharField(
+        required=False, trim_whitespace=False, max_length=Question._meta.get_field("short_text").max_length
+    )
+    type = serializers.ChoiceField(choices=Question.TYPE_CHOICES, required=False)
+    meta = serializers.JSONField(required=False)
+    sort = serializers.IntegerField(required=False)
+    question_id = serializers.IntegerField(required=False, help_text="ID вопроса связи (set_next_question)")
+    answer_id = serializers.IntegerField(required=False, help_text="ID ответа связи (set_next_question)")
+    next_question_id = serializers.IntegerField(required=False, allow_null=True)
+
+    def validate(self, attrs: dict) -> dict:
+        errors = {field: "Обязательное поле." for field in self.REQUIRED_FIELDS[attrs["op"]] if field not in attrs}
+        max_length = Answer._meta.get_field("text").max_length
+        if attrs["op"] == "update_answer" and len(attrs.get("text", "")) > max_length:
+            errors["text"] = f"Текст ответа длиннее {max_length} символов."
+        if errors:
+            raise serializers.ValidationError(errors)
+        return attrs
+
+
+class SurveyPatchSerializer(serializers.Serializer):
+    revision = serializers.IntegerField(
+        required=False, help_text="Ревизия опроса; при изменении опроса другим пользователем PATCH вернет 409"
+    )
+    operations = SurveyPatchOperationSerializer(many=True)
+
+
+class SurveyPatchResultSerializer(serializers.Serializer):
+    revision = serializers.IntegerField(help_text="Ревизия опроса после записи; передается в следующем PATCH")
+    questions = QuestionFieldsSerializer(many=True)
+    answers = AnswerSerializer(many=True)
+
+
+class NextQuestionRequestSerializer(serializers.Serializer):
+    question_id = serializers.IntegerField()
+    answer_id = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+
+
+class NextQuestionSerializer(serializers.Serializer):
+    question_id = serializers.IntegerField()
+    next_question_id = serializers.IntegerField(allow_null=True)
+
+
+class DeadEndAnswerSerializer(serializers.Serializer):
+    question_id = serializers.IntegerField()
+    answer_id = serializers.IntegerField()
+
+
+class SurveyValidationSerializer(serializers.Serializer):
+    is_valid = serializers.BooleanField()
+    revision = serializers.IntegerField()
+    entry_question_id = serializers.IntegerField(allow_null=True)
+    cycles = serializers.ListField(child=serializers.ListField(child=serializers.IntegerField()))
+    unreachable_question_ids = serializers.ListField(child=serializers.IntegerField())
+    dead_end_answers = DeadEndAnswerSerializer(many=True)
+
+
+class QuestionAnalyticsSerializer(serializers.Serializer):
+    question_id = serializers.IntegerField()
+    min_depth = serializers.IntegerField(allow_null=True)
+    max_depth = serializers.IntegerField(allow_null=True)
+    min_remaining = serializers.IntegerField()
+    max_remaining = serializers.IntegerField()
+
+
+class SurveyAnalyticsSerializer(serializers.Serializer):
+    revision = serializers.IntegerField()
+    entry_question_id = serializers.IntegerField(allow_null=True)
+    path_count = serializers.IntegerField(help_text="Число путей, не больше 2^63 - 1")
+    path_count_overflow = serializers.BooleanField(help_text="Число путей достигло предела path_count")
+    min_questions = serializers.IntegerField()
+    max_questions = serializers.IntegerField()
+    questions = QuestionAnalyticsSerializer(many=True)
+
+
+class RespondentQuestionAnswersSerializer(serializers.Serializer):
+    question_id = serializers.IntegerField()
+    answer_ids = serializers.ListField(child=serializers.IntegerField())
+
+
+class RespondentResponseSerializer(serializers.Serializer):
+    respondent_id = serializers.CharField(max_length=64)
+    answers = RespondentQuestionAnswersSerializer(many=True)
+
+
+class RejectedResponseSerializer(serializers.Serializer):
+    index = serializers.IntegerField()
+    detail = serializers.CharField()
+
+
+class ResponsesIngestResultSerializer(serializers.Serializer):
+    accepted = serializers.IntegerField()
+    rows = serializers.IntegerField()
+    rejected = RejectedResponseSerializer(many=True)
+
+
+class AnswerStatsSerializer(serializers.Serializer):
+    answer_id = serializers.IntegerField()
+    selected_count = serializers.IntegerField()
+
+
+class QuestionStatsSerializer(serializers.Serializer):
+    question_id = serializers.IntegerField()
+    reached_count = serializers.IntegerField()
+    drop_off_count = serializers.IntegerField()
+    answers = AnswerStatsSerializer(many=True)
+
+
+class SurveyStatsSerializer(serializers.Serializer):
+    revision = serializers.IntegerField()
+    questions = QuestionStatsSerializer(many=True)
+
+
+class SurveySummarySerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    sort = serializers.IntegerField()
+    question_count = serializers.IntegerField()
+
+
+class SurveyListSerializer(serializers.Serializer):
+    next = serializers.URLField(allow_null=True)
+    results = SurveySummarySerializer(many=True)
+
+
+class SurveyListRequestSerializer(serializers.Serializer):
+    cursor = serializers.CharField(required=False)
+    page_size = serializers.IntegerField(required=False, min_value=1, max_value=ListSurveysQuery.MAX_PAGE_SIZE)
+
+
+class SurveyDocumentRequestSerializer(serializers.Serializer):
+    fields = serializers.CharField(
+        required=False,
+        help_text="Поля вопросов и ответов через запятую, например short_text,answers.next_question_id",
+    )
+    root = serializers.IntegerField(required=False, help_text="ID вопроса, от которого строится подграф")
+    depth = serializers.IntegerField(
+        required=False, min_value=0, help_text="Наибольшее число переходов next_question от root"
+    )
+
+    def validate_fields(self, value: str) -> tuple[list[str], list[str] | None]:
+        try:
+            return GetSurveySubsetQuery.parse_fields(value)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+
+    def validate(self, attrs: dict) -> dict:
+        if "depth" in attrs and "root" not in attrs:
+            raise serializers.ValidationError({"depth": "depth задается вместе с root."})
+        return attrs
+
+
+class SurveyPublishResultSerializer(serializers.Serializer):
+    survey_id = serializers.IntegerField()
+    revision = serializers.IntegerField()
+    size = serializers.IntegerField(help_text="Размер файла снимка в байтах")
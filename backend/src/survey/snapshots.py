@@ -0,0 +1,313 @@
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+from array import array
+from bisect import bisect_left
+from collections.abc import Iterable
+from pathlib import Path
+
+from django.conf import settings
+
+from .graph import SurveyGraphError
+
+MAGIC = b"SVSN"
+VERSION = 1
+# magic, версия, порядок байтов (1 - little endian), id опроса, ревизия, число вопросов, связей и строк
+HEADER = struct.Struct("<4sHHqIIII")
+# смещение и длина каждой секции
+SECTION = struct.Struct("<QQ")
+SECTIONS = (
+    "string_offsets",  # I[strings + 1]: границы строк в strings
+    "strings",  # UTF-8 всех строк подряд, строка 0 - название опроса
+    "question_ids",  # q[questions]: id вопросов по возрастанию
+    "question_fields",  # I[questions * 6]: text, short_text, type, meta (JSON) - номера строк, first_link, last_link
+    "answer_ids",  # q[links]: id ответов связей, связи вопроса лежат подряд в порядке Answer.sort
+    "link_fields",  # i[links * 3]: text - номер строки, sort, индекс следующего вопроса (-1 - конец опроса)
+    "json",  # документ опроса в JSON, как его отдает GET опроса
+    "json_gzip",
+    "json_br",
+)
+QUESTION_FIELD_COUNT = 6
+LINK_FIELD_COUNT = 3
+END = -1
+ALIGNMENT = 8
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+def build_snapshot(survey: tuple, questions: list[tuple], links: list[tuple], payload: dict[str, bytes]) -> bytes:
+    """
+    Собирает файл снимка опроса.
+
+    :param survey: (id, name, revision).
+    :param questions: (id, text, short_text, q_type, meta) вопросов опроса.
+    :param links: (question_id, answer_id, text, sort, next_question_id) связей, упорядоченные по вопросу
+        и Answer.sort, как в SurveyGraph.
+    :param payload: Тело GET опроса без сжатия и сжатое (см. survey.compression.compress_payload).
+    """
+    survey_id, name, revision = survey
+    strings: dict[str, int] = {}
+
+    def intern(value: str) -> int:
+        return strings.setdefault(value, len(strings))
+
+    intern(name)
+    questions = sorted(questions)
+    question_index = {question[0]: index for index, question in enumerate(questions)}
+    links_by_question: dict[int, list[tuple]] = {}
+    for link in links:
+        links_by_question.setdefault(link[0], []).append(link)
+
+    question_ids, question_fields = array("q"), array("I")
+    answer_ids, link_fields = array("q"), array("i")
+    for question_id, text, short_text, q_type, meta in questions:
+        first_link = len(answer_ids)
+        for _, answer_id, answer_text, sort, next_question_id in links_by_question.get(question_id, ()):
+            answer_ids.append(answer_id)
+            link_fields.extend((intern(answer_text), sort, question_index.get(next_question_id, END)))
+        question_ids.append(question_id)
+        question_fields.extend(
+            (
+                intern(text),
+                intern(short_text),
+                intern(q_type),
+                intern(json.dumps(meta, ensure_ascii=False)),
+                first_link,
+                len(answer_ids),
+            )
+        )
+
+    encoded = [value.encode() for value in strings]
+    string_offsets = array("I", [0])
+    for value in encoded:
+        string_offsets.append(string_offsets[-1] + len(value))
+
+    sections = [
+        string_offsets.tobytes(),
+        b"".join(encoded),
+        question_ids.tobytes(),
+        question_fields.tobytes(),
+        answer_ids.tobytes(),
+        link_fields.tobytes(),
+        payload.get("identity", b""),
+        payload.get("gzip", b""),
+        payload.get("br", b""),
+    ]
+
+    header = HEADER.pack(
+        MAGIC, VERSION, sys.byteorder == "little", survey_id, revision, len(questions), len(answer_ids), len(strings)
+    )
+    offset = _align(len(header) + SECTION.size * len(sections))
+    table, body = [], []
+    for section in sections:
+        table.append(SECTION.pack(offset, len(section)))
+        padding = _align(len(section)) - len(section)
+        body.append(section + b"\0" * padding)
+        offset += len(section) + padding
+
+    head = header + b"".join(table)
+    return head + b"\0" * (_align(len(head)) - len(head)) + b"".join(body)
+
+
+def _align(size: int) -> int:
+    return (size + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+class SurveySnapshot:
+    """
+    Снимок опроса, открытый через mmap только для чтения.
+
+    Массивы - memoryview поверх отображенного файла, без копирования в память процесса: страницы файла общие
+    для всех воркеров через page cache ОС. Строки декодируются только при обращении.
+    """
+
+    def __init__(self, path: str | Path):
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        if len(view) < HEADER.size:
+            raise SnapshotError(f"{path}: файл снимка поврежден.")
+
+        magic, version, little_endian, survey_id, revision, question_count, link_count, string_count = (
+            HEADER.unpack_from(view)
+        )
+        if magic != MAGIC or version != VERSION:
+            raise SnapshotError(f"{path}: неизвестный формат снимка.")
+        if bool(little_endian) != (sys.byteorder == "little"):
+            raise SnapshotError(f"{path}: снимок записан с другим порядком байтов.")
+
+        self.survey_id: int = survey_id
+        self.revision: int = revision
+        self.question_count: int = question_count
+        self.link_count: int = link_count
+
+        sections = {}
+        for number, name in enumerate(SECTIONS):
+            offset, length = SECTION.unpack_from(view, HEADER.size + number * SECTION.size)
+            sections[name] = view[offset:][:length]
+        self._string_offsets = sections["string_offsets"].cast("I")
+        self._strings = sections["strings"]
+        self.question_ids = sections["question_ids"].cast("q")
+        self._question_fields = sections["question_fields"].cast("I")
+        self.answer_ids = sections["answer_ids"].cast("q")
+        self._link_fields = sections["link_fields"].cast("i")
+        self._payload = {"identity": sections["json"], "gzip": sections["json_gzip"], "br": sections["json_br"]}
+        if len(self._string_offsets) != string_count + 1 or len(self.question_ids) != question_count:
+            raise SnapshotError(f"{path}: файл снимка поврежден.")
+
+    @property
+    def name(self) -> str:
+        return self.string(0)
+
+    def string(self, index: int) -> str:
+        start, end = self._string_offsets[index], self._string_offsets[index + 1]
+        return str(self._strings[start:end], "utf-8")
+
+    def payload(self) -> dict[str, memoryview]:
+        """
+        Готовые тела GET опроса для survey.compression.encoded_response.
+        """
+        return {encoding: body for encoding, body in self._payload.items() if len(body)}
+
+    def question_index(self, question_id: int) -> int:
+        """
+        :raises SurveyGraphError: Вопрос не найден в опросе.
+        """
+        index = bisect_left(self.question_ids, question_id)
+        if index == self.question_count or self.question_ids[index] != question_id:
+            raise SurveyGraphError(f"Вопрос с id={question_id} не найден в опросе.")
+        return index
+
+    def question(self, question_id: int) -> dict:
+        """
+        Вопрос с ответами в форме документа опроса, ответы - в порядке Answer.sort.
+
+        :raises SurveyGraphError: Вопрос не найден в опросе.
+        """
+        index = self.question_index(question_id)
+        text, short_text, q_type, meta, first_link, last_link = self._question_row(index)
+        answers = []
+        for slot in range(first_link, last_link):
+            answer_text, sort, next_index = self._link_row(slot)
+            answers.append(
+                {
+                    "id": self.answer_ids[slot],
+                    "text": self.string(answer_text),
+                    "sort": sort,
+                    "question_id": question_id,
+                    "next_question_id": self.question_ids[next_index] if next_index != END else None,
+                }
+            )
+        return {
+            "id": question_id,
+            "text": self.string(text),
+            "short_text": self.string(short_text),
+            "type": self.string(q_type),
+            "meta": json.loads(self.string(meta)),
+            "answers": answers,
+        }
+
+    def next_question(self, question_id: int, answer_ids: Iterable[int]) -> int | None:
+        """
+        Следующий вопрос по тем же правилам, что и SurveyGraph.next_question.
+
+        :raises SurveyGraphError: Вопрос или ответ не принадлежат опросу, либо набор ответов не подходит к типу вопроса.
+        """
+        index = self.question_index(question_id)
+        _, _, q_type, _, first_link, last_link = self._question_row(index)
+        slots_by_answer = {self.answer_ids[slot]: slot for slot in range(first_link, last_link)}
+
+        slots = []
+        for answer_id in set(answer_ids):
+            if answer_id not in slots_by_answer:
+                raise SurveyGraphError(f"Ответ с id={answer_id} не относится к вопросу id={question_id}.")
+            slots.append(slots_by_answer[answer_id])
+
+        if not slots:
+            raise SurveyGraphError("Не выбран ни один ответ.")
+        if self.string(q_type) == "radio" and len(slots) > 1:
+            raise SurveyGraphError(f"На вопрос id={question_id} можно выбрать только один ответ.")
+
+        for slot in sorted(slots):
+            next_index = self._link_fields[slot * LINK_FIELD_COUNT + 2]
+            if next_index != END:
+                return self.question_ids[next_index]
+        return None
+
+    def _question_row(self, index: int) -> memoryview:
+        start = index * QUESTION_FIELD_COUNT
+        return self._question_fields[start:][:QUESTION_FIELD_COUNT]
+
+    def _link_row(self, slot: int) -> memoryview:
+        start = slot * LINK_FIELD_COUNT
+        return self._link_fields[start:][:LINK_FIELD_COUNT]
+
+
+class SnapshotStore:
+    """
+    Каталог опубликованных снимков: по одному файлу survey-<id>.snap на опрос (SURVEY_SNAPSHOT_DIR).
+
+    Публикация записывает новый файл рядом и подменяет старый через os.replace, поэтому читатели видят либо
+    прежний, либо новый снимок целиком, а уже открытые отображения прежнего файла остаются рабочими. Каждый
+    процесс держит открытые снимки и переоткрывает файл, когда os.stat показывает, что его подменили.
+    """
+
+    def __init__(self, directory: str | Path | None = None):
+        self._directory = directory
+        self._snapshots: dict[Path, tuple[tuple, SurveySnapshot]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def directory(self) -> Path:
+        return Path(self._directory or settings.SURVEY_SNAPSHOT_DIR)
+
+    def path(self, survey_id: int) -> Path:
+        return self.directory / f"survey-{survey_id}.snap"
+
+    def publish(self, survey_id: int, data: bytes) -> Path:
+        path = self.path(survey_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                file.write(data)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temporary, path)
+        except BaseException:
+            Path(temporary).unlink(missing_ok=True)
+            raise
+        return path
+
+    def get(self, survey_id: int) -> SurveySnapshot | None:
+        """
+        Опубликованный снимок опроса или None, если опрос не опубликован.
+        """
+        path = self.path(survey_id)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+
+        version = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._snapshots.get(path)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+
+        try:
+            snapshot = SurveySnapshot(path)
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            self._snapshots[path] = (version, snapshot)
+        return snapshot
+
+
+survey_snapshot_store = SnapshotStore()
@@ -0,0 +1,15 @@
+from survey.models import Answer, Question, QuestionAnswer, Survey
+
+
+def create_survey(questions_count: int, answers_per_question: int = 3) -> Survey:
+    survey = Survey.objects.create(name="Опрос")
+    questions = [
+        Question.objects.create(survey=survey, text=f"Вопрос {i}", short_text=f"В{i}", q_type="radio", meta={})
+        for i in range(questions_count)
+    ]
+    for index, question in enumerate(questions):
+        next_question = questions[index + 1] if index + 1 < questions_count else None
+        for sort in range(answers_per_question):
+            answer = Answer.objects.create(text=f"Ответ {index}.{sort}", sort=sort)
+            QuestionAnswer.objects.create(question=question, answer=answer, next_question=next_question)
+    return survey
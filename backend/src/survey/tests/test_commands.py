@@ -0,0 +1,246 @@
+import pytest
+from django.db import connection
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from survey.commands.patch_survey import PatchSurveyCommand
+from survey.commands.update_survey import UpdateSurveyCommand
+from survey.graph import survey_graph_cache
+from survey.models import Answer, Question, QuestionAnswer, Survey
+from survey.serializers import SurveySerializer
+from survey.tests.factories import create_survey
+
+
+def make_update_command() -> UpdateSurveyCommand:
+    return UpdateSurveyCommand(
+        survey_model=Survey,
+        survey_serializer=SurveySerializer,
+        answer_model=Answer,
+        question_answer_model=QuestionAnswer,
+    )
+
+
+def count_writes(survey: Survey, data: dict) -> int:
+    with CaptureQueriesContext(connection) as context:
+        _, status_code = make_update_command()(survey.id, data)
+    assert status_code == status.HTTP_200_OK
+    return sum(1 for query in context.captured_queries if query["sql"].startswith("UPDATE"))
+
+
+@pytest.mark.django_db
+class TestUpdateSurveyCommand:
+    def test_unchanged_survey_is_not_written(self):
+        survey = create_survey(questions_count=3)
+        data = SurveySerializer(survey).data
+
+        assert count_writes(survey, data) == 0
+        survey.refresh_from_db()
+        assert survey.revision == 0
+
+    def test_only_changed_rows_are_written(self):
+        survey = create_survey(questions_count=3)
+        data = SurveySerializer(survey).data
+        question = data["questions"][1]
+        question["text"] = "Новый текст"
+        question["answers"][0]["sort"] = 10
+        question["answers"][1]["next_question_id"] = None
+
+        result, status_code = make_update_command()(survey.id, data)
+
+        assert status_code == status.HTTP_200_OK
+        assert Question.objects.get(id=question["id"]).text == "Новый текст"
+        assert Answer.objects.get(id=question["answers"][0]["id"]).sort == 10
+        assert QuestionAnswer.objects.get(answer_id=question["answers"][1]["id"]).next_question_id is None
+        updated = next(q for q in result["questions"] if q["id"] == question["id"])
+        assert updated["text"] == "Новый текст"
+        survey.refresh_from_db()
+        assert survey.revision == 1
+
+    def test_write_count_does_not_depend_on_survey_size(self):
+        counts = []
+        for questions_count in (2, 20):
+            survey = create_survey(questions_count=questions_count)
+            data = SurveySerializer(survey).data
+            for question in data["questions"]:
+                question["short_text"] += "!"
+                for answer in question["answers"]:
+                    answer["text"] += "!"
+                    answer["next_question_id"] = None
+            counts.append(count_writes(survey, data))
+
+        # вопросы, ответы, связи и ревизия опроса
+        assert counts == [4, 4]
+
+    def test_unknown_answer(self):
+        survey = create_survey(questions_count=2)
+        data = SurveySerializer(survey).data
+        data["questions"][0]["text"] = "Новый текст"
+        data["questions"][0]["answers"][0]["id"] = 999
+
+        result, status_code = make_update_command()(survey.id, data)
+
+        assert status_code == status.HTTP_400_BAD_REQUEST
+        assert "id=999" in result["detail"]
+        assert Question.objects.get(id=data["questions"][0]["id"]).text != "Новый текст"
+
+    def test_stale_revision_in_body(self):
+        survey = create_survey(questions_count=2)
+        data = SurveySerializer(survey).data
+        data["questions"][0]["text"] = "Новый текст"
+        Survey.objects.filter(id=survey.id).update(revision=5)
+
+        result, status_code = make_update_command()(survey.id, data)
+
+        assert status_code == status.HTTP_409_CONFLICT
+        assert Question.objects.get(id=data["questions"][0]["id"]).text != "Новый текст"
+
+    def test_concurrent_write_is_rejected(self, monkeypatch):
+        survey = create_survey(questions_count=2)
+        data = SurveySerializer(survey).data
+        data["questions"][0]["text"] = "Новый текст"
+        command = make_update_command()
+        update_questions = command._update_questions
+
+        def update_questions_after_other_editor(*args):
+            # другой редактор успевает сохранить опрос, пока команда сравнивает данные
+            Survey.objects.filter(id=survey.id).update(revision=F("revision") + 1)
+            return update_questions(*args)
+
+        monkeypatch.setattr(command, "_update_questions", update_questions_after_other_editor)
+        result, status_code = command(survey.id, data)
+
+        assert status_code == status.HTTP_409_CONFLICT
+        assert Question.objects.get(id=data["questions"][0]["id"]).text != "Новый текст"
+        survey.refresh_from_db()
+        assert survey.revision == 1
+
+    def test_revision_is_checked_by_first_write(self):
+        survey = create_survey(questions_count=2)
+        data = SurveySerializer(survey).data
+        data["name"] = "Новое название"
+        data["questions"][0]["text"] = "Новый текст"
+
+        with CaptureQueriesContext(connection) as context:
+            result, status_code = make_update_command()(survey.id, data)
+
+        assert status_code == status.HTTP_200_OK
+        assert result["revision"] == 1
+        assert not any("FOR UPDATE" in query["sql"] for query in context.captured_queries)
+        [first_write, *_] = [query["sql"] for query in context.captured_queries if query["sql"].startswith("UPDATE")]
+        assert first_write.startswith('UPDATE "survey_survey"')
+        assert '"survey_survey"."revision" = 0' in first_write
+        assert Survey.objects.get(id=survey.id).name == "Новое название"
+
+
+@pytest.mark.django_db
+class TestPatchSurveyCommand:
+    def setup_method(self):
+        self.command = PatchSurveyCommand(
+            survey_model=Survey,
+            survey_serializer=SurveySerializer,
+            answer_model=Answer,
+            question_answer_model=QuestionAnswer,
+        )
+
+    def test_applies_only_listed_changes(self):
+        survey = create_survey(questions_count=3)
+        question = survey.questions.order_by("id").first()
+        answer = Answer.objects.filter(question_answers__question=question).order_by("id").first()
+
+        result, status_code = self.command(
+            survey.id,
+            [{"op": "update_answer", "id": answer.id, "sort": 7}, {"op": "update_question", "id": question.id}],
+        )
+
+        assert status_code == status.HTTP_200_OK
+        assert result["answers"][0]["sort"] == 7
+        assert result["answers"][0]["question_id"] == question.id
+        assert Answer.objects.get(id=answer.id).sort == 7
+        assert result["questions"][0]["text"] == question.text
+        assert result["revision"] == 1
+
+        result, status_code = self.command(survey.id, {"revision": 1, "operations": []})
+        assert (status_code, result["revision"]) == (status.HTTP_200_OK, 1)
+
+    def test_validation_describes_written_revision(self, monkeypatch):
+        survey = create_survey(questions_count=2)
+        question = survey.questions.order_by("id").first()
+        revisions = []
+
+        class RecordingGraphCache:
+            def get(self, survey_id, revision):
+                revisions.append(revision)
+                return survey_graph_cache.get(survey_id, revision)
+
+        self.command.graph_cache = RecordingGraphCache()
+        save = self.command._save
+
+        def save_then_other_editor(*args):
+            # другой редактор сохраняет опрос сразу после записи команды
+            revision = save(*args)
+            Survey.objects.filter(id=survey.id).update(revision=F("revision") + 1)
+            return revision
+
+        monkeypatch.setattr(self.command, "_save", save_then_other_editor)
+        result, status_code = self.command(survey.id, [{"op": "update_question", "id": question.id, "text": "Новый"}])
+
+        assert status_code == status.HTTP_200_OK
+        assert result["revision"] == 1
+        assert revisions == [1]
+        assert "validation" in result
+
+    def test_next_question_from_another_survey(self):
+        survey = create_survey(questions_count=2)
+        other_question = create_survey(questions_count=1).questions.get()
+        qa = QuestionAnswer.objects.filter(question__survey=survey).first()
+
+        operation = {
+            "op": "set_next_question",
+            "question_id": qa.question_id,
+            "answer_id": qa.answer_id,
+            "next_question_id": other_question.id,
+        }
+        result, status_code = self.command(survey.id, {"operations": [operation]})
+
+        assert status_code == status.HTTP_400_BAD_REQUEST
+        qa.refresh_from_db()
+        assert qa.next_question_id != other_question.id
+
+    @pytest.mark.parametrize(
+        "operation",
+        [
+            {"op": "update_question", "type": "scale"},
+            {"op": "update_question", "text": None},
+            {"op": "update_answer", "sort": "первый"},
+            {"op": "update_answer", "text": "Да" * 200},
+            {"op": "update_question", "id": [1, 2]},
+            {"op": "set_next_question", "question_id": {"id": 1}},
+            {"op": "update_answer", "id": None},
+        ],
+    )
+    def test_invalid_operation(self, operation):
+        survey = create_survey(questions_count=2)
+        question = survey.questions.order_by("id").first()
+        answer = Answer.objects.filter(question_answers__question=question).order_by("id").first()
+        operation = {"id": question.id if operation["op"] == "update_question" else answer.id, **operation}
+        if operation["op"] == "set_next_question":
+            operation.setdefault("answer_id", answer.id)
+
+        result, status_code = self.command(survey.id, [operation])
+
+        assert status_code == status.HTTP_400_BAD_REQUEST
+        assert result["operations"][0]
+        survey.refresh_from_db()
+        assert survey.revision == 0
+
+    def test_stale_revision_in_body(self):
+        survey = create_survey(questions_count=2)
+        question = survey.questions.order_by("id").first()
+
+        result, status_code = self.command(
+            survey.id, {"revision": 3, "operations": [{"op": "update_question", "id": question.id, "text": "Новый"}]}
+        )
+
+        assert status_code == status.HTTP_409_CONFLICT
+        question.refresh_from_db()
+        assert question.text != "Новый"
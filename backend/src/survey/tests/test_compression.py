@@ -0,0 +1,64 @@
+import gzip
+
+import brotli
+import pytest
+from survey.compression import compress_payload, negotiate_encoding
+from survey.etags import etag_matches, make_survey_etag, matching_etag, survey_etags
+
+PAYLOAD = {"identity": b"{}", "gzip": b"", "br": b""}
+
+
+class TestCompression:
+    def test_compress_payload(self):
+        body = ('{"text": "Какой транспорт вы предпочитаете для дальних поездок?"}' * 50).encode()
+
+        payload = compress_payload(body)
+
+        assert gzip.decompress(payload["gzip"]) == body
+        assert brotli.decompress(payload["br"]) == body
+        assert len(payload["br"]) < len(body) // 8
+
+    def test_small_body_is_not_compressed(self):
+        assert compress_payload(b"{}") == {"identity": b"{}"}
+
+    @pytest.mark.parametrize(
+        "header, expected",
+        [
+            (None, "identity"),
+            ("gzip, deflate, br", "br"),
+            ("gzip;q=1.0, br;q=0.5", "gzip"),
+            ("br;q=0, gzip", "gzip"),
+            ("*", "br"),
+            ("*;q=0.1, br;q=0", "gzip"),
+            ("deflate", "identity"),
+            ("gzip;q=abc", "identity"),
+        ],
+    )
+    def test_negotiate_encoding(self, header, expected):
+        assert negotiate_encoding(header, PAYLOAD) == expected
+
+    def test_only_available_encodings(self):
+        assert negotiate_encoding("br, gzip", {"identity": b"{}"}) == "identity"
+
+
+class TestSurveyEtags:
+    def test_etag_per_coding(self):
+        assert survey_etags(1, 5) == ['"survey-1-r5"', '"survey-1-r5-br"', '"survey-1-r5-gzip"']
+        assert make_survey_etag(1, 5, "br") == '"survey-1-r5-br"'
+
+    @pytest.mark.parametrize(
+        "header, expected",
+        [
+            ('"survey-1-r5-gzip"', '"survey-1-r5-gzip"'),
+            ('"survey-1-r4", W/"survey-1-r5-br"', '"survey-1-r5-br"'),
+            ("*", '"survey-1-r5"'),
+            ('"survey-1-r4-br"', None),
+            (None, None),
+        ],
+    )
+    def test_matching_etag(self, header, expected):
+        assert matching_etag(header, survey_etags(1, 5), weak=True) == expected
+
+    def test_strong_comparison_skips_weak_etags(self):
+        assert not etag_matches('W/"survey-1-r5"', survey_etags(1, 5))
+        assert etag_matches('"survey-1-r5-br"', survey_etags(1, 5))
@@ -0,0 +1,69 @@
+import pytest
+from django.db import connection
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from survey.db_metrics import connection_stats, database_pool_stats, record_connection
+
+
+class FakePool:
+    def get_stats(self):
+        return {
+            "pool_size": 5,
+            "pool_available": 3,
+            "requests_waiting": 1,
+            "requests_num": 40,
+            "requests_wait_ms": 12,
+            "connections_num": 6,
+            "connections_ms": 30,
+        }
+
+
+@pytest.mark.django_db
+class TestDatabasePoolStats:
+    def test_persistent_connection(self):
+        connection.ensure_connection()
+        opened = connection_stats.opened("default")
+
+        record_connection(sender=None, connection=connection)
+
+        stats = database_pool_stats()["default"]
+        assert stats["connections_opened"] == opened + 1
+        assert stats["mode"] in ("persistent", "per_request")
+        # без пула счетчиков занятых соединений и ожидания нет
+        assert not {"in_use", "idle", "waiting", "wait_ms"} & set(stats)
+
+    def test_psycopg_pool(self, monkeypatch):
+        monkeypatch.setattr(connection, "pool", FakePool(), raising=False)
+
+        stats = database_pool_stats()["default"]
+
+        assert stats["mode"] == "pool"
+        assert (stats["in_use"], stats["idle"], stats["waiting"], stats["wait_ms"]) == (2, 3, 1, 12)
+
+
+@pytest.mark.django_db
+class TestInternalMetricsView:
+    def setup_method(self):
+        self.client = APIClient()
+        self.url = reverse("internal-metrics")
+
+    def test_disabled_without_token(self):
+        response = self.client.get(self.url, headers={"X-Survey-Metrics-Token": ""})
+        assert response.status_code == 404
+
+    @override_settings(SURVEY_METRICS_TOKEN="metrics-secret")
+    def test_wrong_token(self):
+        response = self.client.get(self.url, headers={"X-Survey-Metrics-Token": "wrong"})
+        assert response.status_code == 403
+
+    @override_settings(SURVEY_METRICS_TOKEN="metrics-secret")
+    def test_metrics(self):
+        response = self.client.get(self.url, headers={"X-Survey-Metrics-Token": "metrics-secret"})
+
+        assert response.status_code == 200
+        assert "no-store" in response["Cache-Control"]
+        assert {"mode", "max_age", "connections_opened"} <= set(response.json()["databases"]["default"])
+        caches = response.json()["caches"]
+        assert set(caches) == {"documents", "payloads"}
+        assert set(caches["documents"]) == {"hits", "misses", "hit_ratio"}
@@ -0,0 +1,124 @@
+import pytest
+from survey.graph import MAX_PATH_COUNT, SurveyGraph, SurveyGraphError
+
+QUESTIONS = [(1, "radio"), (2, "checkbox"), (3, "radio")]
+LINKS = [
+    (1, 10, 2),
+    (1, 11, 3),
+    (2, 20, None),
+    (2, 21, 3),
+    (3, 30, None),
+]
+
+
+class TestSurveyGraph:
+    def setup_method(self):
+        self.graph = SurveyGraph(survey_id=1, revision=0, questions=QUESTIONS, links=LINKS)
+
+    def test_next_question(self):
+        assert self.graph.next_question(1, [10]) == 2
+        assert self.graph.next_question(1, [11]) == 3
+        assert self.graph.next_question(3, [30]) is None
+
+    def test_checkbox_uses_first_answer_with_continuation(self):
+        assert self.graph.next_question(2, [21, 20]) == 3
+        assert self.graph.next_question(2, [20]) is None
+
+    @pytest.mark.parametrize(
+        "question_id, answer_ids",
+        [
+            (4, [10]),  # вопрос не из опроса
+            (1, [20]),  # ответ другого вопроса
+            (1, []),
+            (1, [10, 11]),  # несколько ответов на radio
+        ],
+    )
+    def test_invalid_selection(self, question_id, answer_ids):
+        with pytest.raises(SurveyGraphError):
+            self.graph.next_question(question_id, answer_ids)
+
+    def test_answers_are_contiguous_per_question(self):
+        node = self.graph.node(2)
+        assert [self.graph.answer_ids[slot] for slot in self.graph.answers(node)] == [20, 21]
+
+    def test_reachable(self):
+        assert self.graph.reachable(1) == [1, 2, 3]
+        assert self.graph.reachable(1, depth=0) == [1]
+        assert self.graph.reachable(2, depth=1) == [2, 3]
+        with pytest.raises(SurveyGraphError):
+            self.graph.reachable(4)
+
+
+class TestSurveyGraphValidation:
+    def test_valid_graph(self):
+        report = SurveyGraph(survey_id=1, revision=3, questions=QUESTIONS, links=LINKS).validate()
+        assert report == {
+            "is_valid": True,
+            "revision": 3,
+            "entry_question_id": 1,
+            "cycles": [],
+            "unreachable_question_ids": [],
+            "dead_end_answers": [{"question_id": 2, "answer_id": 20}],
+        }
+
+    def test_cycle_and_unreachable_questions(self):
+        questions = [(1, "radio"), (2, "radio"), (3, "radio"), (4, "radio"), (5, "radio")]
+        links = [(1, 10, 2), (2, 20, 3), (3, 30, 2), (4, 40, 4), (5, 50, None)]
+
+        report = SurveyGraph(survey_id=1, revision=0, questions=questions, links=links).validate()
+
+        assert report["entry_question_id"] == 1
+        assert report["cycles"] == [[2, 3], [4]]
+        assert report["unreachable_question_ids"] == [4, 5]
+        assert not report["is_valid"]
+
+    def test_dead_end_answer(self):
+        links = [(1, 10, 2), (1, 11, None), (2, 20, None), (2, 21, None)]
+
+        report = SurveyGraph(survey_id=1, revision=0, questions=QUESTIONS[:2], links=links).validate()
+
+        assert report["dead_end_answers"] == [{"question_id": 1, "answer_id": 11}]
+        assert report["is_valid"]
+
+    def test_long_chain(self):
+        count = 50_000
+        questions = [(i, "radio") for i in range(count)]
+        links = [(i, i, i + 1 if i + 1 < count else None) for i in range(count)]
+
+        report = SurveyGraph(survey_id=1, revision=0, questions=questions, links=links).validate()
+
+        assert report["is_valid"]
+
+
+class TestSurveyGraphAnalytics:
+    def test_paths_and_depths(self):
+        analytics = SurveyGraph(survey_id=1, revision=0, questions=QUESTIONS, links=LINKS).analyze()
+
+        # 1 -> 2 -> конец, 1 -> 2 -> 3 -> конец, 1 -> 3 -> конец
+        assert analytics["path_count"] == 3
+        assert not analytics["path_count_overflow"]
+        assert analytics["min_questions"] == 2
+        assert analytics["max_questions"] == 3
+        assert analytics["questions"][2] == {
+            "question_id": 3,
+            "min_depth": 1,
+            "max_depth": 2,
+            "min_remaining": 1,
+            "max_remaining": 1,
+        }
+
+    def test_branching_does_not_enumerate_paths(self):
+        # каждый вопрос ведет к следующему двумя ответами: 2^200 путей
+        count = 200
+        questions = [(i, "radio") for i in range(count)]
+        links = [(i, answer, i + 1 if i + 1 < count else None) for i in range(count) for answer in (2 * i, 2 * i + 1)]
+
+        analytics = SurveyGraph(survey_id=1, revision=0, questions=questions, links=links).analyze()
+
+        assert analytics["path_count"] == MAX_PATH_COUNT
+        assert analytics["path_count_overflow"]
+        assert analytics["max_questions"] == count
+
+    def test_cycle(self):
+        links = [(1, 10, 2), (2, 20, 1)]
+        assert SurveyGraph(survey_id=1, revision=0, questions=QUESTIONS[:2], links=links).analyze() is None
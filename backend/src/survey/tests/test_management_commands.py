@@ -0,0 +1,152 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.urls import reverse
+from rest_framework.test import APIClient
+from survey.graph import survey_graph_cache
+from survey.models import Answer, AnswerCounter, QuestionCounter, Survey
+from survey.queries.build_survey_document import BuildSurveyDocumentQuery
+from survey.tests.factories import create_survey
+
+
+def export(*args) -> list[dict]:
+    output = StringIO()
+    call_command("export_surveys", *args, stdout=output)
+    return [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+def without_ids(document: dict) -> list:
+    """
+    Структура опроса без id: вопросы и ответы по порядку, переходы - номерами вопросов.
+    """
+    positions = {question["id"]: index for index, question in enumerate(document["questions"])}
+    return [
+        (
+            question["text"],
+            question["type"],
+            question["meta"],
+            [
+                (answer["text"], answer["sort"], positions.get(answer["next_question_id"]))
+                for answer in question["answers"]
+            ],
+        )
+        for question in document["questions"]
+    ]
+
+
+@pytest.mark.django_db
+class TestSurveyInterchangeCommands:
+    def test_round_trip(self, tmp_path, django_assert_max_num_queries):
+        surveys = [create_survey(questions_count=3), create_survey(questions_count=2)]
+        surveys[1].sort = -5
+        surveys[1].save()
+        Answer.objects.filter(question_answers__question__survey=surveys[0]).update(sort=-1)
+        path = tmp_path / "surveys.ndjson"
+        call_command("export_surveys", "--ids", *[str(survey.id) for survey in surveys], "--output", str(path))
+
+        # транзакция, по bulk_create на опросы, вопросы, ответы и связи
+        with django_assert_max_num_queries(6):
+            call_command("import_surveys", str(path), stdout=StringIO())
+
+        exported = [json.loads(line) for line in path.read_text().splitlines()]
+        imported = Survey.objects.order_by("-id")[:2][::-1]
+        for original, survey in zip(exported, imported):
+            assert survey.id != original["id"]
+            assert survey.sort == original["sort"]
+            document, _ = BuildSurveyDocumentQuery(survey_model=Survey)(survey.id)
+            assert without_ids(document) == without_ids(original)
+
+    def test_json_format(self):
+        survey = create_survey(questions_count=2)
+        output = StringIO()
+        call_command("export_surveys", "--ids", str(survey.id), "--format", "json", stdout=output)
+        assert [document["id"] for document in json.loads(output.getvalue())] == [survey.id]
+
+    def test_invalid_document_rolls_back_import(self, tmp_path):
+        valid, invalid = export("--ids", str(create_survey(questions_count=2).id), str(create_survey(2).id))
+        invalid["questions"][0]["answers"][0]["next_question_id"] = 0
+        path = tmp_path / "surveys.ndjson"
+        path.write_text(f"{json.dumps(valid)}\n{json.dumps(invalid)}\n")
+        surveys_count = Survey.objects.count()
+
+        with pytest.raises(CommandError, match="Опрос 1.*id=0"):
+            call_command("import_surveys", str(path), "--batch-size", "1", stdout=StringIO())
+        assert Survey.objects.count() == surveys_count
+
+    @pytest.mark.parametrize(
+        "field, value, message",
+        [
+            ("name", "О" * 256, "название"),
+            ("survey_sort", -(2**31) - 1, "sort"),
+            ("short_text", "В" * 256, "short_text"),
+            ("answer_text", "Д" * 256, "длиннее 255"),
+            ("answer_sort", 2**31, "sort"),
+            ("answer_sort", "1", "sort"),
+            ("next_question_id", [1], "ведет на вопрос"),
+        ],
+    )
+    def test_field_limits(self, tmp_path, field, value, message):
+        (document,) = export("--ids", str(create_survey(questions_count=2).id))
+        question, answer = document["questions"][0], document["questions"][0]["answers"][0]
+        target, key = {
+            "name": (document, "name"),
+            "survey_sort": (document, "sort"),
+            "short_text": (question, "short_text"),
+            "answer_text": (answer, "text"),
+            "answer_sort": (answer, "sort"),
+            "next_question_id": (answer, "next_question_id"),
+        }[field]
+        target[key] = value
+        path = tmp_path / "surveys.ndjson"
+        path.write_text(json.dumps(document) + "\n")
+        surveys_count = Survey.objects.count()
+
+        with pytest.raises(CommandError, match=f"Опрос 0.*{message}"):
+            call_command("import_surveys", str(path), stdout=StringIO())
+        assert Survey.objects.count() == surveys_count
+
+
+@pytest.mark.django_db
+class TestRebuildSurveyCountersCommand:
+    def setup_method(self):
+        self.client = APIClient()
+        survey_graph_cache.clear()
+
+    def stats(self, survey: Survey) -> dict:
+        return self.client.get(reverse("survey-stats", kwargs={"id": survey.id})).json()
+
+    def test_rebuild_matches_ingested_counters(self):
+        survey = create_survey(questions_count=3, answers_per_question=2)
+        q1, q2, _ = survey.questions.order_by("id")
+        links = {}
+        for question_id, answer_id in survey.question_answers.order_by("id").values_list("question_id", "answer_id"):
+            links.setdefault(question_id, []).append(answer_id)
+        responses = [
+            {"respondent_id": "r1", "answers": [{"question_id": q1.id, "answer_ids": [links[q1.id][0]]}]},
+            {
+                "respondent_id": "r2",
+                "answers": [
+                    {"question_id": q1.id, "answer_ids": [links[q1.id][1]]},
+                    {"question_id": q2.id, "answer_ids": [links[q2.id][0]]},
+                ],
+            },
+        ]
+        url = reverse("survey-responses", kwargs={"id": survey.id})
+        self.client.post(url, responses, format="json")
+        self.client.post(url, responses[:1], format="json")
+        expected = self.stats(survey)
+
+        # база, где ответы загружены до появления счетчиков
+        AnswerCounter.objects.all().delete()
+        QuestionCounter.objects.all().delete()
+        output = StringIO()
+        call_command("rebuild_survey_counters", "--ids", str(survey.id), stdout=output)
+
+        assert self.stats(survey) == expected
+        assert "отправок 3, ответов 4" in output.getvalue()
+
+    def test_unknown_survey(self):
+        with pytest.raises(CommandError, match="id=0"):
+            call_command("rebuild_survey_counters", "--ids", "0", stdout=StringIO())
@@ -0,0 +1,56 @@
+import json
+import logging
+import re
+
+import pytest
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from survey.cache import survey_document_cache
+from survey.tests.factories import create_survey
+
+
+def parse_server_timing(header: str) -> dict[str, str]:
+    return {metric.split(";")[0]: metric for metric in header.split(", ")}
+
+
+@pytest.mark.django_db
+class TestServerTimingMiddleware:
+    @pytest.fixture(autouse=True)
+    def server_timing(self, settings):
+        settings.SURVEY_SERVER_TIMING = True
+
+    def setup_method(self):
+        self.client = APIClient()
+        survey_document_cache.backend.clear()
+        self.survey = create_survey(questions_count=3)
+
+    def test_get_survey_spans(self):
+        response = self.client.get(reverse("survey-detail", kwargs={"id": self.survey.id}))
+
+        metrics = parse_server_timing(response["Server-Timing"])
+        assert {"db", "survey.revision", "survey.load", "survey.serialize", "render", "total"} <= set(metrics)
+        # ревизия и три запроса документа
+        assert re.search(r'desc="4 queries"', metrics["db"])
+
+    def test_async_view_counts_queries(self):
+        response = self.client.get(reverse("async-survey-detail", kwargs={"id": self.survey.id}))
+
+        metrics = parse_server_timing(response["Server-Timing"])
+        assert 'desc="4 queries"' in metrics["db"]
+
+    @override_settings(SURVEY_SLOW_REQUEST_MS=0)
+    def test_slow_request_logs_sql(self, caplog):
+        with caplog.at_level(logging.INFO, logger="survey.timing"):
+            self.client.get(reverse("survey-detail", kwargs={"id": self.survey.id}))
+
+        [slow] = [record for record in caplog.records if record.levelno == logging.WARNING]
+        data = json.loads(slow.getMessage())
+        assert data["status"] == 200
+        assert len(data["queries"]) == data["db_queries"] == 4
+        assert "survey_question" in " ".join(query["sql"] for query in data["queries"])
+
+    @override_settings(SURVEY_SERVER_TIMING=False)
+    def test_header_can_be_disabled(self):
+        response = self.client.get(reverse("survey-detail", kwargs={"id": self.survey.id}))
+        assert "Server-Timing" not in response
@@ -0,0 +1,65 @@
+import logging
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from survey.profiling import ProfileStore
+from survey.tests.factories import create_survey
+
+
+@pytest.mark.django_db
+class TestProfiledSurveyDetailView:
+    @pytest.fixture(autouse=True)
+    def profile_settings(self, tmp_path):
+        with override_settings(
+            SURVEY_PROFILE_DIR=str(tmp_path),
+            SURVEY_PROFILE_SECRET="s3cret",
+            SURVEY_PROFILE_SAMPLE_RATE=0,
+            SURVEY_PROFILE_MAX_FILES=2,
+        ):
+            yield
+
+    def setup_method(self):
+        self.client = APIClient()
+        self.survey = create_survey(questions_count=2)
+        self.url = reverse("survey-detail", kwargs={"id": self.survey.id})
+
+    def saved_profiles(self, caplog) -> list[str]:
+        return [record.args[0].name for record in caplog.records if record.name == "survey.profiling"]
+
+    def test_secret_header(self, caplog):
+        with caplog.at_level(logging.INFO, logger="survey.profiling"):
+            response = self.client.get(self.url, HTTP_X_SURVEY_PROFILE="s3cret")
+
+        assert response.status_code == 200
+        assert "X-Survey-Profile" not in response
+        assert [path.name for path in ProfileStore.from_settings().paths()] == self.saved_profiles(caplog)
+
+    @override_settings(DEBUG=True)
+    def test_profile_name_header_in_debug(self):
+        response = self.client.get(self.url, HTTP_X_SURVEY_PROFILE="s3cret")
+        assert [path.name for path in ProfileStore.from_settings().paths()] == [response["X-Survey-Profile"]]
+
+    def test_wrong_secret_is_ignored(self):
+        response = self.client.get(self.url, HTTP_X_SURVEY_PROFILE="guess")
+        assert "X-Survey-Profile" not in response
+        assert ProfileStore.from_settings().paths() == []
+
+    def test_sampling_rotates_profiles(self, caplog):
+        with override_settings(SURVEY_PROFILE_SAMPLE_RATE=1), caplog.at_level(logging.INFO, logger="survey.profiling"):
+            for _ in range(3):
+                self.client.get(self.url)
+        assert [path.name for path in ProfileStore.from_settings().paths()] == self.saved_profiles(caplog)[1:]
+
+    def test_aggregate_command(self):
+        with override_settings(SURVEY_PROFILE_SAMPLE_RATE=1):
+            self.client.get(self.url)
+            self.client.get(self.url)
+
+        output = StringIO()
+        call_command("survey_profiles", "aggregate", "--limit", "5", stdout=output)
+        assert "Профилей: 2" in output.getvalue()
+        assert "cumulative" in output.getvalue()
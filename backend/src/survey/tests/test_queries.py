@@ -0,0 +1,180 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from survey.cache import SurveyDocumentCache
+from survey.commands.update_survey import UpdateSurveyCommand
+from survey.graph import SurveyGraphCache
+from survey.models import Answer, QuestionAnswer, Survey
+from survey.queries.get_survey_questions import GetSurveyQuestionsQuery
+from survey.queries.get_survey_subset import GetSurveySubsetQuery
+from survey.queries.load_survey_tree import LoadSurveyTreeQuery
+from survey.serializers import SurveySerializer
+from survey.tests.factories import create_survey
+
+
+@pytest.mark.django_db
+class TestLoadSurveyTreeQuery:
+    def test_not_found(self):
+        assert LoadSurveyTreeQuery(survey_model=Survey)(999) is None
+
+    def test_query_count_does_not_depend_on_survey_size(self, django_assert_num_queries):
+        small = create_survey(questions_count=2)
+        large = create_survey(questions_count=20)
+
+        for survey in (small, large):
+            with django_assert_num_queries(3):
+                loaded = LoadSurveyTreeQuery(survey_model=Survey)(survey.id)
+                SurveySerializer(loaded).data
+
+    def test_links_are_resolved(self):
+        survey = create_survey(questions_count=2, answers_per_question=1)
+        questions = list(survey.questions.order_by("id"))
+
+        data = SurveySerializer(LoadSurveyTreeQuery(survey_model=Survey)(survey.id)).data
+
+        first, second = sorted(data["questions"], key=lambda q: q["id"])
+        assert first["answers"][0]["question_id"] == questions[0].id
+        assert first["answers"][0]["next_question_id"] == questions[1].id
+        assert second["answers"][0]["next_question_id"] is None
+
+    def test_links_are_loaded_by_survey_without_joining_questions(self):
+        survey = create_survey(questions_count=2)
+
+        with CaptureQueriesContext(connection) as context:
+            LoadSurveyTreeQuery(survey_model=Survey)(survey.id)
+
+        links_sql = context.captured_queries[-1]["sql"]
+        assert '"survey_questionanswer"."survey_id" =' in links_sql
+        assert 'JOIN "survey_question"' not in links_sql
+
+    def test_survey_is_denormalized_on_create(self):
+        survey = create_survey(questions_count=1)
+        question = survey.questions.get()
+        answer = Answer.objects.create(text="Новый ответ", sort=9)
+
+        question_answer = QuestionAnswer.objects.create(question=question, answer=answer)
+
+        assert question_answer.survey_id == survey.id
+        answer.refresh_from_db()
+        assert answer.survey_id == survey.id
+        assert set(QuestionAnswer.objects.filter(survey=survey)) == set(
+            QuestionAnswer.objects.filter(question=question)
+        )
+
+    def test_survey_follows_reassigned_question(self, django_assert_num_queries):
+        question_answer = QuestionAnswer.objects.select_related("question", "answer").filter(
+            survey=create_survey(questions_count=1)
+        )[0]
+        other_question = create_survey(questions_count=1).questions.get()
+
+        # опрос берется из загруженного вопроса, у ответа опрос уже указан: только UPDATE связи
+        with django_assert_num_queries(1):
+            question_answer.question = other_question
+            question_answer.save()
+
+        question_answer.refresh_from_db()
+        assert question_answer.survey_id == other_question.survey_id
+
+
+@pytest.mark.django_db
+class TestGetSurveyQuestionsQuery:
+    def test_returns_same_data_as_serializer(self):
+        survey = create_survey(questions_count=3)
+
+        result, status_code = GetSurveyQuestionsQuery(survey_model=Survey, survey_serializer=SurveySerializer)(
+            survey.id
+        )
+
+        assert status_code == status.HTTP_200_OK
+        assert result == SurveySerializer(survey).data
+
+    def test_not_found(self):
+        result, status_code = GetSurveyQuestionsQuery(survey_model=Survey, survey_serializer=SurveySerializer)(999)
+        assert status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+class TestGetSurveySubsetQuery:
+    def setup_method(self):
+        self.query = GetSurveySubsetQuery(survey_model=Survey, graph_cache=SurveyGraphCache())
+
+    def test_parse_fields(self):
+        assert GetSurveySubsetQuery.parse_fields("short_text, answers.next_question_id") == (
+            ["short_text"],
+            ["next_question_id"],
+        )
+        assert GetSurveySubsetQuery.parse_fields("id,text") == (["text"], None)
+        assert GetSurveySubsetQuery.parse_fields("answers")[1] == list(GetSurveySubsetQuery.ANSWER_COLUMNS)
+        with pytest.raises(ValueError, match="answers.meta"):
+            GetSurveySubsetQuery.parse_fields("meta,answers.meta")
+
+    def test_full_subset_matches_document(self):
+        survey = create_survey(questions_count=3)
+
+        result, status_code = self.query(survey.id)
+
+        assert status_code == status.HTTP_200_OK
+        assert result == SurveySerializer(LoadSurveyTreeQuery(survey_model=Survey)(survey.id)).data
+
+    def test_reads_only_requested_rows_and_columns(self):
+        survey = create_survey(questions_count=5)
+        root = survey.questions.order_by("id")[1]
+        fields = GetSurveySubsetQuery.parse_fields("short_text,answers.next_question_id")
+
+        with CaptureQueriesContext(connection) as context:
+            result, status_code = self.query(survey.id, fields=fields, root=root.id, depth=1)
+
+        assert status_code == status.HTTP_200_OK
+        assert [question["id"] for question in result["questions"]] == [root.id, root.id + 1]
+        assert set(result["questions"][0]) == {"id", "short_text", "answers"}
+        assert set(result["questions"][0]["answers"][0]) == {"id", "next_question_id"}
+        questions_sql, links_sql = (query["sql"] for query in context.captured_queries[-2:])
+        assert '"survey_question"."text"' not in questions_sql
+        assert '"survey_question"."id" IN' in questions_sql
+        assert "survey_answer" not in links_sql
+
+    def test_unknown_root(self):
+        survey = create_survey(questions_count=2)
+
+        result, status_code = self.query(survey.id, root=0)
+
+        assert status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+class TestSurveyDocumentCache:
+    def setup_method(self):
+        self.cache = SurveyDocumentCache()
+        self.cache.backend.clear()
+        self.query = GetSurveyQuestionsQuery(
+            survey_model=Survey, survey_serializer=SurveySerializer, survey_cache=self.cache
+        )
+
+    def test_second_read_is_served_from_cache(self, django_assert_num_queries):
+        survey = create_survey(questions_count=3)
+
+        first, _ = self.query(survey.id)
+        with django_assert_num_queries(1):
+            second, status_code = self.query(survey.id)
+
+        assert status_code == status.HTTP_200_OK
+        assert second == first
+        assert self.cache.stats()["hits"] == 1
+        assert self.cache.stats()["misses"] == 1
+
+    def test_update_invalidates_cached_document(self):
+        survey = create_survey(questions_count=1)
+        self.query(survey.id)
+
+        command = UpdateSurveyCommand(
+            survey_model=Survey,
+            survey_serializer=SurveySerializer,
+            answer_model=Answer,
+            question_answer_model=QuestionAnswer,
+        )
+        command(survey.id, {"name": "Новое название"})
+        result, _ = self.query(survey.id)
+
+        assert result["name"] == "Новое название"
+        assert self.cache.stats()["misses"] == 2
@@ -1,7 +1,17 @@
+import io
+import json
+
 import pytest
 from django.test import TestCase
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
 from survey.models import Answer, Question, QuestionAnswer, Survey
+from survey.parsers import MessagePackParser
+from survey.queries.build_survey_document import BuildSurveyDocumentQuery
+from survey.queries.load_survey_tree import LoadSurveyTreeQuery
+from survey.renderers import MessagePackRenderer, ORJSONRenderer
 from survey.serializers import AnswerSerializer, QuestionSerializer, SurveySerializer
+from survey.tests.factories import create_survey
 
 
 @pytest.mark.django_db
@@ -47,3 +57,64 @@ class TestSerializers(TestCase):
         assert data["name"] == "Простой опрос"
         assert len(data["questions"]) == 2
         assert data["questions"][0]["text"] == "Вы любите путешествия?"
+
+
+@pytest.mark.django_db
+class TestBuildSurveyDocumentQuery:
+    def test_matches_serializer_output(self):
+        survey = create_survey(questions_count=4)
+        question = survey.questions.order_by("id").first()
+        question.text = 'Текст с "кавычками", \\ и разделителем\u2028строк'
+        question.meta = {"options": [1, 2.5, None, True], "hint": "Подсказка"}
+        question.save()
+
+        document, revision = BuildSurveyDocumentQuery(survey_model=Survey)(survey.id)
+        expected = SurveySerializer(LoadSurveyTreeQuery(survey_model=Survey)(survey.id)).data
+
+        assert revision == survey.revision
+        assert document == expected
+        assert ORJSONRenderer().render(document) == JSONRenderer().render(expected)
+
+    def test_query_count_does_not_depend_on_survey_size(self, django_assert_num_queries):
+        survey = create_survey(questions_count=20)
+        with django_assert_num_queries(3):
+            BuildSurveyDocumentQuery(survey_model=Survey)(survey.id)
+
+    def test_missing_survey(self):
+        assert BuildSurveyDocumentQuery(survey_model=Survey)(0) is None
+
+
+class TestORJSONRenderer:
+    def test_exponent_floats(self):
+        data = {"meta": {"large": 1e16, "small": 1e-7, "plain": 2.5}}
+
+        body = ORJSONRenderer().render(data)
+
+        assert body == b'{"meta":{"large":1e16,"small":1e-7,"plain":2.5}}'
+        assert json.loads(body) == json.loads(JSONRenderer().render(data))
+
+    def test_big_integers_fall_back_to_json_renderer(self):
+        data = {"path_count": 2**70, "questions": [{"id": -(2**64)}]}
+
+        assert ORJSONRenderer().render(data) == JSONRenderer().render(data)
+        assert json.loads(ORJSONRenderer().render(data)) == data
+
+    def test_unsupported_type(self):
+        with pytest.raises(TypeError):
+            ORJSONRenderer().render({"value": object()})
+
+
+@pytest.mark.django_db
+class TestMessagePack:
+    def test_round_trip_matches_serializer_output(self):
+        survey = create_survey(questions_count=3)
+        data = SurveySerializer(LoadSurveyTreeQuery(survey_model=Survey)(survey.id)).data
+
+        body = MessagePackRenderer().render(data)
+
+        assert MessagePackParser().parse(io.BytesIO(body)) == data
+        assert len(body) < len(ORJSONRenderer().render(data))
+
+    def test_parse_error(self):
+        with pytest.raises(ParseError):
+            MessagePackParser().parse(io.BytesIO(b"\xc1"))
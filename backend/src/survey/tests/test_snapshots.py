@@ -0,0 +1,224 @@
+import gzip
+
+import brotli
+import pytest
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from survey.cache import survey_document_cache
+from survey.commands.publish_survey import PublishSurveyCommand
+from survey.graph import SurveyGraph, SurveyGraphError
+from survey.models import Answer, Question, QuestionAnswer, Survey
+from survey.snapshots import (
+    SnapshotError,
+    SnapshotStore,
+    SurveySnapshot,
+    build_snapshot,
+)
+
+QUESTIONS = [
+    (1, "Вы любите путешествия?", "Путешествия", "radio", {}),
+    (2, "Какой транспорт предпочитаете?", "Транспорт", "checkbox", {"max": 2}),
+    (3, "Как часто?", "Частота", "radio", {}),
+]
+# (question_id, answer_id, text, sort, next_question_id)
+LINKS = [
+    (1, 10, "Да", 0, 2),
+    (1, 11, "Нет", 1, 3),
+    (2, 20, "Самолет", 0, None),
+    (2, 21, "Поезд", 1, 3),
+    (3, 30, "Редко", 0, None),
+]
+
+
+class TestSurveySnapshot:
+    @pytest.fixture(autouse=True)
+    def snapshot(self, tmp_path):
+        self.store = SnapshotStore(tmp_path)
+        payload = {"identity": b'{"id":5}', "gzip": gzip.compress(b'{"id":5}')}
+        self.store.publish(5, build_snapshot((5, "Простой опрос", 7), QUESTIONS, LINKS, payload))
+        self.snapshot = self.store.get(5)
+
+    def test_header(self):
+        assert (self.snapshot.survey_id, self.snapshot.revision, self.snapshot.name) == (5, 7, "Простой опрос")
+        assert list(self.snapshot.question_ids) == [1, 2, 3]
+        assert bytes(self.snapshot.payload()["identity"]) == b'{"id":5}'
+        assert "br" not in self.snapshot.payload()
+
+    def test_question(self):
+        assert self.snapshot.question(2) == {
+            "id": 2,
+            "text": "Какой транспорт предпочитаете?",
+            "short_text": "Транспорт",
+            "type": "checkbox",
+            "meta": {"max": 2},
+            "answers": [
+                {"id": 20, "text": "Самолет", "sort": 0, "question_id": 2, "next_question_id": None},
+                {"id": 21, "text": "Поезд", "sort": 1, "question_id": 2, "next_question_id": 3},
+            ],
+        }
+        with pytest.raises(SurveyGraphError):
+            self.snapshot.question(4)
+
+    @pytest.mark.parametrize(
+        "question_id, answer_ids",
+        [(1, [10]), (1, [11]), (2, [21, 20]), (2, [20]), (3, [30]), (4, [10]), (1, [20]), (1, []), (1, [10, 11])],
+    )
+    def test_next_question_matches_graph(self, question_id, answer_ids):
+        graph = SurveyGraph(
+            survey_id=5,
+            revision=7,
+            questions=[(question[0], question[3]) for question in QUESTIONS],
+            links=[(link[0], link[1], link[4]) for link in LINKS],
+        )
+        try:
+            expected = graph.next_question(question_id, answer_ids)
+        except SurveyGraphError as e:
+            with pytest.raises(SurveyGraphError, match=str(e)):
+                self.snapshot.next_question(question_id, answer_ids)
+        else:
+            assert self.snapshot.next_question(question_id, answer_ids) == expected
+
+    def test_republished_snapshot_is_reopened(self):
+        self.store.publish(5, build_snapshot((5, "Новое название", 8), QUESTIONS, LINKS, {}))
+
+        snapshot = self.store.get(5)
+
+        assert (snapshot.revision, snapshot.name) == (8, "Новое название")
+        # уже открытый снимок продолжает читать прежний файл
+        assert self.snapshot.name == "Простой опрос"
+        assert self.store.get(5) is snapshot
+
+    def test_not_published(self):
+        assert self.store.get(6) is None
+
+    def test_invalid_file(self, tmp_path):
+        path = tmp_path / "broken.snap"
+        path.write_bytes(b"not a snapshot" * 4)
+        with pytest.raises(SnapshotError):
+            SurveySnapshot(path)
+
+
+@pytest.mark.django_db
+class TestPublishedSurveyViews:
+    @pytest.fixture(autouse=True)
+    def snapshot_dir(self, tmp_path):
+        with override_settings(SURVEY_SNAPSHOT_DIR=str(tmp_path)):
+            yield
+
+    def setup_method(self):
+        self.client = APIClient()
+        survey_document_cache.backend.clear()
+        self.survey = Survey.objects.create(name="Простой опрос")
+        self.q1 = Question.objects.create(
+            survey=self.survey, text="Вы любите путешествия?", short_text="Путешествия", q_type="radio", meta={}
+        )
+        self.q2 = Question.objects.create(
+            survey=self.survey,
+            text="Какой транспорт предпочитаете?" * 10,
+            short_text="Транспорт",
+            q_type="radio",
+            meta={},
+        )
+        self.a1 = Answer.objects.create(text="Да", sort=0)
+        self.a2 = Answer.objects.create(text="Нет", sort=1)
+        self.a3 = Answer.objects.create(text="Самолет", sort=0)
+        QuestionAnswer.objects.create(question=self.q1, answer=self.a2, next_question=None)
+        QuestionAnswer.objects.create(question=self.q1, answer=self.a1, next_question=self.q2)
+        QuestionAnswer.objects.create(question=self.q2, answer=self.a3, next_question=None)
+        self.url = reverse("published-survey", kwargs={"id": self.survey.id})
+
+    def publish(self):
+        response = self.client.post(reverse("survey-publish", kwargs={"id": self.survey.id}))
+        assert response.status_code == status.HTTP_200_OK
+        return response.json()
+
+    def test_publish(self):
+        assert self.publish()["revision"] == self.survey.revision
+
+        detail = self.client.get(reverse("survey-detail", kwargs={"id": self.survey.id}))
+        response = self.client.get(self.url)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.content == detail.content
+        assert response["ETag"] == detail["ETag"]
+
+    @pytest.mark.parametrize("encoding, decompress", [("gzip", gzip.decompress), ("br", brotli.decompress)])
+    def test_compressed(self, encoding, decompress):
+        self.publish()
+        identity = self.client.get(self.url).content
+
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING=encoding)
+
+        assert response["Content-Encoding"] == encoding
+        assert response["ETag"] == f'"survey-{self.survey.id}-r{self.survey.revision}-{encoding}"'
+        assert decompress(response.content) == identity
+
+        not_modified = self.client.get(self.url, HTTP_ACCEPT_ENCODING=encoding, HTTP_IF_NONE_MATCH=response["ETag"])
+        assert not_modified.status_code == status.HTTP_304_NOT_MODIFIED
+        assert not_modified["ETag"] == response["ETag"]
+
+    def test_published_views_do_not_query_database(self, django_assert_num_queries):
+        self.publish()
+
+        with django_assert_num_queries(0):
+            response = self.client.get(self.url)
+            question = self.client.get(
+                reverse("published-survey-question", kwargs={"id": self.survey.id, "question_id": self.q1.id})
+            )
+            next_question = self.client.get(
+                reverse("published-survey-next-question", kwargs={"id": self.survey.id}),
+                {"question_id": self.q1.id, "answer_id": self.a1.id},
+            )
+            not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"])
+
+        assert [answer["id"] for answer in question.json()["answers"]] == [self.a1.id, self.a2.id]
+        assert next_question.json() == {"question_id": self.q1.id, "next_question_id": self.q2.id}
+        assert not_modified.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_republish_after_update(self):
+        self.publish()
+        operation = {"op": "set_next_question", "question_id": self.q1.id, "answer_id": self.a1.id}
+        self.client.patch(
+            reverse("survey-detail", kwargs={"id": self.survey.id}), [operation], content_type="application/json"
+        )
+        next_url = reverse("published-survey-next-question", kwargs={"id": self.survey.id})
+        params = {"question_id": self.q1.id, "answer_id": self.a1.id}
+
+        # до повторной публикации респонденты видят прежнюю ревизию
+        assert self.client.get(next_url, params).json()["next_question_id"] == self.q2.id
+        self.publish()
+        assert self.client.get(next_url, params).json()["next_question_id"] is None
+
+    def test_invalid_answer(self):
+        self.publish()
+        response = self.client.get(
+            reverse("published-survey-next-question", kwargs={"id": self.survey.id}),
+            {"question_id": self.q2.id, "answer_id": self.a1.id},
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_not_published(self):
+        assert self.client.get(self.url).status_code == status.HTTP_404_NOT_FOUND
+        response = self.client.post(reverse("survey-publish", kwargs={"id": self.survey.id + 100}))
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_conflict_when_survey_changes_during_publish(self, tmp_path):
+        class ChangingSurvey:
+            class objects:
+                calls = 0
+
+                @classmethod
+                def filter(cls, **kwargs):
+                    cls.calls += 1
+                    if cls.calls == 2:
+                        Survey.objects.filter(id=self.survey.id).update(revision=self.survey.revision + 1)
+                    return Survey.objects.filter(**kwargs)
+
+        store = SnapshotStore(tmp_path)
+
+        result, status_code = PublishSurveyCommand(survey_model=ChangingSurvey, snapshot_store=store)(self.survey.id)
+
+        assert status_code == status.HTTP_409_CONFLICT
+        assert store.get(self.survey.id) is None
@@ -1,18 +1,28 @@
+import gzip
 import json
 from unittest.mock import patch
 
+import brotli
+import msgpack
 import pytest
+from django.db.models import F
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
-from survey.models import Answer, Question, QuestionAnswer, Survey
+from survey.cache import survey_document_cache
+from survey.commands.patch_survey import PatchSurveyCommand
+from survey.commands.update_survey import UpdateSurveyCommand
+from survey.graph import survey_graph_cache
+from survey.models import Answer, Question, QuestionAnswer, RespondentAnswer, Survey
 from survey.serializers import QuestionSerializer, SurveySerializer
+from survey.tests.factories import create_survey
 
 
 @pytest.mark.django_db
 class TestSurveyDetailView:
     def setup_method(self):
         self.client = APIClient()
+        survey_document_cache.backend.clear()
         self.survey = Survey.objects.create(name="Простой опрос")
         self.q1 = Question.objects.create(
             survey=self.survey, text="Вы любите путешествия?", short_text="Путешествия", q_type="radio", meta={}
@@ -169,7 +179,467 @@ class TestSurveyDetailView:
         response = self.client.put(url, invalid_data, content_type="application/json")
         assert response.status_code == status.HTTP_400_BAD_REQUEST
 
-    def test_patch_survey_not_allowed(self):
+    def test_patch_survey(self):
         url = reverse("survey-detail", kwargs={"id": self.survey.id})
-        response = self.client.patch(url, {}, content_type="application/json")
-        assert response.status_code == status.HTTP_405_METHOD_NOT_ALLOWED
+        operations = [
+            {"op": "update_question", "id": self.q1.id, "text": "Вы любите путешествовать?"},
+            {
+                "op": "set_next_question",
+                "question_id": self.q1.id,
+                "answer_id": self.a2.id,
+                "next_question_id": self.q2.id,
+            },
+        ]
+        response = self.client.patch(url, {"operations": operations}, content_type="application/json")
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert [q["id"] for q in data["questions"]] == [self.q1.id]
+        assert data["questions"][0]["text"] == "Вы любите путешествовать?"
+        assert "answers" not in data["questions"][0]
+        assert data["answers"] == [
+            {"id": self.a2.id, "text": "Нет", "sort": 1, "question_id": self.q1.id, "next_question_id": self.q2.id}
+        ]
+        assert response["ETag"] == f'"survey-{self.survey.id}-r{self.survey.revision + 1}"'
+
+    def test_patch_survey_unknown_operation(self):
+        url = reverse("survey-detail", kwargs={"id": self.survey.id})
+        response = self.client.patch(url, {"operations": [{"op": "delete"}]}, content_type="application/json")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    @patch("survey.views.GetSurveyQuestionsQuery")
+    def test_get_survey_returns_etag(self, MockQuery):
+        MockQuery.return_value.return_value = (SurveySerializer(self.survey).data, status.HTTP_200_OK)
+        url = reverse("survey-detail", kwargs={"id": self.survey.id})
+        response = self.client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert response["ETag"] == f'"survey-{self.survey.id}-r{self.survey.revision}"'
+
+    @patch("survey.views.GetSurveyQuestionsQuery")
+    def test_get_survey_not_modified(self, MockQuery):
+        url = reverse("survey-detail", kwargs={"id": self.survey.id})
+        etag = f'"survey-{self.survey.id}-r{self.survey.revision}"'
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response["ETag"] == etag
+        MockQuery.return_value.assert_not_called()
+
+    @patch("survey.views.UpdateSurveyCommand")
+    def test_put_survey_stale_if_match(self, MockCommand):
+        url = reverse("survey-detail", kwargs={"id": self.survey.id})
+        Survey.objects.filter(id=self.survey.id).update(revision=self.survey.revision + 1)
+        stale_etag = f'"survey-{self.survey.id}-r{self.survey.revision}"'
+        response = self.client.put(
+            url, {"name": "Обновленный опрос"}, content_type="application/json", HTTP_IF_MATCH=stale_etag
+        )
+        assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+        MockCommand.return_value.assert_not_called()
+
+    def test_put_survey_if_match_updates_etag(self):
+        url = reverse("survey-detail", kwargs={"id": self.survey.id})
+        etag = f'"survey-{self.survey.id}-r{self.survey.revision}"'
+        response = self.client.put(
+            url, {"name": "Обновленный опрос"}, content_type="application/json", HTTP_IF_MATCH=etag
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response["ETag"] == f'"survey-{self.survey.id}-r{self.survey.revision + 1}"'
+
+    @pytest.mark.parametrize("method, command_class", [("put", UpdateSurveyCommand), ("patch", PatchSurveyCommand)])
+    def test_write_etag_uses_written_revision(self, method, command_class):
+        url = reverse("survey-detail", kwargs={"id": self.survey.id})
+        etag = f'"survey-{self.survey.id}-r{self.survey.revision}"'
+        body = {
+            "put": {"name": "Обновленный опрос"},
+            "patch": [{"op": "update_question", "id": self.q1.id, "text": "Новый текст"}],
+        }[method]
+        call = command_class.__call__
+
+        def call_then_other_editor(*args, **kwargs):
+            # другой редактор сохраняет опрос сразу после команды, до ответа
+            result = call(*args, **kwargs)
+            Survey.objects.filter(id=self.survey.id).update(name="Правка другого редактора", revision=F("revision") + 1)
+            return result
+
+        with patch.object(command_class, "__call__", call_then_other_editor):
+            response = getattr(self.client, method)(url, body, format="json", HTTP_IF_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["revision"] == self.survey.revision + 1
+        assert response["ETag"] == f'"survey-{self.survey.id}-r{self.survey.revision + 1}"'
+
+        response = self.client.put(
+            url, {"name": "Вторая правка"}, content_type="application/json", HTTP_IF_MATCH=response["ETag"]
+        )
+        assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+        assert Survey.objects.get(id=self.survey.id).name == "Правка другого редактора"
+
+    def test_get_survey_subgraph_with_fields(self):
+        url = reverse("survey-detail", kwargs={"id": self.survey.id})
+        response = self.client.get(url, {"fields": "short_text,answers.next_question_id", "root": self.q2.id})
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert [question["id"] for question in data["questions"]] == [self.q2.id]
+        assert set(data["questions"][0]) == {"id", "short_text", "answers"}
+        assert response["ETag"] == f'"survey-{self.survey.id}-r{self.survey.revision}"'
+
+    def test_get_survey_invalid_fields(self):
+        url = reverse("survey-detail", kwargs={"id": self.survey.id})
+        response = self.client.get(url, {"fields": "text,password"})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "password" in response.json()["fields"][0]
+
+        response = self.client.get(url, {"depth": 1})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "depth" in response.json()
+
+    @pytest.mark.parametrize(
+        "accept_encoding, encoding, decompress",
+        [("gzip;q=0.8, br", "br", brotli.decompress), ("gzip, br;q=0", "gzip", gzip.decompress)],
+    )
+    def test_get_survey_precompressed(self, accept_encoding, encoding, decompress):
+        url = reverse("survey-detail", kwargs={"id": self.survey.id})
+        plain = self.client.get(url)
+
+        with patch("survey.views.GetSurveyQuestionsQuery") as MockQuery:
+            response = self.client.get(url, HTTP_ACCEPT_ENCODING=accept_encoding)
+
+        MockQuery.assert_not_called()
+        assert "Content-Encoding" not in plain
+        assert response["Content-Encoding"] == encoding
+        assert "Accept-Encoding" in response["Vary"]
+        assert response["ETag"] == f'"survey-{self.survey.id}-r{self.survey.revision}-{encoding}"'
+        assert decompress(response.content) == plain.content
+
+        not_modified = self.client.get(url, HTTP_ACCEPT_ENCODING=accept_encoding, HTTP_IF_NONE_MATCH=response["ETag"])
+        assert not_modified.status_code == status.HTTP_304_NOT_MODIFIED
+        assert not_modified["ETag"] == response["ETag"]
+        assert "Accept-Encoding" in not_modified["Vary"]
+
+    def test_put_survey_if_match_with_compressed_etag(self):
+        url = reverse("survey-detail", kwargs={"id": self.survey.id})
+        etag = self.client.get(url, HTTP_ACCEPT_ENCODING="br")["ETag"]
+        response = self.client.put(
+            url, {"name": "Обновленный опрос"}, content_type="application/json", HTTP_IF_MATCH=etag
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_survey_in_messagepack(self):
+        url = reverse("survey-detail", kwargs={"id": self.survey.id})
+        document = self.client.get(url).json()
+
+        response = self.client.get(url, HTTP_ACCEPT="application/msgpack")
+        assert response["Content-Type"] == "application/msgpack"
+        assert msgpack.unpackb(response.content) == document
+        assert response["ETag"] == f'"survey-{self.survey.id}-r{self.survey.revision}-msgpack"'
+        assert "Accept" in response["Vary"]
+
+        body = msgpack.packb({**document, "name": "Опрос в MessagePack"})
+        response = self.client.put(url, body, content_type="application/msgpack", HTTP_ACCEPT="application/msgpack")
+        assert response.status_code == status.HTTP_200_OK
+        assert msgpack.unpackb(response.content)["name"] == "Опрос в MessagePack"
+        assert Survey.objects.get(id=self.survey.id).name == "Опрос в MessagePack"
+
+    def test_messagepack_etag_does_not_match_json(self):
+        url = reverse("survey-detail", kwargs={"id": self.survey.id})
+        json_etag = self.client.get(url)["ETag"]
+        msgpack_etag = self.client.get(url, HTTP_ACCEPT="application/msgpack")["ETag"]
+        assert json_etag != msgpack_etag
+
+        response = self.client.get(url, HTTP_ACCEPT="application/msgpack", HTTP_IF_NONE_MATCH=json_etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Type"] == "application/msgpack"
+
+        response = self.client.get(url, HTTP_ACCEPT="application/msgpack", HTTP_IF_NONE_MATCH=msgpack_etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response["ETag"] == msgpack_etag
+        assert "Accept" in response["Vary"]
+
+        response = self.client.put(
+            url, {"name": "Обновленный опрос"}, content_type="application/json", HTTP_IF_MATCH=msgpack_etag
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_put_survey_stale_revision(self):
+        url = reverse("survey-detail", kwargs={"id": self.survey.id})
+        document = self.client.get(url).json()
+        self.client.put(url, {**document, "name": "Первая правка"}, content_type="application/json")
+
+        response = self.client.put(url, {**document, "name": "Вторая правка"}, content_type="application/json")
+
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert Survey.objects.get(id=self.survey.id).name == "Первая правка"
+
+
+@pytest.mark.django_db
+class TestSurveyListView:
+    def setup_method(self):
+        self.client = APIClient()
+        self.url = reverse("survey-list")
+        Survey.objects.all().delete()
+        self.surveys = [Survey.objects.create(name=f"Опрос {i}", sort=i % 3) for i in range(7)]
+        Question.objects.create(survey=self.surveys[0], text="Вопрос", short_text="В", q_type="radio", meta={})
+        Question.objects.create(survey=self.surveys[0], text="Вопрос", short_text="В", q_type="radio", meta={})
+
+    def test_pages_follow_sort_and_id(self, django_assert_num_queries):
+        expected = sorted(self.surveys, key=lambda survey: (survey.sort, survey.id))
+        ids = []
+        url = self.url + "?page_size=3"
+        while url:
+            with django_assert_num_queries(1):
+                response = self.client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            data = response.json()
+            assert len(data["results"]) <= 3
+            ids.extend(survey["id"] for survey in data["results"])
+            url = data["next"]
+
+        assert ids == [survey.id for survey in expected]
+
+    def test_question_count(self):
+        results = self.client.get(self.url).json()["results"]
+        counts = {survey["id"]: survey["question_count"] for survey in results}
+        assert counts[self.surveys[0].id] == 2
+        assert counts[self.surveys[1].id] == 0
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {"cursor": "не курсор"})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+class TestSurveyNextQuestionView:
+    def setup_method(self):
+        self.client = APIClient()
+        survey_graph_cache.clear()
+        self.survey = Survey.objects.create(name="Простой опрос")
+        self.q1 = Question.objects.create(survey=self.survey, text="Вопрос 1", short_text="1", q_type="radio", meta={})
+        self.q2 = Question.objects.create(survey=self.survey, text="Вопрос 2", short_text="2", q_type="radio", meta={})
+        self.a1 = Answer.objects.create(text="Да", sort=0)
+        self.a2 = Answer.objects.create(text="Нет", sort=1)
+        QuestionAnswer.objects.create(question=self.q1, answer=self.a1, next_question=self.q2)
+        QuestionAnswer.objects.create(question=self.q1, answer=self.a2, next_question=None)
+        self.url = reverse("survey-next-question", kwargs={"id": self.survey.id})
+
+    def test_next_question(self):
+        response = self.client.get(self.url, {"question_id": self.q1.id, "answer_id": self.a1.id})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {"question_id": self.q1.id, "next_question_id": self.q2.id}
+
+    def test_graph_is_recompiled_after_update(self):
+        self.client.get(self.url, {"question_id": self.q1.id, "answer_id": self.a1.id})
+        operation = {"op": "set_next_question", "question_id": self.q1.id, "answer_id": self.a1.id}
+        self.client.patch(
+            reverse("survey-detail", kwargs={"id": self.survey.id}), [operation], content_type="application/json"
+        )
+
+        response = self.client.get(self.url, {"question_id": self.q1.id, "answer_id": self.a1.id})
+        assert response.json()["next_question_id"] is None
+
+    def test_answer_of_another_question(self):
+        response = self.client.get(self.url, {"question_id": self.q2.id, "answer_id": self.a1.id})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_missing_answer(self):
+        response = self.client.get(self.url, {"question_id": self.q1.id})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+class TestAsyncSurveyViews:
+    def setup_method(self):
+        self.client = APIClient()
+        survey_graph_cache.clear()
+        survey_document_cache.backend.clear()
+        self.survey = Survey.objects.create(name="Простой опрос")
+        self.q1 = Question.objects.create(survey=self.survey, text="Вопрос 1", short_text="1", q_type="radio", meta={})
+        self.q2 = Question.objects.create(survey=self.survey, text="Вопрос 2", short_text="2", q_type="radio", meta={})
+        self.a1 = Answer.objects.create(text="Да", sort=0)
+        self.a2 = Answer.objects.create(text="Нет", sort=1)
+        QuestionAnswer.objects.create(question=self.q1, answer=self.a1, next_question=self.q2)
+        QuestionAnswer.objects.create(question=self.q1, answer=self.a2, next_question=None)
+
+    def test_get_survey_matches_sync_view(self):
+        url = reverse("async-survey-detail", kwargs={"id": self.survey.id})
+
+        response = self.client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        sync_response = self.client.get(reverse("survey-detail", kwargs={"id": self.survey.id}))
+        assert response.content == sync_response.content
+        assert response["ETag"] == sync_response["ETag"]
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_get_missing_survey(self):
+        response = self.client.get(reverse("async-survey-detail", kwargs={"id": self.survey.id + 1}))
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_next_question(self):
+        url = reverse("async-survey-next-question", kwargs={"id": self.survey.id})
+
+        response = self.client.get(url, {"question_id": self.q1.id, "answer_id": self.a1.id})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {"question_id": self.q1.id, "next_question_id": self.q2.id}
+
+        response = self.client.get(url, {"question_id": self.q1.id})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+class TestSurveyGraphViews:
+    def setup_method(self):
+        self.client = APIClient()
+        survey_graph_cache.clear()
+        self.survey = Survey.objects.create(name="Простой опрос")
+        self.q1 = Question.objects.create(survey=self.survey, text="Вопрос 1", short_text="1", q_type="radio", meta={})
+        self.q2 = Question.objects.create(survey=self.survey, text="Вопрос 2", short_text="2", q_type="radio", meta={})
+        self.a1 = Answer.objects.create(text="Да", sort=0)
+        QuestionAnswer.objects.create(question=self.q1, answer=self.a1, next_question=self.q2)
+
+    def test_validation(self):
+        response = self.client.get(reverse("survey-validation", kwargs={"id": self.survey.id}))
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["is_valid"]
+
+    def test_put_returns_validation_report(self):
+        data = SurveySerializer(self.survey).data
+        data["questions"] = [q for q in data["questions"] if q["id"] == self.q1.id]
+        data["questions"][0]["answers"][0]["next_question_id"] = self.q1.id
+
+        response = self.client.put(
+            reverse("survey-detail", kwargs={"id": self.survey.id}), data, content_type="application/json"
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        validation = response.json()["validation"]
+        assert not validation["is_valid"]
+        assert validation["entry_question_id"] == self.q2.id
+        assert validation["cycles"] == [[self.q1.id]]
+        assert validation["unreachable_question_ids"] == [self.q1.id]
+
+    def test_analytics(self):
+        response = self.client.get(reverse("survey-analytics", kwargs={"id": self.survey.id}))
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert data["path_count"] == 1
+        assert data["max_questions"] == 2
+
+    def test_analytics_path_count_overflow(self):
+        # 70 вопросов по 2 ответа подряд: 2^70 путей
+        survey = create_survey(questions_count=70, answers_per_question=2)
+
+        response = self.client.get(reverse("survey-analytics", kwargs={"id": survey.id}))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["path_count"] == 2**63 - 1
+        assert response.json()["path_count_overflow"]
+
+
+@pytest.mark.django_db
+class TestSurveyResponsesView:
+    def setup_method(self):
+        self.client = APIClient()
+        survey_graph_cache.clear()
+        self.survey = Survey.objects.create(name="Простой опрос")
+        self.q1 = Question.objects.create(survey=self.survey, text="Вопрос 1", short_text="1", q_type="radio", meta={})
+        self.q2 = Question.objects.create(
+            survey=self.survey, text="Вопрос 2", short_text="2", q_type="checkbox", meta={}
+        )
+        self.a1 = Answer.objects.create(text="Да", sort=0)
+        self.a2 = Answer.objects.create(text="Нет", sort=1)
+        self.a3 = Answer.objects.create(text="Самолет", sort=0)
+        self.a4 = Answer.objects.create(text="Поезд", sort=1)
+        QuestionAnswer.objects.create(question=self.q1, answer=self.a1, next_question=self.q2)
+        QuestionAnswer.objects.create(question=self.q1, answer=self.a2, next_question=None)
+        QuestionAnswer.objects.create(question=self.q2, answer=self.a3, next_question=None)
+        QuestionAnswer.objects.create(question=self.q2, answer=self.a4, next_question=None)
+        self.url = reverse("survey-responses", kwargs={"id": self.survey.id})
+
+    def test_json_batch(self, django_assert_max_num_queries):
+        responses = [
+            {
+                "respondent_id": f"r{i}",
+                "answers": [
+                    {"question_id": self.q1.id, "answer_ids": [self.a1.id]},
+                    {"question_id": self.q2.id, "answer_ids": [self.a3.id, self.a4.id]},
+                ],
+            }
+            for i in range(50)
+        ]
+        response = self.client.post(self.url, responses, format="json")
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.json() == {"accepted": 50, "rows": 150, "rejected": []}
+
+        # вставка ответов и счетчиков не зависит от размера пачки
+        with django_assert_max_num_queries(10):
+            self.client.post(self.url, responses, format="json")
+        assert RespondentAnswer.objects.filter(survey=self.survey).count() == 300
+
+    def test_ndjson_batch_with_invalid_rows(self):
+        lines = [
+            {"respondent_id": "r1", "answers": [{"question_id": self.q1.id, "answer_ids": [self.a2.id]}]},
+            {"respondent_id": "r2", "answers": [{"question_id": self.q1.id, "answer_ids": [self.a1.id, self.a2.id]}]},
+            {"respondent_id": "r3", "answers": [{"question_id": self.q1.id, "answer_ids": [self.a3.id]}]},
+        ]
+        body = "\n".join(json.dumps(line) for line in lines)
+        response = self.client.post(self.url, body, content_type="application/x-ndjson")
+        assert response.status_code == status.HTTP_201_CREATED
+        data = response.json()
+        assert data["accepted"] == 1
+        assert [rejected["index"] for rejected in data["rejected"]] == [1, 2]
+        assert list(RespondentAnswer.objects.values_list("respondent_id", "answer_id")) == [("r1", self.a2.id)]
+
+    def test_invalid_ndjson(self):
+        response = self.client.post(self.url, "{not json}", content_type="application/x-ndjson")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_stats(self):
+        responses = [
+            {
+                "respondent_id": "r1",
+                "answers": [
+                    {"question_id": self.q1.id, "answer_ids": [self.a1.id]},
+                    {"question_id": self.q2.id, "answer_ids": [self.a3.id, self.a4.id]},
+                ],
+            },
+            {"respondent_id": "r2", "answers": [{"question_id": self.q1.id, "answer_ids": [self.a1.id]}]},
+            {"respondent_id": "r3", "answers": [{"question_id": self.q1.id, "answer_ids": [self.a2.id]}]},
+        ]
+        self.client.post(self.url, responses, format="json")
+        self.client.post(self.url, responses[:1], format="json")
+
+        response = self.client.get(reverse("survey-stats", kwargs={"id": self.survey.id}))
+        assert response.status_code == status.HTTP_200_OK
+        q1, q2 = response.json()["questions"]
+        assert (q1["reached_count"], q1["drop_off_count"]) == (4, 0)
+        assert [answer["selected_count"] for answer in q1["answers"]] == [3, 1]
+        assert (q2["reached_count"], q2["drop_off_count"]) == (3, 1)
+        assert [answer["selected_count"] for answer in q2["answers"]] == [2, 2]
+
+    def test_export(self):
+        responses = [
+            {"respondent_id": "r1", "answers": [{"question_id": self.q1.id, "answer_ids": [self.a1.id]}]},
+            {"respondent_id": "r2", "answers": [{"question_id": self.q2.id, "answer_ids": [self.a3.id, self.a4.id]}]},
+        ]
+        self.client.post(self.url, responses, format="json")
+        url = reverse("survey-responses-export", kwargs={"id": self.survey.id})
+
+        response = self.client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Type"] == "application/x-ndjson"
+        lines = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+        assert [(line["respondent_id"], line["answer_text"]) for line in lines] == [
+            ("r1", "Да"),
+            ("r2", "Самолет"),
+            ("r2", "Поезд"),
+        ]
+        assert lines[0]["question_text"] == "Вопрос 1"
+
+        response = self.client.get(url, {"output": "csv"})
+        rows = b"".join(response.streaming_content).decode().splitlines()
+        assert rows[0] == "respondent_id,submitted_at,question_id,question_text,answer_id,answer_text"
+        assert len(rows) == 4
+
+    def test_export_unknown_format(self):
+        url = reverse("survey-responses-export", kwargs={"id": self.survey.id})
+        assert self.client.get(url, {"output": "xml"}).status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,68 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+class RequestTimings:
+    """
+    Замеры одного запроса: число и время SQL-запросов и именованные интервалы (spans) в миллисекундах.
+
+    Текст SQL сохраняется только при collect_sql, чтобы без порога медленных запросов не держать его в памяти.
+    """
+
+    def __init__(self, collect_sql: bool = False):
+        self.started: float = time.perf_counter()
+        self.collect_sql: bool = collect_sql
+        self.db_count: int = 0
+        self.db_ms: float = 0.0
+        self.queries: list[tuple[str, float]] = []
+        self.spans: dict[str, float] = {}
+
+    def add_query(self, sql: str, duration_ms: float) -> None:
+        self.db_count += 1
+        self.db_ms += duration_ms
+        if self.collect_sql:
+            self.queries.append((sql, duration_ms))
+
+    def add_span(self, name: str, duration_ms: float) -> None:
+        self.spans[name] = self.spans.get(name, 0.0) + duration_ms
+
+    @property
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+
+# Замеры текущего запроса; contextvars доходят и до потоков sync_to_async, поэтому работают и для async-представлений
+current_timings: ContextVar[RequestTimings | None] = ContextVar("current_timings", default=None)
+
+
+@contextmanager
+def span(name: str):
+    """
+    Добавляет время блока к интервалу name текущего запроса. Вне запроса (команды, тесты) ничего не делает.
+    """
+    timings = current_timings.get()
+    if timings is None:
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add_span(name, (time.perf_counter() - started) * 1000)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Обертка выполнения SQL (connection.execute_wrappers), подключается ко всем соединениям в SurveyConfig.ready.
+    """
+    timings = current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add_query(sql, (time.perf_counter() - started) * 1000)
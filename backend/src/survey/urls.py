@@ -1,7 +1,39 @@
 from django.urls import path
 
-from . import views
+from . import async_views, views
 
 urlpatterns = [
+    path("survey/", views.SurveyListView.as_view(), name="survey-list"),
     path("survey/<int:id>/", views.SurveyDetailView.as_view(), name="survey-detail"),
+    path("survey/<int:id>/next/", views.SurveyNextQuestionView.as_view(), name="survey-next-question"),
+    path("survey/<int:id>/validation/", views.SurveyValidationView.as_view(), name="survey-validation"),
+    path("survey/<int:id>/analytics/", views.SurveyAnalyticsView.as_view(), name="survey-analytics"),
+    path("survey/<int:id>/responses/", views.SurveyResponsesView.as_view(), name="survey-responses"),
+    path(
+        "survey/<int:id>/responses/export/",
+        views.SurveyResponsesExportView.as_view(),
+        name="survey-responses-export",
+    ),
+    path("survey/<int:id>/stats/", views.SurveyStatsView.as_view(), name="survey-stats"),
+    path("survey/<int:id>/publish/", views.SurveyPublishView.as_view(), name="survey-publish"),
+    # опубликованные снимки опросов для респондентов, без обращения к БД
+    path("survey/<int:id>/published/", views.PublishedSurveyView.as_view(), name="published-survey"),
+    path(
+        "survey/<int:id>/published/questions/<int:question_id>/",
+        views.PublishedSurveyQuestionView.as_view(),
+        name="published-survey-question",
+    ),
+    path(
+        "survey/<int:id>/published/next/",
+        views.PublishedSurveyNextQuestionView.as_view(),
+        name="published-survey-next-question",
+    ),
+    path("internal/metrics/", views.InternalMetricsView.as_view(), name="internal-metrics"),
+    # асинхронный путь чтения для ASGI
+    path("async/survey/<int:id>/", async_views.AsyncSurveyDetailView.as_view(), name="async-survey-detail"),
+    path(
+        "async/survey/<int:id>/next/",
+        async_views.AsyncSurveyNextQuestionView.as_view(),
+        name="async-survey-next-question",
+    ),
 ]
@@ -1,48 +1,540 @@
-from drf_spectacular.utils import extend_schema
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, extend_schema
 from rest_framework import generics, status
+from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.views import APIView
 
+from .cache import survey_document_cache, survey_payload_cache
+from .commands.ingest_responses import IngestResponsesCommand
+from .commands.patch_survey import PatchSurveyCommand
+from .commands.publish_survey import PublishSurveyCommand
 from .commands.update_survey import UpdateSurveyCommand
-from .models import Answer, QuestionAnswer, Survey
+from .compression import compress_payload, encoded_response
+from .db_metrics import database_pool_stats
+from .etags import etag_matches, make_survey_etag, matching_etag, survey_etags
+from .graph import survey_graph_cache
+from .models import Answer, QuestionAnswer, RespondentAnswer, Survey
+from .parsers import MessagePackParser, NDJSONParser
+from .profiling import ProfiledViewMixin
+from .queries.analyze_survey import AnalyzeSurveyQuery
+from .queries.build_survey_document import BuildSurveyDocumentQuery
+from .queries.export_responses import ExportResponsesQuery
+from .queries.get_next_question import GetNextQuestionQuery
+from .queries.get_published_next_question import GetPublishedNextQuestionQuery
+from .queries.get_published_question import GetPublishedQuestionQuery
 from .queries.get_survey_questions import GetSurveyQuestionsQuery
-from .serializers import QuestionSerializer, SurveySerializer
+from .queries.get_survey_stats import GetSurveyStatsQuery
+from .queries.get_survey_subset import GetSurveySubsetQuery
+from .queries.list_surveys import ListSurveysQuery
+from .queries.validate_survey import ValidateSurveyQuery
+from .renderers import MessagePackRenderer, ORJSONRenderer
+from .serializers import (
+    NextQuestionRequestSerializer,
+    NextQuestionSerializer,
+    QuestionSerializer,
+    RespondentResponseSerializer,
+    ResponsesIngestResultSerializer,
+    SurveyAnalyticsSerializer,
+    SurveyDocumentRequestSerializer,
+    SurveyListRequestSerializer,
+    SurveyListSerializer,
+    SurveyPatchResultSerializer,
+    SurveyPatchSerializer,
+    SurveyPublishResultSerializer,
+    SurveySerializer,
+    SurveyStatsSerializer,
+    SurveyValidationSerializer,
+)
+from .snapshots import survey_snapshot_store
+from .timing import span
+
+
+class SurveyListView(generics.GenericAPIView):
+    queryset = Survey.objects.all()
+    serializer_class = SurveyListSerializer
+
+    @extend_schema(
+        summary="Список опросов",
+        description="""Краткие описания опросов (id, название, порядок, число вопросов), упорядоченные по sort и id.
+         Следующая страница запрашивается по ссылке next (курсор), null - страница последняя""",
+        parameters=[SurveyListRequestSerializer],
+        responses={200: SurveyListSerializer},
+    )
+    def get(self, request, *args, **kwargs):
+        params = SurveyListRequestSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+
+        list_surveys_query = ListSurveysQuery(survey_model=Survey)
+        result, status_code = list_surveys_query(
+            params.validated_data.get("cursor"), params.validated_data.get("page_size")
+        )
+        if status_code != status.HTTP_200_OK:
+            return Response(result, status=status_code)
 
+        next_cursor = result["next_cursor"]
+        next_url = replace_query_param(request.build_absolute_uri(), "cursor", next_cursor) if next_cursor else None
+        return Response({"next": next_url, "results": result["results"]}, status=status_code)
 
-class SurveyDetailView(generics.RetrieveUpdateAPIView):
+
+class SurveyDetailView(ProfiledViewMixin, generics.RetrieveUpdateAPIView):
     queryset = Survey.objects.all()
     serializer_class = SurveySerializer
     lookup_field = "id"
+    # документ опроса можно читать и записывать в MessagePack, выбирается по Accept и Content-Type
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, MessagePackRenderer]
+    parser_classes = [*api_settings.DEFAULT_PARSER_CLASSES, MessagePackParser]
 
     @extend_schema(
         summary="Получение объекта запроса",
         description="""Возвращает объект запроса по id с вопросами, ответами и актуальными связями между ними
-         для отображения на фронте""",
+         для отображения на фронте. Ответ содержит ETag текущей ревизии опроса, на запрос с совпадающим
+         If-None-Match возвращается 304 без тела. fields ограничивает поля вопросов и ответов, root и depth -
+         вопросы, достижимые от root не больше чем за depth переходов. Полный документ в JSON отдается
+         заранее сжатым в br или gzip по Accept-Encoding, ETag сжатого тела оканчивается на -br или -gzip,
+         ETag документа в MessagePack - на -msgpack""",
+        parameters=[SurveyDocumentRequestSerializer],
         responses={200: QuestionSerializer(many=True)},
     )
     def get(self, request, *args, **kwargs):
         survey_id = kwargs.get("id")
-        get_survey_questions_query = GetSurveyQuestionsQuery(survey_model=Survey, survey_serializer=SurveySerializer)
-        result, status_code = get_survey_questions_query(survey_id)
-        return Response(result, status=status_code)
+        params = SurveyDocumentRequestSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+
+        revision = self._get_revision(survey_id)
+        if revision is not None:
+            representation = request.accepted_renderer.format
+            etag = make_survey_etag(survey_id, revision, representation=representation)
+            matched = matching_etag(
+                request.headers.get("If-None-Match"), survey_etags(survey_id, revision, representation), weak=True
+            )
+            if matched:
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+                patch_vary_headers(response, ["Accept-Encoding"])
+                return self._with_etag(response, matched)
+
+        if params.validated_data:
+            get_survey_subset_query = GetSurveySubsetQuery(survey_model=Survey, graph_cache=survey_graph_cache)
+            result, status_code = get_survey_subset_query(survey_id, **params.validated_data)
+            response = Response(result, status=status_code)
+            if status_code == status.HTTP_200_OK:
+                etag = make_survey_etag(survey_id, result["revision"], representation=request.accepted_renderer.format)
+                self._with_etag(response, etag)
+            return response
+
+        if revision is not None and self._renders_compact_json(request):
+            return self._precompressed_response(request, survey_id, revision)
+
+        get_survey_questions_query = GetSurveyQuestionsQuery(
+            survey_model=Survey,
+            survey_serializer=SurveySerializer,
+            survey_cache=survey_document_cache,
+            document_query=BuildSurveyDocumentQuery(survey_model=Survey),
+        )
+        result, status_code = get_survey_questions_query(survey_id, revision=revision)
+        response = Response(result, status=status_code)
+        if revision is not None and status_code == status.HTTP_200_OK:
+            self._with_etag(response, etag)
+        return response
 
     @extend_schema(
         summary="Обновление связи и текстов вопросов и ответов по id опроса",
-        description="""Обновляет связи и текст вопросов и ответов по id опроса""",
+        description="""Обновляет связи и текст вопросов и ответов по id опроса. Если передан If-Match, а опрос
+         уже изменен, возвращается 412; если устарела ревизия из поля revision или опрос изменили во время
+         запроса - 409. В ответ добавляется отчет о проверке графа переходов (validation)""",
         responses={200: SurveySerializer},
         request=SurveySerializer,
     )
     def put(self, request, *args, **kwargs):
         survey_id = kwargs.get("id")
         data = request.data
+
+        expected_revision, precondition_failed = self._check_if_match(request, survey_id)
+        if precondition_failed:
+            return precondition_failed
+
         update_survey_command: UpdateSurveyCommand = UpdateSurveyCommand(
             survey_model=Survey,
             survey_serializer=SurveySerializer,
             answer_model=Answer,
             question_answer_model=QuestionAnswer,
+            graph_cache=survey_graph_cache,
+        )
+        result, status_code = update_survey_command(survey_id, data, expected_revision=expected_revision)
+        return self._write_response(survey_id, result, status_code)
+
+    @extend_schema(
+        summary="Частичное обновление опроса",
+        description="""Применяет список операций (update_question, update_answer, set_next_question) в одной
+         транзакции и возвращает только затронутые вопросы и ответы. If-Match и revision проверяются так же,
+         как в PUT""",
+        responses={200: SurveyPatchResultSerializer},
+        request=SurveyPatchSerializer,
+    )
+    def patch(self, request, *args, **kwargs):
+        survey_id = kwargs.get("id")
+        data = request.data
+
+        expected_revision, precondition_failed = self._check_if_match(request, survey_id)
+        if precondition_failed:
+            return precondition_failed
+
+        patch_survey_command: PatchSurveyCommand = PatchSurveyCommand(
+            survey_model=Survey,
+            survey_serializer=SurveySerializer,
+            answer_model=Answer,
+            question_answer_model=QuestionAnswer,
+            graph_cache=survey_graph_cache,
+        )
+        result, status_code = patch_survey_command(survey_id, data, expected_revision=expected_revision)
+        return self._write_response(survey_id, result, status_code)
+
+    def _renders_compact_json(self, request) -> bool:
+        renderer = request.accepted_renderer
+        return type(renderer) is ORJSONRenderer and (
+            renderer.get_indent(request.accepted_media_type, self.get_renderer_context()) is None
+        )
+
+    def _precompressed_response(self, request, survey_id: int, revision: int) -> HttpResponse:
+        """
+        Отдает полный документ готовым телом из survey_payload_cache в кодировании из Accept-Encoding.
+
+        При промахе документ собирается, рендерится и сжимается один раз на ревизию.
+        """
+        payload = survey_payload_cache.get(survey_id, revision)
+        if payload is None:
+            get_survey_questions_query = GetSurveyQuestionsQuery(
+                survey_model=Survey,
+                survey_serializer=SurveySerializer,
+                document_query=BuildSurveyDocumentQuery(survey_model=Survey),
+            )
+            result, status_code = get_survey_questions_query(survey_id)
+            if status_code != status.HTTP_200_OK:
+                return Response(result, status=status_code)
+
+            with span("render"):
+                body = request.accepted_renderer.render(result)
+            with span("survey.compress"):
+                payload = compress_payload(body)
+            survey_payload_cache.set(survey_id, revision, payload)
+
+        response = encoded_response(payload, request, content_type=request.accepted_renderer.media_type)
+        return self._with_etag(
+            response, make_survey_etag(survey_id, revision, response.get("Content-Encoding", "identity"))
+        )
+
+    def _check_if_match(self, request, survey_id: int) -> tuple[int | None, Response | None]:
+        """
+        Сверяет If-Match с текущей ревизией опроса.
+
+        :return: Ревизия, которую должна подтвердить команда в своей транзакции (None, если заголовка нет),
+            и ответ 412, если ревизия уже устарела.
+        """
+        if_match = request.headers.get("If-Match")
+        if not if_match:
+            return None, None
+
+        revision = self._get_revision(survey_id)
+        if revision is None:
+            return None, None
+
+        # клиент мог получить документ в любом формате и кодировании
+        etags = [
+            etag for renderer in self.renderer_classes for etag in survey_etags(survey_id, revision, renderer.format)
+        ]
+        if not etag_matches(if_match, etags):
+            return revision, Response(
+                {"detail": "Опрос был изменен другим пользователем."}, status=status.HTTP_412_PRECONDITION_FAILED
+            )
+        return revision, None
+
+    def _write_response(self, survey_id: int, result: dict, status_code: int) -> Response:
+        """
+        Ответ PUT/PATCH с ETag ревизии из результата команды.
+
+        Ревизия не перечитывается: правка другого редактора, сохраненная после команды, получила бы ETag этого
+        ответа, и следующий If-Match клиента молча перезаписал бы ее.
+        """
+        response = Response(result, status=status_code)
+        if status_code == status.HTTP_200_OK:
+            etag = make_survey_etag(survey_id, result["revision"], representation=self.request.accepted_renderer.format)
+            self._with_etag(response, etag)
+        return response
+
+    @staticmethod
+    def _get_revision(survey_id: int) -> int | None:
+        with span("survey.revision"):
+            return Survey.objects.filter(id=survey_id).values_list("revision", flat=True).first()
+
+    @staticmethod
+    def _with_etag(response: HttpResponse, etag: str) -> HttpResponse:
+        """
+        Проставляет ETag и требует от клиента перепроверять документ при каждом обращении.
+
+        Формат тела выбирается по Accept, поэтому кэши должны хранить представления отдельно (Vary: Accept).
+        """
+        response["ETag"] = etag
+        patch_vary_headers(response, ["Accept"])
+        patch_cache_control(response, no_cache=True)
+        return response
+
+
+class SurveyNextQuestionView(generics.GenericAPIView):
+    queryset = Survey.objects.all()
+    serializer_class = NextQuestionRequestSerializer
+    lookup_field = "id"
+
+    @extend_schema(
+        summary="Следующий вопрос для респондента",
+        description="""Возвращает id вопроса, который нужно показать после выбранных ответов (answer_id можно
+         передать несколько раз для вопроса с множественным выбором). null - опрос закончен""",
+        parameters=[NextQuestionRequestSerializer],
+        responses={200: NextQuestionSerializer},
+    )
+    def get(self, request, *args, **kwargs):
+        survey_id = kwargs.get("id")
+        params = NextQuestionRequestSerializer(
+            data={
+                "question_id": request.query_params.get("question_id"),
+                "answer_id": request.query_params.getlist("answer_id"),
+            }
+        )
+        params.is_valid(raise_exception=True)
+
+        get_next_question_query = GetNextQuestionQuery(survey_model=Survey, graph_cache=survey_graph_cache)
+        result, status_code = get_next_question_query(
+            survey_id, params.validated_data["question_id"], params.validated_data["answer_id"]
         )
-        result, status_code = update_survey_command(survey_id, data)
         return Response(result, status=status_code)
 
+
+class SurveyValidationView(generics.GenericAPIView):
+    queryset = Survey.objects.all()
+    serializer_class = SurveyValidationSerializer
+    lookup_field = "id"
+
+    @extend_schema(
+        summary="Проверка графа переходов опроса",
+        description="""Ищет циклы, вопросы, недостижимые от первого вопроса, и ответы без продолжения""",
+        responses={200: SurveyValidationSerializer},
+    )
+    def get(self, request, *args, **kwargs):
+        survey_id = kwargs.get("id")
+        validate_survey_query = ValidateSurveyQuery(survey_model=Survey, graph_cache=survey_graph_cache)
+        result, status_code = validate_survey_query(survey_id)
+        return Response(result, status=status_code)
+
+
+class SurveyAnalyticsView(generics.GenericAPIView):
+    queryset = Survey.objects.all()
+    serializer_class = SurveyAnalyticsSerializer
+    lookup_field = "id"
+
+    @extend_schema(
+        summary="Анализ путей прохождения опроса",
+        description="""Число различных путей респондента, наименьшее и наибольшее число вопросов до завершения
+         и глубина каждого вопроса. Для графа с циклами возвращается 409""",
+        responses={200: SurveyAnalyticsSerializer},
+    )
+    def get(self, request, *args, **kwargs):
+        survey_id = kwargs.get("id")
+        analyze_survey_query = AnalyzeSurveyQuery(survey_model=Survey, graph_cache=survey_graph_cache)
+        result, status_code = analyze_survey_query(survey_id)
+        return Response(result, status=status_code)
+
+
+class SurveyResponsesView(generics.GenericAPIView):
+    queryset = Survey.objects.all()
+    serializer_class = RespondentResponseSerializer
+    lookup_field = "id"
+    parser_classes = [JSONParser, NDJSONParser]
+
+    @extend_schema(
+        summary="Загрузка ответов респондентов",
+        description="""Принимает пачку ответов респондентов JSON-массивом или в формате NDJSON
+         (application/x-ndjson, один респондент на строку). Ответы проверяются по структуре опроса,
+         некорректные элементы возвращаются в rejected, остальные сохраняются""",
+        request=RespondentResponseSerializer(many=True),
+        responses={201: ResponsesIngestResultSerializer, 400: ResponsesIngestResultSerializer},
+    )
+    def post(self, request, *args, **kwargs):
+        survey_id = kwargs.get("id")
+        ingest_responses_command = IngestResponsesCommand(
+            survey_model=Survey, respondent_answer_model=RespondentAnswer, graph_cache=survey_graph_cache
+        )
+        result, status_code = ingest_responses_command(survey_id, request.data)
+        return Response(result, status=status_code)
+
+
+class SurveyResponsesExportView(generics.GenericAPIView):
+    queryset = Survey.objects.all()
+    lookup_field = "id"
+
+    @extend_schema(
+        summary="Выгрузка ответов респондентов",
+        description="""Потоково отдает все ответы респондентов опроса в формате NDJSON или CSV
+         вместе с текстами вопросов и ответов""",
+        parameters=[
+            OpenApiParameter(
+                "output", OpenApiTypes.STR, enum=list(ExportResponsesQuery.CONTENT_TYPES), default="ndjson"
+            )
+        ],
+        responses={(200, "application/x-ndjson"): OpenApiTypes.STR, (200, "text/csv"): OpenApiTypes.STR},
+    )
+    def get(self, request, *args, **kwargs):
+        survey_id = kwargs.get("id")
+        export_format = request.query_params.get("output", "ndjson")
+        export_responses_query = ExportResponsesQuery(survey_model=Survey, respondent_answer_model=RespondentAnswer)
+        result, status_code = export_responses_query(survey_id, export_format)
+        if status_code != status.HTTP_200_OK:
+            return Response(result, status=status_code)
+
+        response = StreamingHttpResponse(result, content_type=ExportResponsesQuery.CONTENT_TYPES[export_format])
+        response["Content-Disposition"] = f'attachment; filename="survey-{survey_id}-responses.{export_format}"'
+        return response
+
+
+class SurveyStatsView(generics.GenericAPIView):
+    queryset = Survey.objects.all()
+    serializer_class = SurveyStatsSerializer
+    lookup_field = "id"
+
+    @extend_schema(
+        summary="Статистика ответов респондентов",
+        description="""Сколько раз выбран каждый ответ, сколько респондентов дошли до каждого вопроса
+         и сколько из них остановились на нем. Значения поддерживаются при загрузке ответов""",
+        responses={200: SurveyStatsSerializer},
+    )
+    def get(self, request, *args, **kwargs):
+        survey_id = kwargs.get("id")
+        get_survey_stats_query = GetSurveyStatsQuery(survey_model=Survey, graph_cache=survey_graph_cache)
+        result, status_code = get_survey_stats_query(survey_id)
+        return Response(result, status=status_code)
+
+
+class SurveyPublishView(generics.GenericAPIView):
+    queryset = Survey.objects.all()
+    serializer_class = SurveyPublishResultSerializer
+    lookup_field = "id"
+
+    @extend_schema(
+        summary="Публикация опроса",
+        description="""Замораживает текущую ревизию опроса в файл снимка, из которого читают эндпоинты
+         survey/{id}/published/. Повторная публикация заменяет снимок целиком""",
+        request=None,
+        responses={200: SurveyPublishResultSerializer},
+    )
+    def post(self, request, *args, **kwargs):
+        survey_id = kwargs.get("id")
+        publish_survey_command = PublishSurveyCommand(survey_model=Survey, snapshot_store=survey_snapshot_store)
+        result, status_code = publish_survey_command(survey_id)
+        return Response(result, status=status_code)
+
+
+class PublishedSurveyView(APIView):
+    """
+    Опубликованный опрос для респондентов: тело ответа берется из снимка (mmap) в кодировании из Accept-Encoding,
+    БД не используется. Аутентификация отключена, чтобы не читать сессию и пользователя.
+    """
+
+    authentication_classes = []
+
+    @extend_schema(
+        summary="Опубликованный опрос",
+        description="""Документ опубликованной ревизии опроса в той же форме, что и GET survey/{id}/. ETag -
+         опубликованная ревизия и кодирование тела, на совпадающий If-None-Match возвращается 304""",
+        responses={200: SurveySerializer},
+    )
+    def get(self, request, *args, **kwargs):
+        survey_id = kwargs.get("id")
+        snapshot = survey_snapshot_store.get(survey_id)
+        if snapshot is None:
+            return Response({"detail": "Опрос не опубликован."}, status=status.HTTP_404_NOT_FOUND)
+
+        etag = matching_etag(
+            request.headers.get("If-None-Match"), survey_etags(survey_id, snapshot.revision), weak=True
+        )
+        if etag:
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+            patch_vary_headers(response, ["Accept-Encoding"])
+        else:
+            response = encoded_response(snapshot.payload(), request)
+            etag = make_survey_etag(survey_id, snapshot.revision, response.get("Content-Encoding", "identity"))
+        response["ETag"] = etag
+        patch_cache_control(response, no_cache=True)
+        return response
+
+
+class PublishedSurveyQuestionView(APIView):
+    authentication_classes = []
+
+    @extend_schema(
+        summary="Вопрос опубликованного опроса",
+        description="""Вопрос с ответами из снимка опубликованной ревизии, ответы упорядочены по sort""",
+        responses={200: QuestionSerializer},
+    )
+    def get(self, request, *args, **kwargs):
+        get_published_question_query = GetPublishedQuestionQuery(snapshot_store=survey_snapshot_store)
+        result, status_code = get_published_question_query(kwargs.get("id"), kwargs.get("question_id"))
+        return Response(result, status=status_code)
+
+
+class PublishedSurveyNextQuestionView(APIView):
+    authentication_classes = []
+
+    @extend_schema(
+        summary="Следующий вопрос опубликованного опроса",
+        description="""То же, что survey/{id}/next/, но по снимку опубликованной ревизии, без обращения к БД""",
+        parameters=[NextQuestionRequestSerializer],
+        responses={200: NextQuestionSerializer},
+    )
+    def get(self, request, *args, **kwargs):
+        params = NextQuestionRequestSerializer(
+            data={
+                "question_id": request.query_params.get("question_id"),
+                "answer_id": request.query_params.getlist("answer_id"),
+            }
+        )
+        params.is_valid(raise_exception=True)
+
+        get_next_question_query = GetPublishedNextQuestionQuery(snapshot_store=survey_snapshot_store)
+        result, status_code = get_next_question_query(
+            kwargs.get("id"), params.validated_data["question_id"], params.validated_data["answer_id"]
+        )
+        return Response(result, status=status_code)
+
+
+class InternalMetricsView(APIView):
+    """
+    Внутренние метрики процесса для мониторинга: соединения с БД и попадания в кэши опросов. Доступны только
+    с заголовком X-Survey-Metrics-Token, совпадающим с SURVEY_METRICS_TOKEN; пока токен не задан, эндпоинта
+    как будто нет.
+    """
+
+    TOKEN_HEADER = "X-Survey-Metrics-Token"
+
     @extend_schema(exclude=True)
-    def patch(self, request, *args, **kwargs):
-        return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
+    def get(self, request, *args, **kwargs):
+        secret = settings.SURVEY_METRICS_TOKEN
+        if not secret:
+            return Response({"detail": "Не найдено."}, status=status.HTTP_404_NOT_FOUND)
+
+        token = request.headers.get(self.TOKEN_HEADER, "")
+        if not hmac.compare_digest(token.encode(), secret.encode()):
+            return Response({"detail": "Неверный токен."}, status=status.HTTP_403_FORBIDDEN)
+
+        response = Response(
+            {
+                "databases": database_pool_stats(),
+                "caches": {"documents": survey_document_cache.stats(), "payloads": survey_payload_cache.stats()},
+            }
+        )
+        patch_cache_control(response, no_store=True)
+        return response